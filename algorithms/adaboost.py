@@ -1,9 +1,4 @@
-import pandas as pd
 import numpy as np
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.datasets import make_hastie_10_2
-import matplotlib.pyplot as plt
 
 """ HELPER FUNCTION: GET ERROR RATE ========================================="""
 def get_error_rate(pred, Y):
@@ -20,13 +15,206 @@ def generic_clf(Y_train, X_train, Y_test, X_test, clf):
     pred_test = clf.predict(X_test)
     return get_error_rate(pred_train, Y_train), get_error_rate(pred_test, Y_test)
     
+""" STUMP ENSEMBLE ============================================================"""
+class StumpEnsemble:
+    """Compact AdaBoost ensemble of depth-1 stumps stored as parallel arrays:
+    stump m predicts left[m] if X[:, feature[m]] <= threshold[m] else right[m] (+1/-1),
+    weighted by alpha[m]. Reusable for prediction without the training data or sklearn."""
+
+    def __init__(self, feature=(), threshold=(), left=(), right=(), alpha=()):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.int8)
+        self.right = np.asarray(right, dtype=np.int8)
+        self.alpha = np.asarray(alpha, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.alpha)
+
+    def append(self, feature, threshold, left, right, alpha):
+        self.feature = np.append(self.feature, np.int32(feature))
+        self.threshold = np.append(self.threshold, threshold)
+        self.left = np.append(self.left, np.int8(left))
+        self.right = np.append(self.right, np.int8(right))
+        self.alpha = np.append(self.alpha, alpha)
+
+    def append_tree(self, clf, alpha):
+        """Add a fitted WeightedStump or sklearn DecisionTreeClassifier(max_depth=1) as a stump"""
+        if isinstance(clf, WeightedStump):
+            self.append(clf.feature_, clf.threshold_, clf.left_, clf.right_, alpha)
+            return
+        tree = clf.tree_
+        if tree.node_count == 1:  # no split: constant prediction
+            c = clf.classes_[np.argmax(tree.value[0])]
+            self.append(0, np.inf, c, c, alpha)
+            return
+        left = clf.classes_[np.argmax(tree.value[tree.children_left[0]])]
+        right = clf.classes_[np.argmax(tree.value[tree.children_right[0]])]
+        self.append(tree.feature[0], tree.threshold[0], left, right, alpha)
+
+    def stump_predictions(self, X, m):
+        X = np.asarray(X)
+        return np.where(X[:, self.feature[m]] <= self.threshold[m], self.left[m], self.right[m])
+
+    def staged_decision_function(self, X):
+        """Yield the weighted vote after each boosting round"""
+        X = np.asarray(X)
+        score = np.zeros(len(X))
+        for m in range(len(self)):
+            score += self.alpha[m] * self.stump_predictions(X, m)
+            yield score.copy()
+
+    def staged_predict(self, X):
+        for score in self.staged_decision_function(X):
+            yield np.sign(score)
+
+    def decision_function(self, X):
+        X = np.asarray(X)
+        # All stumps at once: (n_samples, n_stumps) vote matrix
+        votes = np.where(X[:, self.feature] <= self.threshold, self.left, self.right)
+        return votes @ self.alpha
+
+    def predict(self, X):
+        return np.sign(self.decision_function(X))
+
+    def save(self, path):
+        np.savez(path, feature=self.feature, threshold=self.threshold,
+                 left=self.left, right=self.right, alpha=self.alpha)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data["feature"], data["threshold"], data["left"], data["right"], data["alpha"])
+
+""" WEIGHTED DECISION STUMP ==================================================="""
+class WeightedStump:
+    """Native depth-1 weak learner with the sklearn fit/predict interface.
+
+    Every feature is sorted once per training matrix (cached while the same X
+    object is passed to fit). Each round then gathers the current weights in
+    sorted order and finds the best weighted threshold of all features at once
+    with cumulative sums, by weighted Gini impurity (as sklearn) or by weighted
+    misclassification error. The work buffers are reused between rounds, and the
+    features can be split into column blocks evaluated in parallel threads
+    (numpy releases the GIL in take/cumsum).
+    """
+
+    def __init__(self, n_jobs=1, criterion="gini"):
+        if criterion not in ("gini", "error"):
+            raise ValueError("criterion must be 'gini' or 'error'")
+        self.n_jobs = n_jobs
+        self.criterion = criterion
+        self._X_ref = None
+        self._blocks = None
+        self._pool = None
+
+    def _presort(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        n, d = X.shape
+        n_blocks = max(1, min(self.n_jobs, d))
+        bounds = np.linspace(0, d, n_blocks + 1).astype(int)
+        self._blocks = []
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            order = np.argsort(X[:, a:b], axis=0, kind="stable")
+            xs = np.take_along_axis(X[:, a:b], order, axis=0)
+            # A split after sorted position k is only possible if the next value differs
+            valid = xs[:-1] < xs[1:]
+            self._blocks.append({
+                "offset": a,
+                "order": np.ascontiguousarray(order),
+                "xs": xs,
+                "valid": valid,
+                "pos": np.empty((n, b - a)),
+                "neg": np.empty((n, b - a)),
+                "score": np.empty((n - 1, b - a)),
+            })
+        if n_blocks > 1 and self._pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._pool = ThreadPoolExecutor(max_workers=n_blocks)
+
+    def _best_in_block(self, block, w_pos, w_neg, total_pos, total_neg):
+        """Best split of one column block: (score, (row, col), block)"""
+        pos, neg, score = block["pos"], block["neg"], block["score"]
+        np.take(w_pos, block["order"], out=pos)
+        np.take(w_neg, block["order"], out=neg)
+        np.cumsum(pos, axis=0, out=pos)
+        np.cumsum(neg, axis=0, out=neg)
+        # Split after sorted position k: samples 0..k go left
+        pos_l, neg_l = pos[:-1], neg[:-1]
+        if self.criterion == "error":
+            # Majority vote on both sides: misclassified weight of the better polarity
+            np.add(pos_l, total_neg - neg_l, out=score)
+            np.minimum(score, (total_pos + total_neg) - score, out=score)
+        else:
+            # Weighted Gini impurity: 2*p*n/W on both sides (same criterion as sklearn)
+            w_l = pos_l + neg_l
+            pos_r, neg_r = total_pos - pos_l, total_neg - neg_l
+            w_r = (total_pos + total_neg) - w_l
+            np.divide(2.0 * pos_l * neg_l, w_l, out=score, where=w_l > 0)
+            score[w_l <= 0] = 0.0
+            score += np.divide(2.0 * pos_r * neg_r, w_r, out=np.zeros_like(w_r), where=w_r > 0)
+        score[~block["valid"]] = np.inf
+        k = np.unravel_index(np.argmin(score), score.shape)
+        return score[k], k, block
+
+    def fit(self, X, Y, sample_weight=None):
+        if X is not self._X_ref or self._blocks is None:
+            self._presort(X)
+            self._X_ref = X
+        Y = np.asarray(Y)
+        self.classes_ = np.unique(Y)
+        neg_label, pos_label = self.classes_[0], self.classes_[-1]
+        w = np.ones(len(Y)) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+
+        is_pos = Y == pos_label
+        w_pos = np.where(is_pos, w, 0.0)
+        w_neg = w - w_pos
+        total_pos, total_neg = w_pos.sum(), w_neg.sum()
+
+        args = (w_pos, w_neg, total_pos, total_neg)
+        if self._pool is not None and len(self._blocks) > 1:
+            found = list(self._pool.map(lambda blk: self._best_in_block(blk, *args), self._blocks))
+        else:
+            found = [self._best_in_block(blk, *args) for blk in self._blocks]
+
+        # Without any useful split: constant prediction of the heavier class
+        total = total_pos + total_neg
+        best = (min(total_pos, total_neg) if self.criterion == "error" else 2.0 * total_pos * total_neg / total,
+                None, None)
+        for cand in found:
+            if cand[0] < best[0]:
+                best = cand
+
+        score, k, block = best
+        if block is None:
+            c = pos_label if total_pos >= total_neg else neg_label
+            self.feature_, self.threshold_, self.left_, self.right_ = 0, np.inf, c, c
+        else:
+            row, col = k
+            xs = block["xs"]
+            pos_l, neg_l = block["pos"][row, col], block["neg"][row, col]
+            self.feature_ = block["offset"] + col
+            self.threshold_ = 0.5 * (xs[row, col] + xs[row + 1, col])
+            self.left_ = pos_label if pos_l > neg_l else neg_label
+            self.right_ = pos_label if total_pos - pos_l > total_neg - neg_l else neg_label
+        self.score_ = score
+        return self
+
+    def predict(self, X):
+        X = np.asarray(X)
+        return np.where(X[:, self.feature_] <= self.threshold_, self.left_, self.right_)
+
 """ ADABOOST IMPLEMENTATION ================================================="""
-def adaboost_clf(Y_train, X_train, Y_test, X_test, M, clf):
+def adaboost_staged(Y_train, X_train, Y_test, X_test, M, clf, ensemble=None):
+    """Train once for M rounds and yield (round, train error, test error) after
+    every round, like sklearn's staged_predict. The fitted stumps and alphas are
+    appended to `ensemble` (a StumpEnsemble) when given."""
+    Y_train, Y_test = np.asarray(Y_train), np.asarray(Y_test)
     n_train, n_test = len(X_train), len(X_test)
     # Initialize weights
     w = np.ones(n_train) / n_train
     pred_train, pred_test = np.zeros(n_train), np.zeros(n_test)
-    
+
     for i in range(M):
         # Fit a classifier with the specific weights
         clf.fit(X_train, Y_train, sample_weight=w)
@@ -52,15 +240,25 @@ def adaboost_clf(Y_train, X_train, Y_test, X_test, M, clf):
         # Add to prediction
         pred_train += alpha_m * pred_train_i
         pred_test += alpha_m * pred_test_i
-    
-    pred_train = np.sign(pred_train)
-    pred_test = np.sign(pred_test)
+
+        if ensemble is not None:
+            ensemble.append_tree(clf, alpha_m)
+
+        yield i + 1, get_error_rate(np.sign(pred_train), Y_train), get_error_rate(np.sign(pred_test), Y_test)
+
+def adaboost_clf(Y_train, X_train, Y_test, X_test, M, clf):
+    er = (0.0, 0.0)
+    for _, err_train, err_test in adaboost_staged(Y_train, X_train, Y_test, X_test, M, clf):
+        er = (err_train, err_test)
 
     # Return error rate in train and test set
-    return get_error_rate(pred_train, Y_train), get_error_rate(pred_test, Y_test)
+    return er
 
 """ PLOT FUNCTION ==========================================================="""
 def plot_error_rate(er_train, er_test):
+    import pandas as pd
+    import matplotlib.pyplot as plt
+
     df_error = pd.DataFrame({'Training': er_train, 'Test': er_test})
     plot1 = df_error.plot(linewidth=3, figsize=(8, 6),
                           color=['lightblue', 'darkblue'], grid=True)
@@ -72,6 +270,12 @@ def plot_error_rate(er_train, er_test):
 
 """ MAIN SCRIPT ============================================================="""
 if __name__ == '__main__':
+    # Demo-only dependencies: importing this module for its learners stays numpy-only
+    import pandas as pd
+    from sklearn.tree import DecisionTreeClassifier
+    from sklearn.model_selection import train_test_split
+    from sklearn.datasets import make_hastie_10_2
+
     # Generate synthetic dataset
     x, y = make_hastie_10_2()
     df = pd.DataFrame(x)
@@ -88,12 +292,15 @@ if __name__ == '__main__':
     print_error_rate(er_tree)
     
     # Fit Adaboost classifier using a decision tree as base estimator
+    # (a single staged run instead of refitting from scratch for every M)
     er_train, er_test = [er_tree[0]], [er_tree[1]]
-    x_range = range(10, 410, 10)
-    for i in x_range:
-        er_i = adaboost_clf(Y_train, X_train, Y_test, X_test, i, clf_tree)
-        er_train.append(er_i[0])
-        er_test.append(er_i[1])
+    # with the native presorted stump learner as weak learner
+    ensemble = StumpEnsemble()
+    clf_stump = WeightedStump()
+    for i, err_train, err_test in adaboost_staged(Y_train, X_train, Y_test, X_test, 400, clf_stump, ensemble):
+        if i % 10 == 0:
+            er_train.append(err_train)
+            er_test.append(err_test)
     
     # Compare error rate vs number of iterations
     plot_error_rate(er_train, er_test)
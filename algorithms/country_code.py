@@ -0,0 +1,200 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# ------------------------------
+# EU KÉK SÁV + ORSZÁGKÓD OSZTÁLYOZÓ
+# ------------------------------
+# A rendszám bal szélén lévő kék sávot színszegmentálással keressük meg, a sáv alján
+# lévő fehér betű(ke)t pedig előre renderelt sablonokhoz hasonlítjuk (normalizált
+# korreláció). Egy kivágásra ez ~1 ms alatti, így az OCR csak végső tartalék.
+
+EU_COUNTRY_CODES = {
+    "A", "B", "BG", "CY", "CZ", "D", "DK", "E", "EST", "F", "FIN", "GR", "H", "HR", "I", "IRL",
+    "L", "LT", "LV", "M", "NL", "P", "PL", "RO", "S", "SK", "SLO",
+}
+GLYPH_SIZE = (16, 20)  # (szélesség, magasság)
+TEMPLATE_FONTS = [
+    cv2.FONT_HERSHEY_SIMPLEX,
+    cv2.FONT_HERSHEY_DUPLEX,
+    cv2.FONT_HERSHEY_PLAIN,
+    cv2.FONT_HERSHEY_COMPLEX,
+    cv2.FONT_HERSHEY_TRIPLEX,
+]
+
+# Kék (OpenCV HSV: H 0..180)
+BLUE_LOW = np.array([95, 80, 40], np.uint8)
+BLUE_HIGH = np.array([135, 255, 255], np.uint8)
+
+
+def _normalize_glyph(mask: np.ndarray) -> Optional[np.ndarray]:
+    """Bináris betűmaszk -> a befoglaló dobozra vágott, GLYPH_SIZE méretű, nulla átlagú,
+    egységnyi normájú vektor (a korreláció így egyetlen skalárszorzat).
+    Az "I"-hez hasonló keskeny betűknél a doboz nem nyújtja szélességben a betűt."""
+    ys, xs = np.nonzero(mask)
+    if len(xs) < 4:
+        return None
+    crop = mask[ys.min():ys.max() + 1, xs.min():xs.max() + 1].astype(np.float32)
+    h, w = crop.shape
+    if w < h * 0.4:
+        pad = int(h * 0.4) - w
+        crop = np.pad(crop, ((0, 0), (pad // 2, pad - pad // 2)))
+    glyph = cv2.resize(crop, GLYPH_SIZE, interpolation=cv2.INTER_AREA).ravel()
+    glyph -= glyph.mean()
+    norm = np.linalg.norm(glyph)
+    if norm < 1e-6:
+        return None
+    return glyph / norm
+
+
+# ------------------------------
+# SABLONOK (OFFLINE TANÍTÁS)
+# ------------------------------
+_TEMPLATES: Optional[Tuple[np.ndarray, List[str]]] = None
+_TEMPLATES_LOCK = threading.Lock()
+
+
+def build_templates(letters: str = "ABCDEFGHIJKLMNOPRSTUVXYZ") -> Tuple[np.ndarray, List[str]]:
+    """Betűsablonok renderelése több betűtípussal és vastagsággal.
+    Visszatérés: (T x D sablonmátrix, betűcímkék)"""
+    vectors, labels = [], []
+    for letter in letters:
+        for font in TEMPLATE_FONTS:
+            # Nagy és kis méret: kis rendszámon a vonalvastagság arányaiban nagyobb
+            for scale, thickness in ((1.6, 1), (1.6, 2), (1.6, 3), (1.6, 5), (0.6, 2)):
+                canvas = np.zeros((60, 60), np.uint8)
+                cv2.putText(canvas, letter, (8, 48), font, scale, 255, thickness, cv2.LINE_AA)
+                glyph = _normalize_glyph(canvas > 127)
+                if glyph is not None:
+                    vectors.append(glyph)
+                    labels.append(letter)
+    return np.stack(vectors), labels
+
+
+def save_templates(path: str) -> None:
+    templates, labels = build_templates()
+    np.savez(path, templates=templates, labels=np.array(labels))
+
+
+def load_templates(path: Optional[str] = None) -> Tuple[np.ndarray, List[str]]:
+    """Sablonok betöltése fájlból, vagy első használatkor renderelés (folyamatonként egyszer)"""
+    global _TEMPLATES
+    with _TEMPLATES_LOCK:
+        if path is not None:
+            data = np.load(path)
+            _TEMPLATES = (data["templates"], [str(l) for l in data["labels"]])
+        elif _TEMPLATES is None:
+            _TEMPLATES = build_templates()
+        return _TEMPLATES
+
+
+# ------------------------------
+# DETEKTÁLÁS
+# ------------------------------
+def find_blue_band(plate_img: np.ndarray, min_fill: float = 0.45) -> Optional[Tuple[int, int]]:
+    """A bal oldali kék sáv (x0, x1) oszlophatárai, vagy None.
+    Oszloponként a kék pixelek aránya; a sáv a bal szélhez közeli, összefüggő, elég kék oszlopsor."""
+    h, w = plate_img.shape[:2]
+    if h < 8 or w < 16:
+        return None
+    left = plate_img[:, :max(1, w // 3)]
+    hsv = cv2.cvtColor(left, cv2.COLOR_BGR2HSV)
+    blue = cv2.inRange(hsv, BLUE_LOW, BLUE_HIGH)
+    fill = blue.mean(axis=0) / 255.0
+    cols = np.flatnonzero(fill >= min_fill)
+    if not len(cols) or cols[0] > w * 0.08:
+        return None
+    # Az első összefüggő szakasz (kis hézagokat a betű okozhat)
+    x0 = x1 = cols[0]
+    for c in cols[1:]:
+        if c - x1 > max(2, w // 100):
+            break
+        x1 = c
+    band_w = x1 - x0 + 1
+    if not (0.04 * w <= band_w <= 0.25 * w):
+        return None
+    return int(x0), int(x1) + 1
+
+
+def _glyph_masks(band: np.ndarray) -> List[np.ndarray]:
+    """A sáv alsó részén lévő világos, telítetlen (fehér) betűk maszkjai balról jobbra"""
+    h = band.shape[0]
+    lower = band[int(h * 0.4):]
+    hsv = cv2.cvtColor(lower, cv2.COLOR_BGR2HSV)
+    white = ((hsv[..., 1] < 90) & (hsv[..., 2] > 150)).astype(np.uint8)
+    n, labels, stats, _ = cv2.connectedComponentsWithStats(white, connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    if not len(heights):
+        return []
+    # A betűk közel azonos magasak; a csillagok / zaj ennél jóval kisebb
+    min_h = max(lower.shape[0] * 0.15, heights.max() * 0.6)
+    comps = [i for i in range(1, n) if stats[i, cv2.CC_STAT_HEIGHT] >= min_h]
+    comps.sort(key=lambda i: stats[i, cv2.CC_STAT_LEFT])
+    masks = []
+    for i in comps:
+        masks.extend(_split_touching(labels == i, stats[i]))
+    return masks[:3]
+
+
+def _split_touching(mask: np.ndarray, stat: np.ndarray) -> List[np.ndarray]:
+    """Összeérő betűk szétvágása: a szélesség/magasság arányból becsült darabszám szerint,
+    a vetületi profil minimumainál"""
+    x, w, h = stat[cv2.CC_STAT_LEFT], stat[cv2.CC_STAT_WIDTH], stat[cv2.CC_STAT_HEIGHT]
+    parts = int(round(w / (h * 0.8)))
+    if parts < 2:
+        return [mask]
+    profile = mask[:, x:x + w].sum(axis=0)
+    cuts = []
+    for k in range(1, parts):
+        center = w * k // parts
+        lo, hi = max(1, center - w // (2 * parts)), min(w - 1, center + w // (2 * parts))
+        if lo >= hi:
+            continue  # túl keskeny komponens: nincs hol vágni
+        cuts.append(x + lo + int(np.argmin(profile[lo:hi])))
+    if not cuts:
+        return [mask]
+    bounds = [x] + cuts + [x + w]
+    pieces = []
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        piece = np.zeros_like(mask)
+        piece[:, a:b] = mask[:, a:b]
+        pieces.append(piece)
+    return pieces
+
+
+def classify_country_code(plate_img: np.ndarray, min_score: float = 0.55) -> Tuple[Optional[str], float]:
+    """Országkód a kék sávból OCR nélkül. Visszatérés: (kód vagy None, legrosszabb betű pontszáma)"""
+    band_cols = find_blue_band(plate_img)
+    if band_cols is None:
+        return None, 0.0
+    band = plate_img[:, band_cols[0]:band_cols[1]]
+    masks = _glyph_masks(band)
+    if not masks:
+        return None, 0.0
+
+    templates, labels = load_templates()
+    glyphs = [_normalize_glyph(m) for m in masks]
+    if any(g is None for g in glyphs):
+        return None, 0.0
+    scores = np.stack(glyphs) @ templates.T
+    # Betűnként a legjobb sablon pontszáma, majd a kód a létező EU kódok közül
+    # (a leggyengébb betűje alapján) - így egy hasonló betű nem ad nem létező kódot
+    letter_scores: List[Dict[str, float]] = []
+    for row in scores:
+        best: Dict[str, float] = {}
+        for label, value in zip(labels, row):
+            if value > best.get(label, -1.0):
+                best[label] = float(value)
+        letter_scores.append(best)
+    code, score = None, 0.0
+    for candidate in EU_COUNTRY_CODES:
+        if len(candidate) != len(letter_scores):
+            continue
+        value = min(ls.get(ch, -1.0) for ch, ls in zip(candidate, letter_scores))
+        if value > score:
+            code, score = candidate, value
+    if code is None or score < min_score:
+        return None, score
+    return code, score
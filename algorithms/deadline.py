@@ -0,0 +1,36 @@
+"""
+DEADLINE.PY - Időkeret a késleltetés-korlátos (interaktív) elemzéshez
+
+    deadline = Deadline(0.5)          # 500 ms mostantól
+    if deadline.remaining() < becsült_költség:
+        ... a durvább eredményt adjuk vissza, "complete": False ...
+
+A modulok a deadline paraméterben másodpercet (float) vagy egy megosztott Deadline
+objektumot is elfogadnak (Deadline.coerce); utóbbival több modul osztozik egy kereten.
+"""
+
+import time
+from typing import Optional, Union
+
+
+class Deadline:
+    __slots__ = ("budget_s", "t_end")
+
+    def __init__(self, budget_s: float):
+        self.budget_s = float(budget_s)
+        self.t_end = time.perf_counter() + self.budget_s
+
+    @classmethod
+    def coerce(cls, value: Union["Deadline", float, int, None]) -> Optional["Deadline"]:
+        if value is None or isinstance(value, Deadline):
+            return value
+        return cls(value)
+
+    def remaining(self) -> float:
+        return self.t_end - time.perf_counter()
+
+    def expired(self) -> bool:
+        return time.perf_counter() >= self.t_end
+
+    def __repr__(self):
+        return f"<Deadline {self.budget_s * 1000:.0f} ms, hátra {self.remaining() * 1000:.0f} ms>"
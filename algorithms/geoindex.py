@@ -0,0 +1,185 @@
+import json
+import math
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+EARTH_RADIUS_M = 6371008.8
+# A befoglaló doboz ráhagyása fokban (~10 cm): lebegőpontos kerekítés a határon
+BBOX_PAD_DEG = 1e-6
+
+
+# ============ GEOMETRIA ============
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Nagygörbe-távolság méterben."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def radius_bbox(lat: float, lon: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """A sugarú kört lefedő befoglaló téglalap: (min_lat, min_lon, max_lat, max_lon).
+    A hosszúság a ±180° határon túlnyúlhat, ezt a lekérdezés kezeli.
+    Ugyanazzal a gömbbel számol, mint a haversine_m, így a sugáron belüli pont nem eshet ki;
+    a hosszúság-tartomány a kör legszélesebb pontjára (nem a középpont szélességére) érvényes."""
+    ang = radius_m / EARTH_RADIUS_M
+    dlat = math.degrees(ang) + BBOX_PAD_DEG
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if min_lat <= -90.0 or max_lat >= 90.0:
+        # Pólus a körön belül: minden hosszúság szóba jön
+        return max(min_lat, -90.0), -180.0, min(max_lat, 90.0), 180.0
+    ratio = math.sin(ang) / max(math.cos(math.radians(lat)), 1e-12)
+    if ratio >= 1.0:
+        return min_lat, -180.0, max_lat, 180.0
+    dlon = math.degrees(math.asin(ratio)) + BBOX_PAD_DEG
+    if dlon >= 180.0:
+        return min_lat, -180.0, max_lat, 180.0
+    return min_lat, lon - dlon, max_lat, lon + dlon
+
+
+# ============ R*TREE INDEX ============
+
+class GeoIndex:
+    """GPS pontok térbeli indexe az SQLite R*Tree moduljával.
+    A pontok a gps_points táblában, a befoglaló dobozok a gps_rtree virtuális táblában
+    vannak (közös rowid). A lekérdezések az R*Tree-n szűrnek, majd pontos távolsággal."""
+
+    def __init__(self, db_path: str = "results.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        # A results.db-t más folyamatok (jobqueue workerek, pipeline) egyszerre írják
+        self._conn = sqlite3.connect(db_path, timeout=30.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS gps_points (
+                                id INTEGER PRIMARY KEY,
+                                sha256 TEXT UNIQUE,
+                                image TEXT,
+                                lat REAL,
+                                lon REAL
+                            )""")
+        self._conn.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS gps_rtree
+                              USING rtree(id, min_lat, max_lat, min_lon, max_lon)""")
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM gps_points").fetchone()[0]
+
+    # --- Beszúrás ---
+    def add(self, sha256: str, image: str, lat: float, lon: float) -> bool:
+        return self.add_many([(sha256, image, lat, lon)]) == 1
+
+    def add_many(self, rows: Iterable[Tuple[str, str, float, float]], batch_size: int = 10000) -> int:
+        """Tömeges betöltés batch ingesthez: kötegenként egy tranzakció.
+        A már indexelt (azonos sha256) képeket kihagyja. Visszatér a beszúrt pontok számával."""
+        inserted = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                inserted += self._insert_batch(batch)
+                batch = []
+        if batch:
+            inserted += self._insert_batch(batch)
+        return inserted
+
+    def _insert_batch(self, batch: List[Tuple[str, str, float, float]]) -> int:
+        with self._lock, self._conn:
+            cur = self._conn.cursor()
+            last_id = cur.execute("SELECT COALESCE(MAX(id), 0) FROM gps_points").fetchone()[0]
+            cur.executemany("INSERT OR IGNORE INTO gps_points (sha256, image, lat, lon) VALUES (?, ?, ?, ?)", batch)
+            # Az újonnan kiosztott rowid-k a korábbi maximum fölött vannak
+            cur.execute("""INSERT INTO gps_rtree
+                           SELECT id, lat, lat, lon, lon FROM gps_points WHERE id > ?
+                           ORDER BY lat, lon""", (last_id,))
+            return cur.rowcount
+
+    def load_json(self, json_path: str = "exif_results.json") -> int:
+        """Korábbi exif_reading eredmények (JSON lista) betöltése az indexbe."""
+        with open(json_path, "r", encoding="utf-8") as f:
+            content = f.read().strip()
+        entries = json.loads(content) if content else []
+        return self.add_many(
+            (e["fingerprints"]["sha256"], e.get("image"), e["gps"]["latitude"], e["gps"]["longitude"])
+            for e in entries
+            if e.get("gps") and e.get("fingerprints", {}).get("sha256")
+        )
+
+    # --- Lekérdezések ---
+    def _query_box(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+                   limit: Optional[int] = None) -> List[Tuple[str, str, float, float]]:
+        sql = """SELECT p.sha256, p.image, p.lat, p.lon
+                 FROM gps_rtree r JOIN gps_points p ON p.id = r.id
+                 WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lon >= ? AND r.min_lon <= ?"""
+        # Az R*Tree 32 bites lebegőpontos dobozokat tárol, ezért a pontos koordinátákra is szűrünk
+        sql += " AND p.lat BETWEEN ? AND ? AND p.lon BETWEEN ? AND ?"
+        params: list = [min_lat, max_lat, min_lon, max_lon, min_lat, max_lat, min_lon, max_lon]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+             limit: Optional[int] = None) -> List[Dict]:
+        """Befoglaló téglalapba eső pontok. min_lon > max_lon esetén a doboz átlépi a ±180° hosszúságot."""
+        if min_lon <= max_lon:
+            boxes = [(min_lat, min_lon, max_lat, max_lon)]
+        else:
+            boxes = [(min_lat, min_lon, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon)]
+        rows = []
+        for box in boxes:
+            rows.extend(self._query_box(*box, limit=limit))
+        if limit is not None:
+            rows = rows[:limit]
+        return [{"sha256": s, "image": img, "latitude": la, "longitude": lo} for s, img, la, lo in rows]
+
+    def radius(self, lat: float, lon: float, radius_m: float, limit: Optional[int] = None) -> List[Dict]:
+        """`radius_m` méteren belüli pontok távolság szerint rendezve."""
+        min_lat, min_lon, max_lat, max_lon = radius_bbox(lat, lon, radius_m)
+        boxes = []
+        if min_lon < -180.0:
+            boxes += [(min_lat, min_lon + 360.0, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon)]
+        elif max_lon > 180.0:
+            boxes += [(min_lat, min_lon, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon - 360.0)]
+        else:
+            boxes.append((min_lat, min_lon, max_lat, max_lon))
+
+        hits = []
+        for box in boxes:
+            for s, img, la, lo in self._query_box(*box):
+                d = haversine_m(lat, lon, la, lo)
+                if d <= radius_m:
+                    hits.append({"sha256": s, "image": img, "latitude": la, "longitude": lo, "distance_m": d})
+        hits.sort(key=lambda h: h["distance_m"])
+        return hits[:limit] if limit is not None else hits
+
+    def nearest(self, lat: float, lon: float, k: int = 10, start_radius_m: float = 500.0) -> List[Dict]:
+        """k legközelebbi pont: táguló sugarú keresés, amíg legalább k találat nincs a körön belül."""
+        r = start_radius_m
+        max_r = math.pi * EARTH_RADIUS_M
+        while True:
+            hits = self.radius(lat, lon, r)
+            if len(hits) >= k or r >= max_r:
+                return hits[:k]
+            r = min(r * 4.0, max_r)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_INDEXES: Dict[str, GeoIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_index(db_path: str = "results.db") -> GeoIndex:
+    """Folyamatonként egy megosztott index adatbázisonként."""
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(db_path)
+        if index is None:
+            index = _INDEXES[db_path] = GeoIndex(db_path)
+        return index
@@ -1,19 +1,34 @@
 import cv2
 import numpy as np
 
-def haar_detection(image_path):
-    """Haar Cascade arc- és szemfelismerés (visszaadja a koordinátákat)"""
+from algorithms.tracing import span
+from algorithms.haarfeatures import load_cascade
+
+def haar_detection(image_path, custom_cascades=None, image=None):
+    """Haar Cascade arc- és szemfelismerés (visszaadja a koordinátákat)
+    custom_cascades: {név: .npz útvonal vagy HaarCascade} - haarfeatures-szel tanított saját kaszkádok,
+    a találatok results[név] alatt
+    image: már dekódolt kép (BGR vagy szürke), ilyenkor a fájl nem töltődik be újra
+    """
     try:
         # Kép betöltése
-        image_cv = cv2.imdecode(np.fromfile(image_path, dtype=np.uint8), cv2.IMREAD_COLOR)
-        gray = cv2.cvtColor(image_cv, cv2.COLOR_BGR2GRAY)
+        if image is not None:
+            gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        else:
+            with span("haar:decode", file=image_path):
+                image_cv = cv2.imdecode(np.fromfile(image_path, dtype=np.uint8), cv2.IMREAD_COLOR)
+                gray = cv2.cvtColor(image_cv, cv2.COLOR_BGR2GRAY)
+                del image_cv
 
         # Cascade modellek betöltése
-        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
-        eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_eye.xml")
+        with span("haar:load_cascades"):
+            face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+            eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_eye.xml")
 
         # Arcok és szemek detektálása
-        faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+        with span("haar:cascade_faces") as s:
+            faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+            s.set(found=len(faces))
         results = {"faces": [], "eyes": []}
 
         for (x, y, w, h) in faces:
@@ -21,10 +36,19 @@ def haar_detection(image_path):
             
             # Szemek keresése az arc területén belül
             roi_gray = gray[y:y+h, x:x+w]
-            eyes = eye_cascade.detectMultiScale(roi_gray)
+            with span("haar:cascade_eyes", roi=f"{w}x{h}"):
+                eyes = eye_cascade.detectMultiScale(roi_gray)
             for (ex, ey, ew, eh) in eyes:
                 results["eyes"].append((x+ex, y+ey, ew, eh))
 
+        # Saját kaszkádok (pl. rendszám, logó, tábla)
+        for name, cascade in (custom_cascades or {}).items():
+            if isinstance(cascade, str):
+                cascade = load_cascade(cascade)
+            with span(f"haar:cascade_{name}") as s:
+                results[name] = cascade.detect(gray)
+                s.set(found=len(results[name]))
+
         return results
 
     except Exception as e:
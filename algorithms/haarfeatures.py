@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+HAARFEATURES.PY - Integrálkép alapú Haar-jellemzők, boosting alapú kaszkád tanítás és szkenner
+Saját detektorokhoz (rendszám alakú régiók, logók, táblák), amelyekhez nincs gyári haarcascade_*.xml.
+
+- Integrálképek vektorizáltan, sok ablakra egyszerre
+- Jellemzőbank: minden jellemző az integrálkép néhány pontjának lineáris kombinációja,
+  így a teljes bank kiértékelése N ablakon egyetlen mátrixszorzás
+- Fokozatok tanítása AdaBoosttal (WeightedStump + StumpEnsemble az adaboost.py-ból),
+  figyelmi kaszkád összeállítása hard negative bányászattal
+- Szkenner: fokozatonként csak a túlélő ablakok értékelődnek ki (korai elutasítás)
+
+Tanítás:
+    python -m algorithms.haarfeatures train --pos <pozitív kivágások> --neg <háttérképek>
+                                           --window 48x16 --stages 10 --out plate_cascade.npz
+"""
+
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from algorithms.adaboost import StumpEnsemble, WeightedStump
+
+# Egy jellemző: téglalapok listája (x, y, w, h, súly) az ablakon belül
+Feature = List[Tuple[int, int, int, int, float]]
+MAX_RECTS = 4
+
+
+# ============ INTEGRÁLKÉPEK ============
+
+def integral_images(windows: np.ndarray) -> np.ndarray:
+    """(N, H, W) ablakok -> (N, H+1, W+1) integrálképek (nulla első sor/oszlop)"""
+    windows = np.asarray(windows, dtype=np.float64)
+    n, h, w = windows.shape
+    ii = np.zeros((n, h + 1, w + 1))
+    np.cumsum(windows, axis=1, out=ii[:, 1:, 1:])
+    np.cumsum(ii[:, 1:, 1:], axis=2, out=ii[:, 1:, 1:])
+    return ii
+
+
+def window_std(windows: np.ndarray) -> np.ndarray:
+    """Ablakonkénti szórás a kontraszt-normalizáláshoz (alsó korlát 1.0)"""
+    flat = np.asarray(windows, dtype=np.float64).reshape(len(windows), -1)
+    return np.maximum(flat.std(axis=1), 1.0)
+
+
+# ============ JELLEMZŐBANK ============
+
+def haar_feature_bank(window: Tuple[int, int], pos_step: int = 2, size_step: int = 2,
+                      min_size: int = 2, max_features: Optional[int] = None, seed: int = 0) -> List[Feature]:
+    """Viola-Jones típusú jellemzők (él, vonal, négyes) egy (W, H) ablakra.
+    Minden jellemző súlyainak területtel súlyozott összege 0, így az átlagfényesség nem számít."""
+    W, H = window
+    feats: List[Feature] = []
+    for h in range(min_size, H + 1, size_step):
+        for w in range(min_size, W + 1, size_step):
+            for y in range(0, H - h + 1, pos_step):
+                for x in range(0, W - w + 1, pos_step):
+                    if x + 2 * w <= W:  # vízszintes él
+                        feats.append([(x, y, w, h, 1.0), (x + w, y, w, h, -1.0)])
+                    if y + 2 * h <= H:  # függőleges él
+                        feats.append([(x, y, w, h, 1.0), (x, y + h, w, h, -1.0)])
+                    if x + 3 * w <= W:  # vízszintes vonal
+                        feats.append([(x, y, w, h, -1.0), (x + w, y, w, h, 2.0), (x + 2 * w, y, w, h, -1.0)])
+                    if y + 3 * h <= H:  # függőleges vonal
+                        feats.append([(x, y, w, h, -1.0), (x, y + h, w, h, 2.0), (x, y + 2 * h, w, h, -1.0)])
+                    if x + 2 * w <= W and y + 2 * h <= H:  # négyes (sakktábla)
+                        feats.append([(x, y, w, h, 1.0), (x + w, y, w, h, -1.0),
+                                      (x, y + h, w, h, -1.0), (x + w, y + h, w, h, 1.0)])
+    if max_features is not None and len(feats) > max_features:
+        rng = np.random.default_rng(seed)
+        keep = np.sort(rng.choice(len(feats), max_features, replace=False))
+        feats = [feats[i] for i in keep]
+    return feats
+
+
+def coefficient_matrix(features: Sequence[Feature], window: Tuple[int, int]) -> np.ndarray:
+    """(P, F) mátrix, P = (H+1)*(W+1) integrálkép-pont: jellemzőértékek = ii_flat @ C"""
+    W, H = window
+    stride = W + 1
+    C = np.zeros(((H + 1) * stride, len(features)))
+    for j, feat in enumerate(features):
+        for x, y, w, h, c in feat:
+            C[(y + h) * stride + x + w, j] += c
+            C[y * stride + x + w, j] -= c
+            C[(y + h) * stride + x, j] -= c
+            C[y * stride + x, j] += c
+    return C
+
+
+def feature_matrix(windows: np.ndarray, features: Sequence[Feature], window: Tuple[int, int],
+                   chunk: int = 4096) -> np.ndarray:
+    """A teljes jellemzőbank kiértékelése N ablakon: (N, F), szórással normalizálva"""
+    ii = integral_images(windows).reshape(len(windows), -1)
+    std = window_std(windows)[:, None]
+    out = np.empty((len(windows), len(features)))
+    for a in range(0, len(features), chunk):
+        C = coefficient_matrix(features[a:a + chunk], window)
+        out[:, a:a + chunk] = ii @ C
+    out /= std
+    return out
+
+
+# ============ KASZKÁD ============
+
+class HaarCascade:
+    """Figyelmi kaszkád: fokozatok (StumpEnsemble + küszöb) egy közös, tömör jellemzőbankon.
+    Egy ablak akkor pozitív, ha minden fokozat pontszáma eléri a fokozat küszöbét."""
+
+    def __init__(self, window: Tuple[int, int], features: List[Feature] = None,
+                 stages: List[Tuple[StumpEnsemble, float]] = None):
+        self.window = tuple(int(v) for v in window)
+        self.features = features or []
+        self.stages = stages or []
+        self._plans = None
+
+    def __len__(self):
+        return len(self.stages)
+
+    def add_stage(self, ensemble: StumpEnsemble, threshold: float, bank: Sequence[Feature]) -> None:
+        """Fokozat hozzáadása; a bank-beli jellemzőindexeket a kaszkád saját bankjára képezi"""
+        index = {}
+        for i, feat in enumerate(self.features):
+            index[tuple(feat)] = i
+        remapped = []
+        for f in ensemble.feature:
+            key = tuple(bank[f])
+            if key not in index:
+                index[key] = len(self.features)
+                self.features.append(list(bank[f]))
+            remapped.append(index[key])
+        stage = StumpEnsemble(remapped, ensemble.threshold, ensemble.left, ensemble.right, ensemble.alpha)
+        self.stages.append((stage, float(threshold)))
+        self._plans = None
+
+    # --- Ablakokon (tanításhoz, bootstraphez) ---
+    def stage_scores(self, feature_values: np.ndarray, stage: int) -> np.ndarray:
+        ensemble, _ = self.stages[stage]
+        return ensemble.decision_function(feature_values)
+
+    def classify_windows(self, windows: np.ndarray) -> np.ndarray:
+        """Bool maszk: mely ablakok jutnak át az összes fokozaton"""
+        alive = np.ones(len(windows), bool)
+        if not len(windows) or not self.stages:
+            return alive
+        values = feature_matrix(windows, self.features, self.window)
+        for ensemble, threshold in self.stages:
+            idx = np.flatnonzero(alive)
+            if not len(idx):
+                break
+            alive[idx] = ensemble.decision_function(values[idx]) >= threshold
+        return alive
+
+    # --- Szkenner ---
+    def _stage_plans(self):
+        """Fokozatonként: a használt integrálkép-pontok (dy, dx) és a (P_s, F_s) együttható mátrix"""
+        if self._plans is None:
+            W, H = self.window
+            stride = W + 1
+            plans = []
+            for ensemble, threshold in self.stages:
+                feats = [self.features[f] for f in ensemble.feature]
+                C = coefficient_matrix(feats, self.window)
+                used = np.flatnonzero(np.any(C != 0, axis=1))
+                # A C oszlopai a fokozat csonkjainak sorrendjében vannak
+                local = StumpEnsemble(np.arange(len(ensemble)), ensemble.threshold, ensemble.left,
+                                      ensemble.right, ensemble.alpha)
+                plans.append((used // stride, used % stride, C[used], local, threshold))
+            self._plans = plans
+        return self._plans
+
+    def scan(self, gray: np.ndarray, step: int = 2) -> np.ndarray:
+        """Egy skálán: az összes ablak (x, y) pozíciója, amely minden fokozaton átjut"""
+        W, H = self.window
+        h, w = gray.shape[:2]
+        if h < H or w < W:
+            return np.empty((0, 2), int)
+        ii, sq = cv2.integral2(gray, sdepth=cv2.CV_64F)
+        ys, xs = np.mgrid[0:h - H + 1:step, 0:w - W + 1:step]
+        ys, xs = ys.ravel(), xs.ravel()
+
+        area = float(W * H)
+        s = ii[ys + H, xs + W] - ii[ys, xs + W] - ii[ys + H, xs] + ii[ys, xs]
+        q = sq[ys + H, xs + W] - sq[ys, xs + W] - sq[ys + H, xs] + sq[ys, xs]
+        std = np.sqrt(np.maximum(q / area - (s / area) ** 2, 0.0))
+        std = np.maximum(std, 1.0)
+
+        for dy, dx, C, ensemble, threshold in self._stage_plans():
+            if not len(ys):
+                break
+            points = ii[ys[:, None] + dy[None, :], xs[:, None] + dx[None, :]]
+            values = (points @ C) / std[:, None]
+            keep = ensemble.decision_function(values) >= threshold
+            ys, xs, std = ys[keep], xs[keep], std[keep]
+        return np.stack([xs, ys], axis=1)
+
+    def detect(self, gray: np.ndarray, scale_factor: float = 1.25, step: int = 2,
+               min_neighbors: int = 2, min_size: Optional[Tuple[int, int]] = None,
+               max_size: Optional[Tuple[int, int]] = None) -> List[Tuple[int, int, int, int]]:
+        """Többskálás detektálás (a kép kicsinyítésével), csoportosított (x, y, w, h) találatok"""
+        W, H = self.window
+        if gray.ndim == 3:
+            gray = cv2.cvtColor(gray, cv2.COLOR_BGR2GRAY)
+        h, w = gray.shape[:2]
+        scale = 1.0
+        if min_size:
+            scale = max(scale, min(min_size[0] / W, min_size[1] / H))
+        rects = []
+        while W * scale <= w and H * scale <= h:
+            if max_size and (W * scale > max_size[0] or H * scale > max_size[1]):
+                break
+            small = gray if scale == 1.0 else cv2.resize(
+                gray, (int(w / scale), int(h / scale)), interpolation=cv2.INTER_AREA)
+            for x, y in self.scan(small, step):
+                rects.append([int(x * scale), int(y * scale), int(W * scale), int(H * scale)])
+            scale *= scale_factor
+        if not rects:
+            return []
+        if min_neighbors > 0:
+            # A lista duplázásával a legalább min_neighbors elemű csoportok maradnak (1-nél az egyedüliek is)
+            grouped, _ = cv2.groupRectangles(rects + rects, 2 * min_neighbors - 1, 0.2)
+            return [tuple(int(v) for v in r) for r in grouped]
+        return [tuple(r) for r in rects]
+
+    # --- Mentés / betöltés ---
+    def save(self, path: str) -> None:
+        rects = np.zeros((len(self.features), MAX_RECTS, 5))
+        for i, feat in enumerate(self.features):
+            rects[i, :len(feat)] = feat
+        sizes = [len(s) for s, _ in self.stages]
+        cat = lambda attr: np.concatenate([getattr(s, attr) for s, _ in self.stages]) if self.stages else np.empty(0)
+        np.savez(path, window=np.array(self.window), rects=rects,
+                 stage_sizes=np.array(sizes), stage_thresholds=np.array([t for _, t in self.stages]),
+                 feature=cat("feature"), threshold=cat("threshold"), left=cat("left"),
+                 right=cat("right"), alpha=cat("alpha"))
+
+    @classmethod
+    def load(cls, path: str) -> "HaarCascade":
+        data = np.load(path)
+        features = []
+        for rects in data["rects"]:
+            features.append([(int(x), int(y), int(w), int(h), float(c)) for x, y, w, h, c in rects if c != 0])
+        stages = []
+        start = 0
+        for size, thr in zip(data["stage_sizes"], data["stage_thresholds"]):
+            sl = slice(start, start + int(size))
+            stages.append((StumpEnsemble(data["feature"][sl], data["threshold"][sl], data["left"][sl],
+                                         data["right"][sl], data["alpha"][sl]), float(thr)))
+            start += int(size)
+        return cls(tuple(data["window"]), features, stages)
+
+
+_CASCADES: Dict[str, HaarCascade] = {}
+_CASCADES_LOCK = threading.Lock()
+
+
+def load_cascade(path: str) -> HaarCascade:
+    """Betanított kaszkád betöltése (folyamatonként egyszer, cache-elve)"""
+    with _CASCADES_LOCK:
+        cascade = _CASCADES.get(path)
+        if cascade is None:
+            cascade = _CASCADES[path] = HaarCascade.load(path)
+        return cascade
+
+
+# ============ TANÍTÁS ============
+
+def train_stage(f_pos: np.ndarray, f_neg: np.ndarray, min_detection: float = 0.995,
+                max_false_positive: float = 0.5, max_stumps: int = 100,
+                n_jobs: int = 1) -> Tuple[StumpEnsemble, float, float, float]:
+    """Egy fokozat: AdaBoost addig, amíg a pozitívok min_detection része átjutása mellett
+    a hamis pozitív arány <= max_false_positive.
+    Visszatérés: (ensemble, küszöb, detektálási arány, hamis pozitív arány)"""
+    n_pos, n_neg = len(f_pos), len(f_neg)
+    X = np.vstack([f_pos, f_neg])
+    y = np.concatenate([np.ones(n_pos), -np.ones(n_neg)])
+    w = np.concatenate([np.full(n_pos, 0.5 / n_pos), np.full(n_neg, 0.5 / n_neg)])
+
+    stump = WeightedStump(n_jobs=n_jobs, criterion="error")
+    ensemble = StumpEnsemble()
+    score = np.zeros(len(y))
+    threshold, det, fpr = 0.0, 1.0, 1.0
+    for _ in range(max_stumps):
+        w /= w.sum()
+        stump.fit(X, y, w)
+        pred = stump.predict(X)
+        err = max(min(np.dot(w, pred != y), 1 - 1e-10), 1e-10)
+        alpha = 0.5 * np.log((1 - err) / err)
+        w *= np.exp(-alpha * y * pred)
+        ensemble.append_tree(stump, alpha)
+        score += alpha * pred
+
+        # Küszöb: a pozitívok legalább min_detection része átjusson
+        threshold = np.quantile(score[:n_pos], 1.0 - min_detection) - 1e-9
+        det = np.mean(score[:n_pos] >= threshold)
+        fpr = np.mean(score[n_pos:] >= threshold)
+        if fpr <= max_false_positive:
+            break
+    return ensemble, float(threshold), float(det), float(fpr)
+
+
+def sample_windows(images: Sequence[np.ndarray], window: Tuple[int, int], count: int,
+                   rng: np.random.Generator, cascade: Optional[HaarCascade] = None,
+                   max_tries: int = 50) -> np.ndarray:
+    """Negatív ablakok véletlen helyről és skáláról; ha van kaszkád, csak azok,
+    amelyeken az eddigi fokozatok átengednek (hard negative bányászat)"""
+    W, H = window
+    collected = []
+    total = 0
+    for _ in range(max_tries):
+        batch = []
+        for _ in range(count * 2):
+            img = images[int(rng.integers(len(images)))]
+            h, w = img.shape[:2]
+            s = rng.uniform(1.0, max(1.0, min(w / W, h / H)))
+            ww, hh = int(W * s), int(H * s)
+            if ww > w or hh > h:
+                continue
+            x, y = int(rng.integers(0, w - ww + 1)), int(rng.integers(0, h - hh + 1))
+            batch.append(cv2.resize(img[y:y + hh, x:x + ww], (W, H), interpolation=cv2.INTER_AREA))
+        if not batch:
+            break
+        batch = np.stack(batch)
+        if cascade is not None and len(cascade):
+            batch = batch[cascade.classify_windows(batch)]
+        collected.append(batch)
+        total += len(batch)
+        if total >= count:
+            break
+    if not collected:
+        return np.empty((0, H, W), np.uint8)
+    return np.concatenate(collected)[:count]
+
+
+def train_cascade(positives: np.ndarray, negative_images: Sequence[np.ndarray], window: Tuple[int, int],
+                  n_stages: int = 10, n_negatives: Optional[int] = None, min_detection: float = 0.995,
+                  max_false_positive: float = 0.5, max_stumps: int = 100, bank: Optional[List[Feature]] = None,
+                  max_features: int = 6000, n_jobs: int = 1, seed: int = 0, log_func=None) -> HaarCascade:
+    """Kaszkád tanítása: positives (N, H, W) szürke kivágások, negative_images objektum nélküli képek"""
+    rng = np.random.default_rng(seed)
+    positives = np.asarray(positives)
+    n_negatives = n_negatives or 2 * len(positives)
+    bank = bank or haar_feature_bank(window, max_features=max_features, seed=seed)
+    f_pos = feature_matrix(positives, bank, window)
+    cascade = HaarCascade(window)
+
+    for stage in range(n_stages):
+        negatives = sample_windows(negative_images, window, n_negatives, rng, cascade)
+        if len(negatives) < max(10, n_negatives // 20):
+            if log_func:
+                log_func("info", "CASCADE", f"Elfogytak a negatív minták a(z) {stage + 1}. fokozatnál")
+            break
+        f_neg = feature_matrix(negatives, bank, window)
+        ensemble, threshold, det, fpr = train_stage(f_pos, f_neg, min_detection, max_false_positive,
+                                                    max_stumps, n_jobs)
+        cascade.add_stage(ensemble, threshold, bank)
+        # A következő fokozat csak a még átjutó pozitívokon tanul
+        keep = ensemble.decision_function(f_pos) >= threshold
+        f_pos = f_pos[keep]
+        if log_func:
+            log_func("info", "CASCADE", f"{stage + 1}. fokozat: {len(ensemble)} jellemző, "
+                                        f"detektálás {det:.3f}, hamis pozitív {fpr:.3f}")
+    return cascade
+
+
+def _load_gray_dir(path: str) -> List[np.ndarray]:
+    images = []
+    for name in sorted(os.listdir(path)):
+        img = cv2.imread(os.path.join(path, name), cv2.IMREAD_GRAYSCALE)
+        if img is not None:
+            images.append(img)
+    return images
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Haar kaszkád tanítása")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_train = sub.add_parser("train")
+    p_train.add_argument("--pos", required=True, help="Pozitív kivágások könyvtára")
+    p_train.add_argument("--neg", required=True, help="Objektum nélküli háttérképek könyvtára")
+    p_train.add_argument("--window", default="24x24", help="Ablakméret SZxM, pl. 48x16")
+    p_train.add_argument("--stages", type=int, default=10)
+    p_train.add_argument("--max-features", type=int, default=6000)
+    p_train.add_argument("--jobs", type=int, default=1)
+    p_train.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    W, H = (int(v) for v in args.window.lower().split("x"))
+    pos = np.stack([cv2.resize(img, (W, H), interpolation=cv2.INTER_AREA) for img in _load_gray_dir(args.pos)])
+    neg = _load_gray_dir(args.neg)
+    cascade = train_cascade(pos, neg, (W, H), n_stages=args.stages, max_features=args.max_features,
+                            n_jobs=args.jobs, log_func=lambda t, s, m: print(f"[{s}] {m}"))
+    cascade.save(args.out)
+    print(f"Kaszkád elmentve: {args.out} ({len(cascade)} fokozat, {len(cascade.features)} jellemző)")
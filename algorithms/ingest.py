@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+INGEST.PY - Inkrementális beolvasás (watch folder) változás-manifesttel
+
+A manifest könyvtáranként tárolja a fájlok méretét, mtime_ns értékét és sha256 hash-ét.
+Egy menet csak az új / megváltozott fájlokat hash-eli; ha a tartalom (sha256) már
+elemezve van (áthelyezett, másolt, csak "touch"-olt kép), az eredmény újrahasznosul,
+egyébként a kép a pipeline-ra kerül (közvetlenül, vagy a jobqueue munkasorba).
+Változatlan fába a menet csak stat hívásokat végez, és könyvtáranként egy lekérdezést.
+
+Figyelés: watchdog csomaggal (inotify / FSEvents) eseményvezérelt, nélküle időközönkénti
+teljes (olcsó) újraolvasás.
+
+Használat:
+    python -m algorithms.ingest <könyvtár> [--watch] [--interval 5] [--queue jobs.db]
+                                [--modules meta,haar] [--db results.db]
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from algorithms.jobqueue import DEAD, LEASED, QUEUED
+from algorithms.resultstore import analyze_image, file_sha256, get_store
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+
+# ============ MANIFEST ============
+
+class Manifest:
+    """(könyvtár, név) -> (méret, mtime_ns, sha256, pending). Könyvtáranként olvasva, így egy nagy
+    fa bejárása sem tartja a teljes manifestet memóriában. pending: a kép a munkasorban vár
+    (még nincs eredménye); az ilyen bejegyzést minden menet újra ellenőrzi, de nem hash-eli."""
+
+    def __init__(self, db_path: str = "results.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS manifest (
+                                dir TEXT,
+                                name TEXT,
+                                size INTEGER,
+                                mtime_ns INTEGER,
+                                sha256 TEXT,
+                                pending INTEGER NOT NULL DEFAULT 0,
+                                PRIMARY KEY (dir, name)
+                            ) WITHOUT ROWID""")
+        columns = [r[1] for r in self._conn.execute("PRAGMA table_info(manifest)")]
+        if "pending" not in columns:
+            self._conn.execute("ALTER TABLE manifest ADD COLUMN pending INTEGER NOT NULL DEFAULT 0")
+        self._conn.commit()
+
+    def dir_entries(self, dirpath: str) -> Dict[str, Tuple[int, int, str, bool]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT name, size, mtime_ns, sha256, pending FROM manifest WHERE dir = ?",
+                                      (dirpath,)).fetchall()
+        return {name: (size, mtime, sha, bool(pending)) for name, size, mtime, sha, pending in rows}
+
+    def dirs_under(self, root: str) -> List[str]:
+        with self._lock:
+            # Prefix-tartomány (a LIKE a "_" / "%" karaktereket mintaként kezelné)
+            prefix = root.rstrip(os.sep) + os.sep
+            rows = self._conn.execute("SELECT DISTINCT dir FROM manifest WHERE dir = ? OR (dir >= ? AND dir < ?)",
+                                      (root, prefix, prefix[:-1] + chr(ord(os.sep) + 1))).fetchall()
+        return [r[0] for r in rows]
+
+    def upsert_many(self, rows: Iterable[Tuple[str, int, int, str]], pending: bool = False) -> None:
+        """rows: (útvonal, méret, mtime_ns, sha256); pending: munkasorban váró képek"""
+        data = [(os.path.dirname(p), os.path.basename(p), size, mtime, sha, int(pending))
+                for p, size, mtime, sha in rows]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO manifest VALUES (?, ?, ?, ?, ?, ?)", data)
+
+    def delete_many(self, paths: Iterable[str]) -> None:
+        data = [(os.path.dirname(p), os.path.basename(p)) for p in paths]
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM manifest WHERE dir = ? AND name = ?", data)
+
+    def delete_dirs(self, dirs: Iterable[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM manifest WHERE dir = ?", [(d,) for d in dirs])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM manifest").fetchone()[0]
+
+
+# ============ VÁLTOZÁSKERESÉS ============
+
+def _is_image(name: str) -> bool:
+    return name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def _classify(old, st, path: str, changed: list) -> bool:
+    """True, ha a fájl változatlan és kész. A változatlan, de még váró (pending) bejegyzés
+    a régi hash-sel kerül a changed listába: (útvonal, méret, mtime_ns, régi sha, hash érvényes)"""
+    same = old is not None and old[0] == st.st_size and old[1] == st.st_mtime_ns
+    if same and not old[3]:
+        return True
+    changed.append((path, st.st_size, st.st_mtime_ns, old[2] if old else None, same))
+    return False
+
+
+def scan_changes(root: str, manifest: Manifest) -> Dict:
+    """A fa bejárása os.scandir-rel (a DirEntry.stat egyetlen rendszerhívás) és összevetés a
+    manifesttel könyvtáranként. Visszatérés: {"changed": [(útvonal, méret, mtime_ns, régi sha,
+    a régi sha érvényes-e)], "deleted": [útvonal], "deleted_dirs": [könyvtár], "unchanged": db}"""
+    root = os.path.abspath(root)
+    changed, deleted = [], []
+    unchanged = 0
+    seen_dirs = set()
+    stack = [root]
+    while stack:
+        dirpath = stack.pop()
+        seen_dirs.add(dirpath)
+        try:
+            it = os.scandir(dirpath)
+        except OSError:
+            continue
+        known = manifest.dir_entries(dirpath)
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                        continue
+                    if not _is_image(entry.name):
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                if _classify(known.pop(entry.name, None), st, entry.path, changed):
+                    unchanged += 1
+        deleted.extend(os.path.join(dirpath, name) for name in known)
+    deleted_dirs = [d for d in manifest.dirs_under(root) if d not in seen_dirs]
+    return {"changed": changed, "deleted": deleted, "deleted_dirs": deleted_dirs, "unchanged": unchanged}
+
+
+def path_changes(paths: Iterable[str], manifest: Manifest) -> Dict:
+    """Mint a scan_changes, de csak a megadott útvonalakra (fájlrendszer-események)"""
+    changed, deleted = [], []
+    unchanged = 0
+    by_dir: Dict[str, List[str]] = {}
+    for p in set(os.path.abspath(p) for p in paths if _is_image(p)):
+        by_dir.setdefault(os.path.dirname(p), []).append(p)
+    for dirpath, dir_paths in by_dir.items():
+        known = manifest.dir_entries(dirpath)
+        for p in dir_paths:
+            old = known.get(os.path.basename(p))
+            try:
+                st = os.stat(p)
+            except OSError:
+                if old is not None:
+                    deleted.append(p)
+                continue
+            if _classify(old, st, p, changed):
+                unchanged += 1
+    return {"changed": changed, "deleted": deleted, "deleted_dirs": [], "unchanged": unchanged}
+
+
+# ============ BEOLVASÁS ============
+
+class Ingestor:
+    """Egy figyelt könyvtár inkrementális feldolgozása.
+    queue: ha megadott (jobqueue.JobQueue), az elemzendő képek oda kerülnek, különben helyben futnak.
+    save_batch: helyi elemzésnél ennyi kép eredménye kerül egy tranzakcióba (save_many)."""
+
+    def __init__(self, root: str, db_path: str = "results.db", modules: Optional[Sequence[str]] = None,
+                 queue=None, log_func=None, hash_workers: int = 4, save_batch: int = 100):
+        from algorithms.registry import OSINT_MODULES
+
+        self.root = os.path.abspath(root)
+        self.manifest = Manifest(db_path)
+        self.store = get_store(db_path)
+        self.modules = tuple(modules or OSINT_MODULES)
+        self.queue = queue
+        self.log_func = log_func
+        self.hash_workers = hash_workers
+        self.save_batch = max(1, save_batch)
+
+    def _log(self, type, message):
+        if self.log_func:
+            self.log_func(type, "INGEST", message)
+        else:
+            print(f"[INGEST] {message}")
+
+    def run_pass(self, paths: Optional[Iterable[str]] = None) -> Dict:
+        """Egy menet: teljes újraolvasás, vagy (paths megadásával) csak a megadott útvonalak.
+        Munkasor esetén a beküldött képek pending állapotban kerülnek a manifestbe: kész bejegyzés
+        csak akkor lesz belőlük, ha egy későbbi menet már (nem None) eredményt talál a tárban.
+        A dead-letter feladatot a menet nem küldi be újra, amíg a fájl nem változik (requeue-dead).
+        Visszatérés: statisztika {"unchanged", "changed", "reused", "submitted", "waiting", "analyzed",
+        "failed", "deleted", "seconds"}"""
+        t0 = time.perf_counter()
+        diff = scan_changes(self.root, self.manifest) if paths is None else path_changes(paths, self.manifest)
+        changed = diff["changed"]
+
+        # Csak a megváltozott fájlokat hash-eljük (I/O kötött: szálakon); a változatlan, váró
+        # bejegyzés hash-e érvényes
+        with ThreadPoolExecutor(max_workers=self.hash_workers) as pool:
+            hashes = list(pool.map(lambda row: row[3] if row[4] else _safe_sha256(row[0]), changed))
+        rows = [(p, size, mtime, sha) for (p, size, mtime, _, _), sha in zip(changed, hashes) if sha]
+        known = self.store.known([r[3] for r in rows], self.modules)
+
+        stats = {"unchanged": diff["unchanged"], "changed": len(changed), "reused": 0, "submitted": 0,
+                 "waiting": 0, "analyzed": 0, "failed": len(changed) - len(rows),
+                 "deleted": len(diff["deleted"]) + len(diff["deleted_dirs"])}
+        done = []
+        pending = []
+        for row in rows:
+            path, _, _, sha = row
+            if sha in known:
+                self.store.touch_image(sha, path)
+                stats["reused"] += 1
+                done.append(row)
+            else:
+                pending.append(row)
+
+        if self.queue is not None and pending:
+            states = self.queue.path_states([r[0] for r in pending])
+            submit, waiting = [], []
+            for row in pending:
+                state, updated = states.get(os.path.abspath(row[0]), (None, 0.0))
+                if state in (QUEUED, LEASED):
+                    waiting.append(row)
+                elif state == DEAD and updated * 1e9 >= row[2]:
+                    # A fájl utolsó változása óta végleg elbukott: csak requeue-dead után fut újra
+                    stats["failed"] += 1
+                    waiting.append(row)
+                else:
+                    submit.append(row)
+            stats["submitted"] = self.queue.submit([r[0] for r in submit], self.modules)
+            stats["waiting"] = len(pending) - len(submit)
+            self.manifest.upsert_many(waiting + submit, pending=True)
+        else:
+            save_rows = []
+            for row in pending:
+                try:
+                    analyze_image(row[0], self.modules, self.store, sha256=row[3], log_func=self.log_func,
+                                  save_rows=save_rows)
+                except Exception as e:
+                    # A manifestbe nem kerül be, így a következő menet újrapróbálja
+                    stats["failed"] += 1
+                    self._log("error", f"{row[0]}: {e}")
+                    continue
+                stats["analyzed"] += 1
+                done.append(row)
+                if len(save_rows) >= self.save_batch:
+                    self.store.save_many(save_rows)
+                    save_rows = []
+            if save_rows:
+                self.store.save_many(save_rows)
+
+        self.manifest.upsert_many(done)
+        self.manifest.delete_many(diff["deleted"])
+        self.manifest.delete_dirs(diff["deleted_dirs"])
+        stats["seconds"] = time.perf_counter() - t0
+        return stats
+
+    def watch(self, interval: float = 5.0, full_rescan_every: float = 3600.0,
+              use_watchdog: bool = True, stop_event: Optional[threading.Event] = None) -> None:
+        """Folyamatos figyelés. watchdog esetén csak az eseményekben szereplő útvonalak kerülnek
+        feldolgozásra (és ritkán egy teljes biztonsági újraolvasás), különben interval-onként
+        teljes újraolvasás."""
+        stop_event = stop_event or threading.Event()
+        self._report(self.run_pass())
+        observer = self._start_observer() if use_watchdog else None
+        last_full = time.monotonic()
+        try:
+            while not stop_event.wait(interval):
+                if observer is None or time.monotonic() - last_full >= full_rescan_every:
+                    stats = self.run_pass()
+                    last_full = time.monotonic()
+                else:
+                    with self._events_lock:
+                        paths, self._events = self._events, set()
+                    if not paths:
+                        continue
+                    stats = self.run_pass(paths)
+                self._report(stats)
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+
+    def _start_observer(self):
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return None
+
+        self._events = set()
+        self._events_lock = threading.Lock()
+        ingestor = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory:
+                    return
+                with ingestor._events_lock:
+                    ingestor._events.add(event.src_path)
+                    dest = getattr(event, "dest_path", None)
+                    if dest:
+                        ingestor._events.add(dest)
+
+        observer = Observer()
+        observer.schedule(_Handler(), self.root, recursive=True)
+        observer.start()
+        return observer
+
+    def _report(self, stats: Dict) -> None:
+        if stats["changed"] > stats["waiting"] or stats["deleted"]:
+            self._log("info", f"{stats['changed']} új/változott ({stats['reused']} újrahasznosítva, "
+                              f"{stats['analyzed']} elemezve, {stats['submitted']} sorba állítva, {stats['waiting']} vár, "
+                              f"{stats['failed']} hiba), {stats['deleted']} törölt, "
+                              f"{stats['unchanged']} változatlan - {stats['seconds']:.2f} s")
+
+
+def _safe_sha256(path: str) -> Optional[str]:
+    try:
+        return file_sha256(path)
+    except OSError:
+        return None
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inkrementális képbeolvasás / watch folder")
+    parser.add_argument("root")
+    parser.add_argument("--db", default="results.db", help="Manifest és eredménytár")
+    parser.add_argument("--modules", help="Vesszővel elválasztott modulnevek (alap: OSINT_MODULES)")
+    parser.add_argument("--queue", help="jobqueue adatbázis: az elemzés a workerekre marad")
+    parser.add_argument("--watch", action="store_true")
+    parser.add_argument("--interval", type=float, default=5.0)
+    parser.add_argument("--poll", action="store_true", help="watchdog helyett időközönkénti újraolvasás")
+    args = parser.parse_args()
+
+    queue = None
+    if args.queue:
+        from algorithms.jobqueue import JobQueue
+
+        queue = JobQueue(args.queue)
+    ingestor = Ingestor(args.root, args.db, args.modules.split(",") if args.modules else None, queue)
+    if args.watch:
+        try:
+            ingestor.watch(args.interval, use_watchdog=not args.poll)
+        except KeyboardInterrupt:
+            pass
+    else:
+        stats = ingestor.run_pass()
+        print("  ".join(f"{k}: {v:.2f}" if isinstance(v, float) else f"{k}: {v}" for k, v in stats.items()))
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+JOBQUEUE.PY - Elosztott képelemzés SQLite alapú munkasorral (külső szolgáltatás nélkül)
+
+Tetszőleges számú worker (folyamat / gép) időkorlátos bérlettel (lease) foglal képeket,
+lefuttatja a run_osint modulkészletét (registry.OSINT_MODULES), közben szívverést küld;
+a hibás feladat visszalépéssel újrapróbálódik, max_attempts után a dead-letter állapotba kerül.
+A lejárt bérletű (pl. elhalt worker) feladatokat a következő foglalás visszaveszi.
+
+Egy gépen WAL naplózással fut; megosztott (hálózati) fájlrendszeren a WAL megosztott
+memóriája nem működik, ott journal_mode="delete" kell (--journal delete).
+
+Használat:
+    python -m algorithms.jobqueue submit <kép | könyvtár> ... [--priority 0]
+    python -m algorithms.jobqueue worker [-j 4] [--modules meta,haar] [--once] [--batch 8]
+    python -m algorithms.jobqueue status
+    python -m algorithms.jobqueue requeue-dead
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from algorithms.resultstore import _jsonable, analyze_image, get_store
+
+QUEUED, LEASED, DONE, DEAD = "queued", "leased", "done", "dead"
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+
+# ============ MUNKASOR ============
+
+class JobQueue:
+    """Feladatsor egy SQLite fájlban. Minden állapotváltás egyetlen rövid tranzakció
+    (BEGIN IMMEDIATE), így a workerek csak a foglalás idejére versengenek az írási zárért."""
+
+    def __init__(self, db_path: str = "jobs.db", lease_seconds: float = 120.0, max_attempts: int = 3,
+                 retry_backoff: float = 5.0, journal_mode: str = "wal"):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute(f"PRAGMA journal_mode={journal_mode}")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                image_path TEXT NOT NULL,
+                modules TEXT,
+                priority INTEGER NOT NULL DEFAULT 0,
+                state TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                not_before REAL NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires REAL,
+                created REAL,
+                updated REAL,
+                last_error TEXT,
+                result TEXT
+            );
+            CREATE INDEX IF NOT EXISTS jobs_claim ON jobs(state, priority DESC, id);
+            CREATE INDEX IF NOT EXISTS jobs_path ON jobs(image_path, state);
+            CREATE TABLE IF NOT EXISTS workers (
+                worker_id TEXT PRIMARY KEY,
+                host TEXT,
+                pid INTEGER,
+                started REAL,
+                last_seen REAL,
+                jobs_done INTEGER NOT NULL DEFAULT 0,
+                jobs_failed INTEGER NOT NULL DEFAULT 0,
+                busy_seconds REAL NOT NULL DEFAULT 0
+            );
+        """)
+
+    def _write(self, fn):
+        """fn(conn) egy IMMEDIATE tranzakcióban (az írási zár azonnal, nem commitkor)"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                out = fn(self._conn)
+                self._conn.execute("COMMIT")
+                return out
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    # --- Beküldés ---
+    def submit(self, image_paths: Iterable[str], modules: Optional[Sequence[str]] = None,
+               priority: int = 0, batch_size: int = 5000) -> int:
+        """Képek sorba állítása kötegelve; a már várakozó / futó útvonalakat kihagyja.
+        Visszatér a beküldött feladatok számával."""
+        mods = ",".join(modules) if modules else None
+        submitted = 0
+        batch: List[str] = []
+
+        def flush(conn):
+            now = time.time()
+            before = conn.total_changes
+            conn.executemany(
+                """INSERT INTO jobs (image_path, modules, priority, created, updated)
+                   SELECT ?, ?, ?, ?, ? WHERE NOT EXISTS (
+                       SELECT 1 FROM jobs WHERE image_path = ? AND state IN ('queued', 'leased'))""",
+                [(p, mods, priority, now, now, p) for p in batch])
+            return conn.total_changes - before
+
+        for path in image_paths:
+            batch.append(os.path.abspath(path))
+            if len(batch) >= batch_size:
+                submitted += self._write(flush)
+                batch = []
+        if batch:
+            submitted += self._write(flush)
+        return submitted
+
+    # --- Foglalás, szívverés, lezárás ---
+    def claim(self, worker_id: str, n: int = 1) -> List[Dict]:
+        """Legfeljebb n feladat lefoglalása lease_seconds időre (prioritás, majd beküldési sorrend).
+        A lejárt bérletű feladatok újra foglalhatók; ha a próbálkozások elfogytak, dead-letter."""
+        def fn(conn):
+            now = time.time()
+            conn.execute(f"""UPDATE jobs SET state = '{DEAD}', updated = ?, lease_owner = NULL,
+                                 last_error = COALESCE(last_error, '') || ' [bérlet lejárt]'
+                             WHERE state = '{LEASED}' AND lease_expires < ? AND attempts >= ?""",
+                         (now, now, self.max_attempts))
+            rows = conn.execute(f"""
+                UPDATE jobs SET state = '{LEASED}', lease_owner = ?, lease_expires = ?,
+                                attempts = attempts + 1, updated = ?
+                WHERE id IN (
+                    SELECT id FROM jobs
+                    WHERE (state = '{QUEUED}' AND not_before <= ?) OR (state = '{LEASED}' AND lease_expires < ?)
+                    ORDER BY priority DESC, id LIMIT ?)
+                RETURNING id, image_path, modules, attempts""",
+                (worker_id, now + self.lease_seconds, now, now, now, n)).fetchall()
+            return [{"id": r[0], "image_path": r[1], "modules": r[2].split(",") if r[2] else None,
+                     "attempts": r[3]} for r in rows]
+        return self._write(fn)
+
+    def heartbeat(self, worker_id: str, job_ids: Sequence[int]) -> List[int]:
+        """Bérletek meghosszabbítása; visszatér a még a workernél lévő feladatokkal
+        (ami hiányzik, azt közben más vette át - az eredményét el kell dobni)"""
+        def fn(conn):
+            now = time.time()
+            conn.execute("UPDATE workers SET last_seen = ? WHERE worker_id = ?", (now, worker_id))
+            if not job_ids:
+                return []
+            marks = ",".join("?" * len(job_ids))
+            rows = conn.execute(f"""UPDATE jobs SET lease_expires = ?
+                                    WHERE id IN ({marks}) AND lease_owner = ? AND state = '{LEASED}'
+                                    RETURNING id""",
+                                (now + self.lease_seconds, *job_ids, worker_id)).fetchall()
+            return [r[0] for r in rows]
+        return self._write(fn)
+
+    def complete(self, job_id: int, worker_id: str, result=None, busy_seconds: float = 0.0) -> bool:
+        def fn(conn):
+            now = time.time()
+            cur = conn.execute(f"""UPDATE jobs SET state = '{DONE}', result = ?, updated = ?, lease_owner = NULL
+                                   WHERE id = ? AND lease_owner = ? AND state = '{LEASED}'""",
+                               (json.dumps(result, default=_jsonable), now, job_id, worker_id))
+            done = cur.rowcount == 1
+            # Elvesztett / visszavett foglalás: a munkaidő számít, a kész feladat nem
+            conn.execute("""UPDATE workers SET jobs_done = jobs_done + ?, busy_seconds = busy_seconds + ?,
+                                               last_seen = ? WHERE worker_id = ?""",
+                         (int(done), busy_seconds, now, worker_id))
+            return done
+        return self._write(fn)
+
+    def fail(self, job_id: int, worker_id: str, error: str, busy_seconds: float = 0.0) -> str:
+        """Hiba: újrapróba exponenciális visszalépéssel, vagy dead-letter. Visszatér az új állapottal."""
+        def fn(conn):
+            now = time.time()
+            row = conn.execute("SELECT attempts FROM jobs WHERE id = ? AND lease_owner = ?",
+                               (job_id, worker_id)).fetchone()
+            conn.execute("""UPDATE workers SET jobs_failed = jobs_failed + ?, busy_seconds = busy_seconds + ?,
+                                               last_seen = ? WHERE worker_id = ?""",
+                         (int(row is not None), busy_seconds, now, worker_id))
+            if row is None:
+                return None
+            attempts = row[0]
+            state = DEAD if attempts >= self.max_attempts else QUEUED
+            conn.execute("""UPDATE jobs SET state = ?, last_error = ?, updated = ?, lease_owner = NULL,
+                                            not_before = ? WHERE id = ?""",
+                         (state, error[-2000:], now, now + self.retry_backoff * 2 ** (attempts - 1), job_id))
+            return state
+        return self._write(fn)
+
+    def requeue_dead(self, job_ids: Optional[Sequence[int]] = None) -> int:
+        """Dead-letter feladatok visszaállítása (próbálkozások nullázásával)"""
+        def fn(conn):
+            sql = f"UPDATE jobs SET state = '{QUEUED}', attempts = 0, not_before = 0, updated = ? WHERE state = '{DEAD}'"
+            args: list = [time.time()]
+            if job_ids:
+                sql += f" AND id IN ({','.join('?' * len(job_ids))})"
+                args += list(job_ids)
+            return conn.execute(sql, args).rowcount
+        return self._write(fn)
+
+    # --- Workerek, állapot ---
+    def register_worker(self, worker_id: str) -> None:
+        def fn(conn):
+            now = time.time()
+            conn.execute("""INSERT INTO workers (worker_id, host, pid, started, last_seen) VALUES (?, ?, ?, ?, ?)
+                            ON CONFLICT(worker_id) DO UPDATE SET started = excluded.started,
+                                last_seen = excluded.last_seen, pid = excluded.pid,
+                                jobs_done = 0, jobs_failed = 0, busy_seconds = 0""",
+                         (worker_id, socket.gethostname(), os.getpid(), now, now))
+        self._write(fn)
+
+    def status(self) -> Dict:
+        """Sor mélysége állapotonként + workerenkénti ráta (feladat/s az indulás óta)"""
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+            rows = self._conn.execute("""SELECT worker_id, host, pid, started, last_seen, jobs_done,
+                                                jobs_failed, busy_seconds FROM workers
+                                         ORDER BY last_seen DESC""").fetchall()
+        now = time.time()
+        workers = []
+        for wid, host, pid, started, last_seen, done, failed, busy in rows:
+            elapsed = max(1e-6, last_seen - started)
+            workers.append({
+                "worker_id": wid, "host": host, "pid": pid,
+                "alive": now - last_seen < 2 * self.lease_seconds,
+                "jobs_done": done, "jobs_failed": failed,
+                "rate_per_s": done / elapsed,
+                "utilization": min(1.0, busy / elapsed),
+            })
+        return {"depth": {s: counts.get(s, 0) for s in (QUEUED, LEASED, DONE, DEAD)}, "workers": workers}
+
+    def pending(self) -> int:
+        """Még el nem végzett (várakozó, visszalépésben lévő vagy futó) feladatok száma"""
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM jobs WHERE state IN ('{QUEUED}', '{LEASED}')"
+                                      ).fetchone()[0]
+
+    def path_states(self, image_paths: Sequence[str]) -> Dict[str, Tuple[str, float]]:
+        """Útvonalanként a legutóbbi feladat (állapot, utolsó módosítás ideje)"""
+        paths = [os.path.abspath(p) for p in image_paths]
+        states = {}
+        with self._lock:
+            for i in range(0, len(paths), 500):
+                chunk = paths[i:i + 500]
+                rows = self._conn.execute(
+                    f"""SELECT image_path, state, updated FROM jobs WHERE id IN (
+                            SELECT MAX(id) FROM jobs WHERE image_path IN ({",".join("?" * len(chunk))})
+                            GROUP BY image_path)""", chunk).fetchall()
+                states.update((p, (state, updated)) for p, state, updated in rows)
+        return states
+
+    def result(self, job_id: int):
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# ============ WORKER ============
+
+class Worker:
+    """Egy feldolgozó: foglal, modulokat futtat (registry), szívverést küld, lezár.
+    A szívverés külön szálon fut lease_seconds / 3 időközönként.
+    results_db: ha megadott, az eredmények a ResultStore-ba is kerülnek (sha256 szerint),
+    és a már elemzett tartalmat nem dolgozza fel újra.
+    batch_size: egyszerre foglalt feladatok száma; a köteg eredményei egy tranzakcióban
+    (save_many) mentődnek, és csak utána zárulnak le a feladatok."""
+
+    def __init__(self, queue: JobQueue, worker_id: Optional[str] = None,
+                 modules: Optional[Sequence[str]] = None, log_func=None,
+                 results_db: Optional[str] = None, batch_size: int = 8):
+        from algorithms.registry import OSINT_MODULES
+
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.modules = tuple(modules or OSINT_MODULES)
+        self.log_func = log_func
+        self.store = get_store(results_db) if results_db else None
+        self.batch_size = max(1, batch_size)
+        self._current: List[int] = []
+        self._lost = set()
+        self._stop = threading.Event()
+
+    def _log(self, type, message):
+        if self.log_func:
+            self.log_func(type, "QUEUE", message)
+        else:
+            print(f"[QUEUE] {message}")
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.queue.lease_seconds / 3.0):
+            current = list(self._current)
+            try:
+                kept = set(self.queue.heartbeat(self.worker_id, current))
+            except sqlite3.OperationalError as e:
+                self._log("warning", f"Szívverés hiba: {e}")
+                continue
+            self._lost.update(j for j in current if j not in kept)
+
+    def process(self, job: Dict, save_rows: Optional[list] = None) -> Dict:
+        """A feladat moduljainak futtatása; bármely modul kivétele (vagy None eredménye) a feladat hibája.
+        save_rows: a tárba mentendő sor ide kerül (kötegelt mentés), különben azonnal mentődik"""
+        _, results, _ = analyze_image(job["image_path"], job["modules"] or self.modules,
+                                      self.store, log_func=self.log_func, save_rows=save_rows)
+        return results
+
+    def run(self, once: bool = False, idle_sleep: float = 1.0, max_jobs: Optional[int] = None) -> int:
+        """Feldolgozási ciklus. once=True: kilép, ha nincs több el nem végzett feladat. Visszatér a kész feladatok számával."""
+        self.queue.register_worker(self.worker_id)
+        beat = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        beat.start()
+        done = 0
+        try:
+            while not self._stop.is_set() and (max_jobs is None or done < max_jobs):
+                n = self.batch_size if max_jobs is None else min(self.batch_size, max_jobs - done)
+                jobs = self.queue.claim(self.worker_id, n)
+                if not jobs:
+                    if once and not self.queue.pending():
+                        break
+                    self.queue.heartbeat(self.worker_id, [])
+                    time.sleep(idle_sleep)
+                    continue
+                self._current[:] = [job["id"] for job in jobs]
+                try:
+                    done += self._run_batch(jobs)
+                finally:
+                    self._current[:] = []
+        finally:
+            self._stop.set()
+        return done
+
+    def _run_batch(self, jobs: List[Dict]) -> int:
+        """Egy köteg: modulok feladatonként, majd egy közös mentés, végül lezárás. Visszatér a kész feladatok számával."""
+        finished = []
+        for job in jobs:
+            t0 = time.perf_counter()
+            rows: list = []
+            try:
+                result = self.process(job, rows if self.store is not None else None)
+            except Exception as e:
+                self._fail(job, e, time.perf_counter() - t0)
+            else:
+                finished.append((job, result, time.perf_counter() - t0, rows))
+
+        live = [f for f in finished if f[0]["id"] not in self._lost]
+        for job, _, _, _ in finished:
+            if job["id"] in self._lost:
+                self._log("warning", f"#{job['id']} bérlete elveszett, eredmény eldobva")
+        if self.store is not None:
+            try:
+                self.store.save_many([row for _, _, _, rows in live for row in rows])
+            except Exception as e:
+                for job, _, busy, _ in live:
+                    self._fail(job, e, busy)
+                return 0
+        done = 0
+        for job, result, busy, _ in live:
+            if self.queue.complete(job["id"], self.worker_id, result, busy):
+                done += 1
+        return done
+
+    def _fail(self, job: Dict, error: Exception, busy: float) -> None:
+        state = self.queue.fail(job["id"], self.worker_id, f"{type(error).__name__}: {error}", busy)
+        self._log("error", f"#{job['id']} hiba ({job['attempts']}. próba, -> {state}): {error}")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def _worker_process(db_path, journal_mode, lease_seconds, modules, once, results_db, index, batch_size):
+    queue = JobQueue(db_path, lease_seconds=lease_seconds, journal_mode=journal_mode)
+    worker = Worker(queue, f"{socket.gethostname()}:{os.getpid()}:{index}", modules, results_db=results_db,
+                    batch_size=batch_size)
+    worker.run(once=once)
+
+
+def _expand_paths(paths: Iterable[str]) -> Iterable[str]:
+    for p in paths:
+        if os.path.isdir(p):
+            for root, _, files in os.walk(p):
+                for f in sorted(files):
+                    if f.lower().endswith(IMAGE_EXTENSIONS):
+                        yield os.path.join(root, f)
+        else:
+            yield p
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Elosztott OSINT munkasor (SQLite)")
+    parser.add_argument("--db", default="jobs.db")
+    parser.add_argument("--journal", default="wal", help="wal (egy gép) vagy delete (megosztott fájlrendszer)")
+    parser.add_argument("--lease", type=float, default=120.0, help="Bérlet hossza (mp)")
+    sub = parser.add_subparsers(dest="command")
+    p_submit = sub.add_parser("submit", help="Képek / könyvtárak sorba állítása")
+    p_submit.add_argument("paths", nargs="+")
+    p_submit.add_argument("--modules", help="Vesszővel elválasztott modulnevek (alap: OSINT_MODULES)")
+    p_submit.add_argument("--priority", type=int, default=0)
+    p_worker = sub.add_parser("worker", help="Worker(ek) indítása")
+    p_worker.add_argument("-j", "--processes", type=int, default=1)
+    p_worker.add_argument("--modules")
+    p_worker.add_argument("--once", action="store_true", help="Kilépés, ha a sor üres")
+    p_worker.add_argument("--results", default="results.db", help="Eredménytár (üres = nincs mentés)")
+    p_worker.add_argument("--batch", type=int, default=8, help="Egyszerre foglalt / együtt mentett feladatok")
+    sub.add_parser("status", help="Sor mélysége és worker ráták")
+    sub.add_parser("requeue-dead", help="Dead-letter feladatok újraindítása")
+    args = parser.parse_args()
+
+    queue = JobQueue(args.db, lease_seconds=args.lease, journal_mode=args.journal)
+    if args.command == "submit":
+        mods = args.modules.split(",") if args.modules else None
+        n = queue.submit(_expand_paths(args.paths), mods, args.priority)
+        print(f"{n} feladat beküldve")
+    elif args.command == "worker":
+        mods = args.modules.split(",") if args.modules else None
+        if args.processes <= 1:
+            Worker(queue, modules=mods, results_db=args.results or None,
+                   batch_size=args.batch).run(once=args.once)
+        else:
+            import multiprocessing
+
+            procs = [multiprocessing.Process(target=_worker_process,
+                                             args=(args.db, args.journal, args.lease, mods, args.once,
+                                                   args.results or None, i, args.batch))
+                     for i in range(args.processes)]
+            for p in procs:
+                p.start()
+            for p in procs:
+                p.join()
+    elif args.command == "requeue-dead":
+        print(f"{queue.requeue_dead()} feladat újra sorban")
+    else:
+        st = queue.status()
+        print("  ".join(f"{k}: {v}" for k, v in st["depth"].items()))
+        for w in st["workers"]:
+            state = "él" if w["alive"] else "halott"
+            print(f"{w['worker_id']:32s} {state:6s} kész {w['jobs_done']:7d}  hiba {w['jobs_failed']:5d}  "
+                  f"{w['rate_per_s']:7.2f}/s  kihasználtság {w['utilization'] * 100:5.1f}%")
@@ -1,13 +1,24 @@
 from PIL.ExifTags import TAGS, GPSTAGS
-from PIL import Image, ImageTk
+from PIL import Image, ImageOps, ImageTk
 import hashlib
 import time
 import numpy as np
 import json
 import os
 
-def exif_reading(self, image_path, json_path="exif_results.json"):
-    """EXIF + kiterjesztett metaellenőrzés"""
+from algorithms.phash import dhash, phash, to_hex, get_store
+from algorithms.geoindex import get_index
+
+PRNU_CHUNK_ROWS = 256   # a zajminta soronkénti blokkokban, teljes float32 másolat nélkül
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def exif_reading(self, image_path, json_path="exif_results.json", index_db_path="results.db", gray=None):
+    """EXIF + kiterjesztett metaellenőrzés
+    gray: már dekódolt szürke kép (uint8), pl. a streaming pipeline-ból - ilyenkor a PIL csak a
+    fejlécet / EXIF-et olvassa, a pixeleket nem dekódolja újra. A cv2.imread az EXIF forgatást
+    alkalmazza, ezért a PIL úton is elforgatott képből számolunk (azonos hash mindkét úton)
+    json_path: None esetén nincs JSON mentés (a kötegelt utak az eredménytárba mentenek)"""
     try:
         self.log("info", "EXIF", f"EXIF/meta ellenőrzés: {image_path}")
 
@@ -56,10 +67,12 @@ def exif_reading(self, image_path, json_path="exif_results.json"):
 
         # --- File hash + fingerprint ---
         self.log("info", "FINGERPRINT", "Ujjlegyomatok elemzése")
+        md5_h, sha256_h = hashlib.md5(), hashlib.sha256()
         with open(image_path, "rb") as f:
-            file_bytes = f.read()
-            md5 = hashlib.md5(file_bytes).hexdigest()
-            sha256 = hashlib.sha256(file_bytes).hexdigest()
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                md5_h.update(chunk)
+                sha256_h.update(chunk)
+        md5, sha256 = md5_h.hexdigest(), sha256_h.hexdigest()
         result["fingerprints"]["md5"] = md5
         result["fingerprints"]["sha256"] = sha256
         self.log("success", "HASH", f"MD5: {md5}, SHA256: {sha256}")
@@ -70,31 +83,59 @@ def exif_reading(self, image_path, json_path="exif_results.json"):
             self.log("success", "JPEG", f"Kvantizációs táblák kinyerve: {len(img.quantization)} darab")
 
         # --- PRNU zajminta ---
+        gray_u8 = gray if gray is not None else np.asarray(ImageOps.exif_transpose(img.convert("L")))
         try:
-            gray = np.array(img.convert("L"), dtype=np.float32)
-            noise = gray - np.mean(gray)
-            prnu_signature = np.mean(noise)
+            mean = np.float32(gray_u8.mean(dtype=np.float64))
+            total = 0.0
+            for r in range(0, gray_u8.shape[0], PRNU_CHUNK_ROWS):
+                block = gray_u8[r:r + PRNU_CHUNK_ROWS].astype(np.float32)
+                total += float((block - mean).sum(dtype=np.float64))
+            prnu_signature = total / gray_u8.size
             result["fingerprints"]["prnu_signature"] = float(prnu_signature)
             self.log("success", "PRNU", f"Zaj aláírás (átlag): {prnu_signature:.6f}")
         except Exception as e:
             self.log("warning", "PRNU", f"Nem sikerült zajminta: {e}")
 
-
-        # --- JSON mentés ---
+        # --- Perceptuális hash + közel-duplikátumok ---
         try:
-            with open(json_path, "r", encoding="utf-8") as f:
-                content = f.read().strip()
-                if content:
-                    all_results = json.loads(content)
-                else:
-                    all_results = []
-        except FileNotFoundError:
-            all_results = []
+            dh, ph = dhash(gray_u8), phash(gray_u8)
+            result["fingerprints"]["dhash"] = to_hex(dh)
+            result["fingerprints"]["phash"] = to_hex(ph)
+            self.log("success", "PHASH", f"dHash: {to_hex(dh)}, pHash: {to_hex(ph)}")
+
+            store = get_store(index_db_path)
+            for dup in store.near_duplicates(ph, "phash", exclude=sha256):
+                self.log("warning", "PHASH", f"Közel-duplikátum: {dup['image']} (távolság: {dup['distance']})")
+            store.add(sha256, os.path.basename(image_path), dh, ph)
+        except Exception as e:
+            self.log("warning", "PHASH", f"Nem sikerült perceptuális hash: {e}")
 
+        # --- GPS térbeli index ---
+        if result["gps"]:
+            try:
+                get_index(index_db_path).add(sha256, os.path.basename(image_path),
+                                             result["gps"]["latitude"], result["gps"]["longitude"])
+            except Exception as e:
+                self.log("warning", "GPS", f"Nem sikerült a térbeli indexelés: {e}")
 
-        all_results.append(result)
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(all_results, f, indent=4, ensure_ascii=False)
+        # --- JSON mentés ---
+        if json_path:
+            try:
+                with open(json_path, "r", encoding="utf-8") as f:
+                    content = f.read().strip()
+                    if content:
+                        all_results = json.loads(content)
+                    else:
+                        all_results = []
+            except FileNotFoundError:
+                all_results = []
+
+
+            all_results.append(result)
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(all_results, f, indent=4, ensure_ascii=False)
+
+        return result
 
     except Exception as e:
         self.log("error", "EXIF", f"Hiba: {str(e)}")
@@ -0,0 +1,244 @@
+import sqlite3
+import threading
+from array import array
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# ============ PERCEPTUÁLIS HASH-EK ============
+
+HASH_BITS = 64
+
+
+def _block_mean(gray: np.ndarray, out_h: int, out_w: int) -> np.ndarray:
+    """Területátlagolt lekicsinyítés (out_h x out_w) tisztán numpy-val,
+    a már dekódolt szürkeárnyalatos tömbből."""
+    h, w = gray.shape[:2]
+    if h < out_h or w < out_w:
+        # Túl kicsi kép: legközelebbi szomszéd mintavétel
+        rows = (np.arange(out_h) * h // out_h).astype(np.intp)
+        cols = (np.arange(out_w) * w // out_w).astype(np.intp)
+        return gray[rows][:, cols].astype(np.float64)
+
+    row_edges = np.linspace(0, h, out_h + 1).astype(np.intp)
+    col_edges = np.linspace(0, w, out_w + 1).astype(np.intp)
+    sums = np.add.reduceat(gray, row_edges[:-1], axis=0, dtype=np.float64)
+    sums = np.add.reduceat(sums, col_edges[:-1], axis=1)
+    counts = np.outer(np.diff(row_edges), np.diff(col_edges))
+    return sums / counts
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.ravel().astype(np.uint8)).tobytes(), "big")
+
+
+def dhash(gray: np.ndarray) -> int:
+    """Különbség-hash (dHash): 9x8-as kicsinyítés, szomszédos pixelek összehasonlítása."""
+    small = _block_mean(gray, 8, 9)
+    return _bits_to_int(small[:, 1:] > small[:, :-1])
+
+
+_DCT_CACHE: Dict[int, np.ndarray] = {}
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """DCT-II bázismátrix (n x n), cache-elve."""
+    mat = _DCT_CACHE.get(n)
+    if mat is None:
+        k = np.arange(n)[:, None]
+        i = np.arange(n)[None, :]
+        mat = np.cos(np.pi * (2 * i + 1) * k / (2.0 * n)) * np.sqrt(2.0 / n)
+        mat[0, :] /= np.sqrt(2.0)
+        _DCT_CACHE[n] = mat
+    return mat
+
+
+def phash(gray: np.ndarray) -> int:
+    """DCT alapú perceptuális hash (pHash): 32x32 kicsinyítés, 2D DCT mátrixszorzással,
+    a bal felső 8x8 alacsony frekvenciás blokk a mediánhoz hasonlítva (DC nélkül)."""
+    small = _block_mean(gray, 32, 32)
+    dct = _dct_matrix(32)
+    coeffs = (dct @ small @ dct.T)[:8, :8]
+    median = np.median(coeffs.ravel()[1:])
+    return _bits_to_int(coeffs > median)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def to_hex(h: int) -> str:
+    return f"{h:016x}"
+
+
+# ============ HAMMING-TÉR INDEX (MULTI-INDEX HASHING) ============
+
+class HammingIndex:
+    """Multi-index hashing: a 64 bites hash-t `chunks` darab szeletre bontjuk,
+    szeletenként külön hash-táblával. Skatulyaelv: ha két hash távolsága <= r,
+    akkor legalább egy szeletük távolsága <= r // chunks, így elég a szeletek
+    kis sugarú szomszédságát végigjárni. Inkrementálisan bővíthető."""
+
+    def __init__(self, bits: int = HASH_BITS, chunks: int = 4):
+        if bits % chunks:
+            raise ValueError("A bitszámnak oszthatónak kell lennie a szeletszámmal")
+        self.bits = bits
+        self.chunks = chunks
+        self.chunk_bits = bits // chunks
+        self._mask = (1 << self.chunk_bits) - 1
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in range(chunks)]
+        self._hashes = array("Q")
+        self._keys: List[str] = []
+        self._flip_cache: Dict[int, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _split(self, h: int) -> List[int]:
+        return [(h >> (i * self.chunk_bits)) & self._mask for i in range(self.chunks)]
+
+    def _flip_masks(self, radius: int) -> List[int]:
+        """Az összes legfeljebb `radius` bitet átbillentő maszk egy szeleten belül."""
+        masks = self._flip_cache.get(radius)
+        if masks is None:
+            masks = [0]
+            for r in range(1, radius + 1):
+                for combo in combinations(range(self.chunk_bits), r):
+                    m = 0
+                    for bit in combo:
+                        m |= 1 << bit
+                    masks.append(m)
+            self._flip_cache[radius] = masks
+        return masks
+
+    def add(self, key: str, h: int) -> None:
+        idx = len(self._keys)
+        self._keys.append(key)
+        self._hashes.append(h)
+        for table, part in zip(self._tables, self._split(h)):
+            table.setdefault(part, []).append(idx)
+
+    def add_many(self, items: Iterable[Tuple[str, int]]) -> None:
+        for key, h in items:
+            self.add(key, h)
+
+    def query(self, h: int, max_distance: int = 8) -> List[Tuple[int, str]]:
+        """Az összes legfeljebb `max_distance` Hamming-távolságú elem, távolság szerint rendezve."""
+        sub_radius = max_distance // self.chunks
+        masks = self._flip_masks(sub_radius)
+        seen = set()
+        found = []
+        for table, part in zip(self._tables, self._split(h)):
+            for m in masks:
+                bucket = table.get(part ^ m)
+                if not bucket:
+                    continue
+                for idx in bucket:
+                    if idx in seen:
+                        continue
+                    seen.add(idx)
+                    d = hamming(h, self._hashes[idx])
+                    if d <= max_distance:
+                        found.append((d, self._keys[idx]))
+        found.sort()
+        return found
+
+
+# ============ PERZISZTENS TÁROLÓ ============
+
+class PerceptualHashStore:
+    """dHash/pHash tároló SQLite-ban, memóriabeli Hamming-indexekkel.
+    Az indexek induláskor töltődnek be, utána inkrementálisan bővülnek: a saját beszúrások
+    azonnal, a más folyamatok (jobqueue workerek, pipeline) által beszúrt sorok lekérdezés
+    előtt, rowid vízjel alapján."""
+
+    def __init__(self, db_path: str = "results.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS image_hashes (
+                                sha256 TEXT PRIMARY KEY,
+                                image TEXT,
+                                dhash TEXT,
+                                phash TEXT
+                            )""")
+        self._conn.commit()
+        self.indexes = {"dhash": HammingIndex(), "phash": HammingIndex()}
+        self._images: Dict[str, str] = {}
+        self._watermark = 0
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self) -> None:
+        """A vízjel óta (más folyamatból is) beszúrt sorok felvétele az indexekbe; _lock alatt"""
+        rows = self._conn.execute("""SELECT rowid, sha256, image, dhash, phash FROM image_hashes
+                                     WHERE rowid > ? ORDER BY rowid""", (self._watermark,)).fetchall()
+        for rowid, sha256, image, dh, ph in rows:
+            if sha256 not in self._images:
+                self._index(sha256, image, int(dh, 16), int(ph, 16))
+            self._watermark = rowid
+
+    def _index(self, sha256: str, image: str, dh: int, ph: int) -> None:
+        self._images[sha256] = image
+        self.indexes["dhash"].add(sha256, dh)
+        self.indexes["phash"].add(sha256, ph)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._images)
+
+    def __contains__(self, sha256: str) -> bool:
+        with self._lock:
+            self._refresh()
+            return sha256 in self._images
+
+    def add(self, sha256: str, image: str, dh: int, ph: int) -> bool:
+        """Egy kép felvétele. False, ha a (bájtra azonos) kép már szerepel."""
+        return self.add_many([(sha256, image, dh, ph)]) == 1
+
+    def add_many(self, rows: Iterable[Tuple[str, str, int, int]]) -> int:
+        """Kötegelt beszúrás egyetlen tranzakcióban (batch futásokhoz)."""
+        with self._lock:
+            self._refresh()
+            new_rows = []
+            for sha256, image, dh, ph in rows:
+                if sha256 in self._images:
+                    continue
+                self._index(sha256, image, dh, ph)
+                new_rows.append((sha256, image, to_hex(dh), to_hex(ph)))
+            if new_rows:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO image_hashes VALUES (?, ?, ?, ?)", new_rows)
+            return len(new_rows)
+
+    def near_duplicates(self, h: int, kind: str = "phash", max_distance: int = 8,
+                        exclude: Optional[str] = None) -> List[Dict]:
+        """A megadott hash közel-duplikátumai: [{"sha256", "image", "distance"}, ...]"""
+        with self._lock:
+            self._refresh()
+            hits = self.indexes[kind].query(h, max_distance)
+            return [
+                {"sha256": key, "image": self._images[key], "distance": d}
+                for d, key in hits if key != exclude
+            ]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_STORES: Dict[str, PerceptualHashStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_store(db_path: str = "results.db") -> PerceptualHashStore:
+    """Folyamatonként egy megosztott tároló adatbázisonként."""
+    with _STORES_LOCK:
+        store = _STORES.get(db_path)
+        if store is None:
+            store = _STORES[db_path] = PerceptualHashStore(db_path)
+        return store
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+PIPELINE.PY - Memóriakorlátos streaming feldolgozás sok (nagy) képre
+
+Minden kép egyszer dekódolódik; a modulok közös tömböket kapnak (BGR és a belőle
+számolt szürke kép), referenciaszámlálással: egy tömb az utolsó őt használó modul
+után azonnal felszabadul. Új kép csak akkor kerül feldolgozásra, ha a becsült
+memóriaigénye (a fejlécből, dekódolás előtt) belefér a keretbe (bájt és/vagy
+megapixel) - különben a beolvasás vár (backpressure). Ha semmi sincs folyamatban,
+a keretnél nagyobb kép is bekerül, egyedül, így a pipeline nem akad el.
+
+Használat:
+    python -m algorithms.pipeline <kép|könyvtár> [...] [--max-mb 512] [--max-mpx 100]
+                                  [--workers 2] [--modules meta,haar] [--db results.db]
+"""
+
+import os
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from algorithms.registry import OSINT_MODULES, get
+from algorithms.tracing import span
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+# Modul -> (közös tömb, kulcsszavas paraméter, amin át megkapja)
+MODULE_INPUTS: Dict[str, Tuple[str, str]] = {
+    "meta": ("gray", "gray"),
+    "haar": ("gray", "image"),
+    "plate_rec": ("bgr", "image"),
+    "shadowcalc": ("gray", "image"),
+}
+ARTIFACT_CHANNELS = {"bgr": 3, "gray": 1}
+# A modulok saját munkamemóriája (szűrt, átméretezett másolatok) a BGR kép méretének arányában
+WORK_FACTOR = 1.0
+
+
+# ============ MEMÓRIAKERET ============
+
+class MemoryBudget:
+    """Folyamatban lévő bájtok és megapixelek számlálója beengedés-vezérléssel.
+    max_bytes / max_megapixels: None = nincs korlát az adott dimenzióban."""
+
+    def __init__(self, max_bytes: Optional[int] = None, max_megapixels: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.max_megapixels = max_megapixels
+        self._cond = threading.Condition()
+        self.current_bytes = 0
+        self.current_mpx = 0.0
+        self.peak_bytes = 0
+        self.peak_mpx = 0.0
+        self.in_flight = 0
+        self.admitted = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    def _fits(self, nbytes: int, mpx: float) -> bool:
+        if self.in_flight == 0:
+            return True
+        if self.max_bytes is not None and self.current_bytes + nbytes > self.max_bytes:
+            return False
+        if self.max_megapixels is not None and self.current_mpx + mpx > self.max_megapixels:
+            return False
+        return True
+
+    def acquire(self, nbytes: int, mpx: float, timeout: Optional[float] = None) -> bool:
+        """Egy kép beengedése; blokkol, amíg a keret engedi. False: lejárt a timeout."""
+        with self._cond:
+            if not self._fits(nbytes, mpx):
+                self.waits += 1
+                t0 = time.perf_counter()
+                ok = self._cond.wait_for(lambda: self._fits(nbytes, mpx), timeout)
+                self.wait_seconds += time.perf_counter() - t0
+                if not ok:
+                    return False
+            self.in_flight += 1
+            self.admitted += 1
+            self._charge(nbytes, mpx)
+            return True
+
+    def _charge(self, nbytes: int, mpx: float) -> None:
+        self.current_bytes += nbytes
+        self.current_mpx += mpx
+        self.peak_bytes = max(self.peak_bytes, self.current_bytes)
+        self.peak_mpx = max(self.peak_mpx, self.current_mpx)
+
+    def adjust(self, nbytes: int) -> None:
+        """A becsült foglalás korrigálása a ténylegesre (dekódolás után); lehet negatív"""
+        with self._cond:
+            self._charge(nbytes, 0.0)
+            if nbytes < 0:
+                self._cond.notify_all()
+
+    def release(self, nbytes: int, mpx: float = 0.0, done: bool = False) -> None:
+        """Részleges felszabadítás (egy tömb), done=True: a kép teljesen kész"""
+        with self._cond:
+            self.current_bytes -= nbytes
+            self.current_mpx -= mpx
+            if done:
+                self.in_flight -= 1
+            self._cond.notify_all()
+
+    def metrics(self) -> Dict[str, float]:
+        with self._cond:
+            return {
+                "current_bytes": self.current_bytes,
+                "peak_bytes": self.peak_bytes,
+                "current_mpx": round(self.current_mpx, 3),
+                "peak_mpx": round(self.peak_mpx, 3),
+                "in_flight": self.in_flight,
+                "admitted": self.admitted,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 3),
+            }
+
+
+# ============ PIPELINE ============
+
+def image_size(image_path: str) -> Optional[Tuple[int, int]]:
+    """(szélesség, magasság) a fejlécből, dekódolás nélkül; None, ha a PIL nem ismeri"""
+    from PIL import Image
+
+    try:
+        with Image.open(image_path) as im:
+            return im.size
+    except Exception:
+        return None
+
+
+class StreamingPipeline:
+    """Képfolyam feldolgozása memóriakerettel.
+    modules: a futtatandó modulok (alap: OSINT_MODULES); amelyik nincs a MODULE_INPUTS-ban,
+    a szokásos módon, útvonalból fut (saját dekódolással).
+    max_bytes / max_megapixels: a folyamatban lévő képek kerete; workers: párhuzamos képek száma.
+    store: ResultStore; az eredmények save_batch képenként egy tranzakcióban mentődnek
+    (a hibás, None eredményű modulok nélkül)."""
+
+    def __init__(self, modules: Optional[Sequence[str]] = None, max_bytes: Optional[int] = 512 << 20,
+                 max_megapixels: Optional[float] = None, workers: int = 2, log_func=None, store=None,
+                 save_batch: int = 100):
+        self.modules = tuple(modules or OSINT_MODULES)
+        self.budget = MemoryBudget(max_bytes, max_megapixels)
+        self.workers = max(1, workers)
+        self.log_func = log_func or (lambda *a: None)
+        self.store = store
+        self.save_batch = max(1, save_batch)
+        self._save_rows: list = []
+        self._save_lock = threading.Lock()
+        self.needs = Counter(MODULE_INPUTS[m][0] for m in self.modules if m in MODULE_INPUTS)
+        self.processed = 0
+        self.failed = 0
+
+    def estimate(self, image_path: str) -> Tuple[int, float]:
+        """Becsült (bájt, megapixel) igény: a közös tömbök + a modulok munkamemóriája"""
+        size = image_size(image_path)
+        if size is None:
+            # Ismeretlen formátum: tömörített méret x10 durva becslés
+            nbytes = os.path.getsize(image_path) * 10
+            return nbytes, nbytes / 4e6
+        pixels = size[0] * size[1]
+        channels = sum(ARTIFACT_CHANNELS[a] for a in self.needs) or ARTIFACT_CHANNELS["bgr"]
+        if "gray" in self.needs and "bgr" not in self.needs:
+            channels += ARTIFACT_CHANNELS["bgr"]  # a szürke is a BGR dekódolásból készül
+        return int(pixels * (channels + 3 * WORK_FACTOR)), pixels / 1e6
+
+    def _run_module(self, name: str, image_path: str, artifacts: Dict[str, np.ndarray]):
+        kwargs = {}
+        if name in MODULE_INPUTS:
+            artifact, param = MODULE_INPUTS[name]
+            kwargs[param] = artifacts[artifact]
+        with span(f"pipeline:{name}", file=image_path):
+            return get(name).run(image_path, log_func=self.log_func, **kwargs)
+
+    def process(self, image_path: str, reserved: int, mpx: float) -> Dict[str, object]:
+        """Egy (már beengedett) kép: dekódolás, modulok, tömbök felszabadítása az utolsó fogyasztó után"""
+        results: Dict[str, object] = {}
+        artifacts: Dict[str, np.ndarray] = {}
+        refs = Counter(self.needs)
+        try:
+            if refs:
+                with span("pipeline:decode", file=image_path):
+                    bgr = cv2.imread(image_path, cv2.IMREAD_COLOR)
+                if bgr is None:
+                    raise ValueError(f"Nem sikerült betölteni a képet: {image_path}")
+                artifacts["bgr"] = bgr
+                if refs["gray"]:
+                    artifacts["gray"] = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+                del bgr
+                # Foglalás: becslés helyett a tényleges tömbméretek + munkamemória
+                actual = sum(a.nbytes for a in artifacts.values())
+                work = int(artifacts["bgr"].nbytes * WORK_FACTOR)
+                self.budget.adjust(actual + work - reserved)
+                reserved = actual + work
+                if not refs["bgr"]:
+                    reserved -= artifacts["bgr"].nbytes
+                    self.budget.release(artifacts.pop("bgr").nbytes)
+
+            for name in self.modules:
+                try:
+                    results[name] = self._run_module(name, image_path, artifacts)
+                except Exception as e:
+                    results[name] = None
+                    self.log_func("error", "PIPELINE", f"{name} hiba ({os.path.basename(image_path)}): {e}")
+                if name in MODULE_INPUTS:
+                    artifact = MODULE_INPUTS[name][0]
+                    refs[artifact] -= 1
+                    if refs[artifact] == 0:
+                        nbytes = artifacts.pop(artifact).nbytes
+                        reserved -= nbytes
+                        self.budget.release(nbytes)
+        finally:
+            artifacts.clear()
+            self.budget.release(reserved, mpx, done=True)
+
+        if self.store is not None:
+            from algorithms.resultstore import file_sha256
+
+            row = (file_sha256(image_path), image_path, results)
+            with self._save_lock:
+                self._save_rows.append(row)
+                full = len(self._save_rows) >= self.save_batch
+            if full:
+                self.flush()
+        return results
+
+    def flush(self) -> None:
+        """A gyűjtött eredmények mentése egy tranzakcióban"""
+        with self._save_lock:
+            rows, self._save_rows = self._save_rows, []
+        if rows:
+            self.store.save_many(rows)
+
+    def _guarded(self, image_path: str, reserved: int, mpx: float):
+        try:
+            results = self.process(image_path, reserved, mpx)
+            self.processed += 1
+            return results
+        except Exception as e:
+            self.failed += 1
+            self.log_func("error", "PIPELINE", str(e))
+            return None
+
+    def run(self, paths: Iterable[str]) -> Iterator[Tuple[str, Optional[Dict[str, object]]]]:
+        """(útvonal, {modul: eredmény}) párok a bemenet sorrendjében. A paths lehet lusta
+        iterátor is: a következő kép csak akkor olvasódik be, ha a keret engedi."""
+        pending = deque()
+        try:
+            yield from self._run(paths, pending)
+        finally:
+            if self.store is not None:
+                self.flush()
+
+    def _run(self, paths: Iterable[str], pending: deque):
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for path in paths:
+                try:
+                    nbytes, mpx = self.estimate(path)
+                except OSError as e:
+                    self.failed += 1
+                    self.log_func("error", "PIPELINE", str(e))
+                    yield path, None
+                    continue
+                # Legfeljebb két kép várakozzon munkaszálanként (a kerettől függetlenül is)
+                while len(pending) >= 2 * self.workers:
+                    done_path, future = pending.popleft()
+                    yield done_path, future.result()
+                self.budget.acquire(nbytes, mpx)
+                pending.append((path, pool.submit(self._guarded, path, nbytes, mpx)))
+                while pending and pending[0][1].done():
+                    done_path, future = pending.popleft()
+                    yield done_path, future.result()
+            while pending:
+                done_path, future = pending.popleft()
+                yield done_path, future.result()
+
+    def metrics(self) -> Dict[str, float]:
+        """Pillanatnyi és csúcs memóriahasználat, várakozások, feldolgozott képek"""
+        m = self.budget.metrics()
+        m["processed"] = self.processed
+        m["failed"] = self.failed
+        return m
+
+
+def iter_images(sources: Iterable[str]) -> Iterator[str]:
+    """Fájlok és könyvtárak (rekurzívan) képfájljai, lustán"""
+    for source in sources:
+        if os.path.isdir(source):
+            for dirpath, _, names in os.walk(source):
+                for name in sorted(names):
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        yield os.path.join(dirpath, name)
+        else:
+            yield source
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Memóriakorlátos streaming képfeldolgozás")
+    parser.add_argument("sources", nargs="+", help="Képfájlok vagy könyvtárak")
+    parser.add_argument("--max-mb", type=float, default=512, help="Memóriakeret (MB, 0 = nincs)")
+    parser.add_argument("--max-mpx", type=float, default=0, help="Megapixel-keret (0 = nincs)")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--modules", help="Vesszővel elválasztott modulnevek (alap: OSINT_MODULES)")
+    parser.add_argument("--db", help="Eredménytár (results.db); megadva az eredmények mentődnek")
+    args = parser.parse_args()
+
+    store = None
+    if args.db:
+        from algorithms.resultstore import get_store
+
+        store = get_store(args.db)
+    pipeline = StreamingPipeline(args.modules.split(",") if args.modules else None,
+                                 max_bytes=int(args.max_mb * (1 << 20)) or None,
+                                 max_megapixels=args.max_mpx or None, workers=args.workers,
+                                 log_func=lambda t, s, m: print(f"[{s}] {m}") if t == "error" else None,
+                                 store=store)
+    for path, results in pipeline.run(iter_images(args.sources)):
+        status = "hiba" if results is None else ", ".join(k for k, v in results.items() if v is not None)
+        print(f"{path}: {status}")
+    print(json.dumps(pipeline.metrics(), indent=2))
@@ -1,10 +1,18 @@
+import heapq
 import os
 import re
+import threading
+import time
 import cv2
 import numpy as np
 import sqlite3
 import pytesseract
 
+from algorithms.tracing import span
+from algorithms.deadline import Deadline
+from algorithms.haarfeatures import load_cascade
+from algorithms.country_code import classify_country_code, EU_COUNTRY_CODES
+
 
 # EasyOCR reader egyszeri inicializálás
 
@@ -64,6 +72,35 @@ def correct_plate(text):
     plate_number = ''.join(c for c in plate_number if c in valid_chars)
     return plate_number, country_code
 
+# Rendszám-nyelvtan (kötőjel nélkül): ha egy OCR eredmény illeszkedik, a további
+# OCR hívások kihagyhatók
+PLATE_GRAMMAR = [
+    re.compile(r'^[A-Z]{3}\d{3}$'),               # HU: ABC-123
+    re.compile(r'^[A-Z]{4}\d{3}$'),               # HU (2022-): AA-AA-123
+    re.compile(r'^[A-Z]{1,3}[A-Z]{1,2}\d{1,4}[EH]?$'),  # DE: B-AB-1234
+    re.compile(r'^[A-Z]{1,3}\d{2,5}[A-Z]{0,3}$'),  # AT, SK, CZ, PL, ...
+    re.compile(r'^\d{1,3}[A-Z]{1,3}\d{1,4}$'),     # CZ, FR régi
+]
+
+
+# Korai kilépés (további OCR konfigurációk / jelöltek kihagyása) csak ennyi karakter felett:
+# a nyelvtan a rövid, csonka olvasatokat (pl. "A12") is elfogadná
+MIN_PLATE_CHARS = 5
+
+
+def matches_plate_grammar(text):
+    if not text:
+        return False
+    text = text.replace("-", "")
+    return any(p.match(text) for p in PLATE_GRAMMAR)
+
+
+def is_full_plate_read(text, country_code=None):
+    """Nyelvtanra illeszkedő és legalább MIN_PLATE_CHARS karakteres olvasat: erre már szabad
+    korán kilépni (a csonka olvasat miatt nem maradnak ki a további OCR hívások / jelöltek)"""
+    return (sum(c.isalnum() for c in text or "") >= MIN_PLATE_CHARS
+            and matches_plate_grammar((country_code or "") + (text or "")))
+
 # ------------------------------
 # ELŐFELDOLGOZÁS OCR-HEZ
 # ------------------------------
@@ -81,7 +118,38 @@ def preprocess_plate(plate_img):
 # ------------------------------
 # MULTI-OCR FUNKCIÓ
 # ------------------------------
-def ocr_multi_method(plate_img):
+# Egy Tesseract hívás mért ideje (mozgóátlag, mp): időkeretnél nem indítunk olyan hívást,
+# ami már biztosan nem férne bele. A worker szálak közösen frissítik, ezért zárral.
+_TESSERACT_SECONDS = [0.1]
+_TESSERACT_LOCK = threading.Lock()
+
+
+def _tesseract_fits(deadline):
+    """Belefér-e még egy Tesseract hívás az időkeretbe (None = korlátlan)"""
+    return deadline is None or deadline.remaining() >= _TESSERACT_SECONDS[0]
+
+
+def _record_tesseract(seconds):
+    with _TESSERACT_LOCK:
+        _TESSERACT_SECONDS[0] = 0.8 * _TESSERACT_SECONDS[0] + 0.2 * seconds
+
+
+def _tesseract_read(processed, config):
+    """Egy Tesseract futás szövege és átlagos szó-konfidenciája (0..1, None ha nincs szó).
+    Az image_to_data ugyanazt a felismerést adja, mint az image_to_string, a konfidenciával együtt."""
+    data = pytesseract.image_to_data(processed, config=config, output_type=pytesseract.Output.DICT)
+    words, confs = [], []
+    for word, conf in zip(data["text"], data["conf"]):
+        if str(word).strip() and float(conf) >= 0:
+            words.append(str(word).strip())
+            confs.append(float(conf) / 100.0)
+    text = "".join(words).upper()
+    return text, (sum(confs) / len(confs) if confs else None)
+
+
+def ocr_multi_method(plate_img, deadline=None, with_confidence=False):
+    """deadline: ha a hátralévő idő kevesebb egy Tesseract hívásnál, a további konfigurációk kimaradnak
+    with_confidence: (rendszám, országkód, konfidencia) hármast ad vissza"""
     candidates = []
 
     # Tesseract
@@ -92,55 +160,156 @@ def ocr_multi_method(plate_img):
         r'--oem 3 --psm 13 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-'
     ]
     for config in configs:
-        text = pytesseract.image_to_string(processed, config=config).strip().upper().replace(" ", "")
-        if text: candidates.append(text)
+        if not _tesseract_fits(deadline):
+            break
+        t0 = time.perf_counter()
+        with span("plate:tesseract", config=config.split(" -c")[0]):
+            text, conf = _tesseract_read(processed, config)
+        _record_tesseract(time.perf_counter() - t0)
+        if text: candidates.append((text, conf))
+        if is_full_plate_read(text):
+            return correct_plate(text) + ((conf,) if with_confidence else ())
 
 
-    best_text = ""
-    for text in candidates:
+    best_text, best_conf = "", None
+    for text, conf in candidates:
         if sum(c.isalnum() for c in text) > sum(c.isalnum() for c in best_text):
-            best_text = text
+            best_text, best_conf = text, conf
 
-    return correct_plate(best_text)
+    return correct_plate(best_text) + ((best_conf,) if with_confidence else ())
 
 # ------------------------------
 # RENDSZÁM DETEKTÁLÁS
 # ------------------------------
-def detect_plates_simple(img):
+# Jelölt-keresés skálái: a 2x nagyítás a kicsi, távoli rendszámokhoz kell
+PLATE_SCALES = (1.0, 2.0)
+
+
+def _iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+
+def score_plate_candidate(gray, edges, box):
+    """Olcsó pontszám (0..1) egy téglalapra OCR előtt: élsűrűség, karakter-szerű
+    összefüggő komponensek száma és kontraszt"""
+    x, y, w, h = box
+    roi = gray[y:y+h, x:x+w]
+    if roi.size == 0:
+        return 0.0
+    # Rendszámon a betűk miatt sok él van, de nem annyi, mint zajos textúrán
+    density = np.count_nonzero(edges[y:y+h, x:x+w]) / float(w * h)
+    edge_score = min(density / 0.12, 1.0) if density <= 0.4 else max(0.0, 1.0 - (density - 0.4) / 0.3)
+    contrast_score = min(float(roi.std()) / 60.0, 1.0)
+
+    _, binary = cv2.threshold(roi, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    cw, ch = stats[1:, cv2.CC_STAT_WIDTH], stats[1:, cv2.CC_STAT_HEIGHT]
+    chars = np.count_nonzero((ch >= 0.3 * h) & (ch <= 0.95 * h) & (cw >= 0.02 * w) & (cw <= 0.2 * w)
+                             & (cw <= ch * 1.2))
+    char_score = min(chars, 6) / 6.0 if chars >= 2 else 0.0
+
+    return 0.45 * char_score + 0.3 * edge_score + 0.25 * contrast_score
+
+
+def rank_plate_candidates(img, cascade=None, top_k=5, scales=(1.0,), min_score=0.15, deadline=None):
+    """Rendszám-jelöltek pontozva, csökkenő sorrendben: [(pontszám, kontúr), ...].
+    Minden skálán minden négyszög kontúr jelölt (nem csak a 10 legnagyobb), a pontozás
+    olcsó, a teljes rendezés helyett részleges kiválasztás (heapq.nlargest) + átfedés-szűrés.
+    A kaszkád találatai (ha van) a lista elejére kerülnek.
+    deadline: lejárta után a további (nagyított, drága) skálák kimaradnak"""
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    gray = cv2.bilateralFilter(gray, 11, 17, 17)
-    edged = cv2.Canny(gray, 30, 200)
-    contours, _ = cv2.findContours(edged, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
-    contours = sorted(contours, key=cv2.contourArea, reverse=True)[:10]
-
-    plate_contours = []
-    for contour in contours:
-        peri = cv2.arcLength(contour, True)
-        approx = cv2.approxPolyDP(contour, 0.02 * peri, True)
-        if len(approx) == 4:
+    img_h, img_w = gray.shape[:2]
+    scored = []
+
+    if cascade is not None:
+        edges = cv2.Canny(cv2.bilateralFilter(gray, 11, 17, 17), 30, 200)
+        for (x, y, w, h) in cascade.detect(gray):
+            score = 1.0 + score_plate_candidate(gray, edges, (x, y, w, h))
+            scored.append((score, (int(x), int(y), int(w), int(h)), None))
+
+    base_smooth = cv2.bilateralFilter(gray, 11, 17, 17)
+    for i, scale in enumerate(scales):
+        if i and deadline is not None and deadline.expired():
+            break
+        # A bilaterális szűrő drága: egyszer futtatjuk, a többi skála ennek átméretezése
+        if scale == 1.0:
+            g, smooth = gray, base_smooth
+        else:
+            g = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+            smooth = cv2.resize(base_smooth, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+        edges = cv2.Canny(smooth, 30, 200)
+        contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+        for contour in contours:
             x, y, w, h = cv2.boundingRect(contour)
-            aspect_ratio = w / h
-            if 2.0 <= aspect_ratio <= 5.0:
-                plate_contours.append(approx)
-    return plate_contours
+            if w < 40 or h < 10 or not (2.0 <= w / h <= 5.0):
+                continue
+            peri = cv2.arcLength(contour, True)
+            approx = cv2.approxPolyDP(contour, 0.02 * peri, True)
+            if len(approx) != 4:
+                continue
+            score = score_plate_candidate(g, edges, (x, y, w, h))
+            if score < min_score:
+                continue
+            approx = np.round(approx / scale).astype(np.int32)
+            box = (int(round(x / scale)), int(round(y / scale)),
+                   min(int(round(w / scale)), img_w), min(int(round(h / scale)), img_h))
+            scored.append((score, box, approx))
+
+    # Részleges kiválasztás: csak a legjobb néhányat rendezzük, majd átfedés-szűrés
+    best = heapq.nlargest(top_k * 4, scored, key=lambda c: c[0])
+    ranked = []
+    for score, box, contour in best:
+        if any(_iou(box, kept_box) > 0.5 for _, kept_box, _ in ranked):
+            continue
+        if contour is None:
+            x, y, w, h = box
+            contour = np.array([[[x, y]], [[x + w, y]], [[x + w, y + h]], [[x, y + h]]], dtype=np.int32)
+        ranked.append((score, box, contour))
+        if len(ranked) >= top_k:
+            break
+    return [(score, contour) for score, _, contour in ranked]
+
+
+def detect_plates_simple(img, cascade=None, top_k=10, scales=(1.0,), deadline=None):
+    """Rendszám-jelöltek kontúrkereséssel, pontszám szerint rendezve (lásd rank_plate_candidates);
+    ha van betanított kaszkád (haarfeatures.HaarCascade), annak találatai is jelöltek
+    (négyszög kontúrként, a lista elején)"""
+    return [contour for _, contour in rank_plate_candidates(img, cascade, top_k=top_k, scales=scales,
+                                                            deadline=deadline)]
 
 def extract_plate(img, contour):
     x, y, w, h = cv2.boundingRect(contour)
     plate_img = img[y:y+h, x:x+w]
     return plate_img, (x, y, w, h)
 
-def enhance_country_code_detection(plate_img, initial_country_code):
+def enhance_country_code_detection(plate_img, initial_country_code, deadline=None):
     if initial_country_code:
         return initial_country_code
     try:
+        # Gyors út: kék sáv + sablon osztályozás, OCR csak végső tartalékként
+        with span("plate:blue_band"):
+            code, _ = classify_country_code(plate_img)
+        if code in EU_COUNTRY_CODES:
+            return code
         height, width = plate_img.shape[:2]
         regions = [plate_img[:, :width//4], plate_img[:, :width//3], plate_img[:, :width//2]]
         for region in regions:
+            if not _tesseract_fits(deadline):
+                return None
             gray = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY)
             gray = cv2.GaussianBlur(gray, (3, 3), 0)
             _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
             custom_config = r'--oem 3 --psm 10 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ'
-            text = pytesseract.image_to_string(thresh, config=custom_config).strip().upper()
+            t0 = time.perf_counter()
+            with span("plate:tesseract_country", width=region.shape[1]):
+                text = pytesseract.image_to_string(thresh, config=custom_config).strip().upper()
+            _record_tesseract(time.perf_counter() - t0)
             if text in ['H', 'D', 'A', 'I', 'F']:
                 return text
         return None
@@ -150,20 +319,66 @@ def enhance_country_code_detection(plate_img, initial_country_code):
 # ------------------------------
 # TELJES MULTI-OCR + SZIMULÁLT DB
 # ------------------------------
-def plate_recognition(image_path, log_func=None, *args, **kwargs):
+class PlateResults(list):
+    """A plate_recognition eredménylistája. complete=False, ha az időkeret (deadline)
+    lejárta miatt nem minden jelölt / finomítási lépés futott le."""
+    complete = True
+
+
+def _decode_for_plates(image_path, deadline):
+    """Kép betöltése. Időkerettel a nagy JPEG-et a dekóder eleve kicsinyítve olvassa
+    (a feldolgozás úgyis 1000 px szélességen fut). Visszatérés: (kép, eredeti szélesség)
+    Az eredeti szélesség az EXIF forgatás utáni (a cv2.imread is elforgatja a képet)."""
+    if deadline is None:
+        img = cv2.imread(image_path)
+        return img, (img.shape[1] if img is not None else 0)
+    from PIL import Image  # csak a fejlécet olvassa
+
+    with Image.open(image_path) as im:
+        width, height = im.size
+        if im.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+            width, height = height, width
+    for factor, flag in ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                         (2, cv2.IMREAD_REDUCED_COLOR_2), (1, cv2.IMREAD_COLOR)):
+        if factor == 1 or width / factor >= 1000:
+            img = cv2.imread(image_path, flag)
+            break
+    if img is not None and abs(img.shape[1] * factor - width) >= factor:
+        # A dekóder másképp forgatott, mint a fejléc alapján várható: a dekódolt méret a mérvadó
+        width = img.shape[1] * factor
+    return img, width
+
+
+def plate_recognition(image_path, log_func=None, *args, plate_cascade=None, top_k=5,
+                      scales=PLATE_SCALES, max_plates=None, deadline=None, image=None, **kwargs):
     """
     Teljesen offline, multi-OCR rendszám felismerés.
     log_func: külső logoló függvény (type, sender, message) paraméterekkel
+    plate_cascade: opcionális betanított rendszám-kaszkád (.npz útvonal vagy HaarCascade)
+    top_k: legfeljebb ennyi (pontszám szerint legjobb) jelölt megy OCR-re
+    scales: jelölt-keresés skálái (2.0 = kicsi, távoli rendszámok)
+    max_plates: ennyi teljes (is_full_plate_read) rendszám után az OCR leáll
+                (alap None = minden rendszám; késleltetés-érzékeny hívóknál pl. 1)
+    deadline: időkeret (mp vagy megosztott Deadline). Ilyenkor durva-finom sorrend: jelöltek
+              fél felbontáson, OCR a legjobbakon, majd finomítás teljes felbontáson és skálákon,
+              amíg a keret engedi. A visszaadott PlateResults.complete jelzi a teljességet.
+    image: már dekódolt BGR kép (pl. a streaming pipeline-ból); ilyenkor a fájl nem töltődik be
+    Visszatérés: PlateResults (rendszám nélküli képen üres), hiba esetén None.
     """
+    deadline = Deadline.coerce(deadline)
     try:
-        if not os.path.exists(image_path):
+        if image is None and not os.path.exists(image_path):
             if log_func:
                 log_func("error", "PLATE", f"A képfájl nem található: {image_path}")
             else:
                 print(f"[PLATE] A képfájl nem található: {image_path}")
             return None
         
-        img = cv2.imread(image_path)
+        if image is not None:
+            img, orig_width = image, image.shape[1]
+        else:
+            with span("plate:decode", file=image_path):
+                img, orig_width = _decode_for_plates(image_path, deadline)
         if img is None:
             if log_func:
                 log_func("error", "PLATE", "Nem sikerült betölteni a képet.")
@@ -174,33 +389,80 @@ def plate_recognition(image_path, log_func=None, *args, **kwargs):
         height, width = img.shape[:2]
         if width > 1000:
             img = cv2.resize(img, (1000, int(height * 1000 / width)))
+        scale = img.shape[1] / orig_width  # feldolgozott kép / eredeti kép
+        if isinstance(plate_cascade, str):
+            plate_cascade = load_cascade(plate_cascade)
+
+        results = PlateResults()
+        done_boxes = []
+        grammar_hits = 0
+
+        def recognize(contours):
+            """OCR a jelölteken rangsor szerint; False, ha az időkeret vagy a max_plates megállította"""
+            nonlocal grammar_hits
+            for contour in contours:
+                if max_plates and grammar_hits >= max_plates:
+                    return True
+                if not _tesseract_fits(deadline):
+                    return False
+                plate_img, (x, y, w, h) = extract_plate(img, contour)
+                if any(_iou((x, y, w, h), box) > 0.5 for box in done_boxes):
+                    continue
+                done_boxes.append((x, y, w, h))
+                with span("plate:ocr"):
+                    plate_text, country_code, confidence = ocr_multi_method(plate_img, deadline,
+                                                                            with_confidence=True)
+                if is_full_plate_read(plate_text, country_code):
+                    grammar_hits += 1
+                with span("plate:country_code"):
+                    country_code = enhance_country_code_detection(plate_img, country_code, deadline)
+
+                if not plate_text or len(plate_text) < 4:
+                    continue
+
+                plate_data = {
+                    "plate": plate_text,
+                    "country_code": country_code,
+                    "position": (x, y, w, h),
+                    "scale": scale,
+                    "confidence": confidence,
+                    "local_db_info": SIMULATED_DB.get(f"{country_code}-{plate_text}", None),
+                    "online_info": None
+                }
+                results.append(plate_data)
+            return True
+
+        if deadline is not None:
+            # Durva szint: jelöltek fél felbontáson, a legjobbak azonnal OCR-re
+            with span("plate:coarse_search") as s:
+                small = cv2.resize(img, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA)
+                coarse = [(contour * 2).astype(np.int32)
+                          for _, contour in rank_plate_candidates(small, top_k=top_k, scales=(1.0,))]
+                s.set(candidates=len(coarse))
+            if not recognize(coarse):
+                results.complete = False
+                return results
+            if max_plates and grammar_hits >= max_plates:
+                return results
+            if deadline.expired():
+                results.complete = False
+                return results
 
-        plate_contours = detect_plates_simple(img)
-        if not plate_contours:
+        with span("plate:contour_search") as s:
+            plate_contours = detect_plates_simple(img, plate_cascade, top_k=top_k, scales=scales,
+                                                  deadline=deadline)
+            s.set(candidates=len(plate_contours))
+        # Lejárt keretnél a nagyított skálák kimaradhattak
+        searched_all = deadline is None or not deadline.expired()
+        if not plate_contours and not done_boxes:
             if log_func:
                 log_func("info", "PLATE", "Nem található rendszám a képen.")
             else:
                 print("[PLATE] Nem található rendszám a képen.")
-            return None
-
-        results = []
-        for contour in plate_contours:
-            plate_img, (x, y, w, h) = extract_plate(img, contour)
-            plate_text, country_code = ocr_multi_method(plate_img)
-            country_code = enhance_country_code_detection(plate_img, country_code)
-
-            if not plate_text or len(plate_text) < 4:
-                continue
-
-            plate_data = {
-                "plate": plate_text,
-                "country_code": country_code,
-                "position": (x, y, w, h),
-                "local_db_info": SIMULATED_DB.get(f"{country_code}-{plate_text}", None),
-                "online_info": None
-            }
-            results.append(plate_data)
+            results.complete = searched_all
+            return results
 
+        results.complete = recognize(plate_contours) and searched_all
         return results
         
     except Exception as e:
@@ -209,4 +471,4 @@ def plate_recognition(image_path, log_func=None, *args, **kwargs):
             log_func("error", "PLATE", f"Kritikus hiba: {e}\n{traceback.format_exc()}")
         else:
             print(f"[PLATE] Kritikus hiba: {e}\n{traceback.format_exc()}")
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+PLATE_VIDEO.PY - Rendszám felismerés videón / képsorozaton (dashcam, CCTV)
+
+A plate_recognition képenkénti futtatása helyett:
+  1. csak minden n-edik képkockát dolgozzuk fel (a kihagyottakat nem dekódoljuk teljesen),
+  2. a jelöltkeresés olcsó (rank_plate_candidates), a dobozokat IoU alapon követjük
+     (állandó sebességű előrejelzéssel a mintavételezett kockák között),
+  3. OCR követésenként egyszer fut (csak min_hits kockán látott követésre, így az egy kockás
+     zaj-jelöltekre nem), és csak akkor újra, ha a kivágás élesebb lett,
+  4. a követés olvasatait szavazással vonjuk össze (karakterpozíciónként).
+
+Használat:
+    python -m algorithms.plate_video <videó | könyvtár | glob> [--every 5] [--scales 1,2]
+"""
+
+import glob
+import os
+from collections import Counter, deque
+from typing import Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from algorithms.tracing import span
+from algorithms.haarfeatures import load_cascade
+from algorithms.plate_rec import (
+    SIMULATED_DB, rank_plate_candidates, ocr_multi_method, enhance_country_code_detection,
+    matches_plate_grammar, _iou,
+)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+
+# ------------------------------
+# KÉPKOCKA FORRÁS
+# ------------------------------
+def _image_sequence(source) -> Optional[List[str]]:
+    if isinstance(source, (list, tuple)):
+        return list(source)
+    if os.path.isdir(source):
+        return sorted(os.path.join(source, f) for f in os.listdir(source)
+                      if f.lower().endswith(IMAGE_EXTENSIONS))
+    if any(c in source for c in "*?["):
+        return sorted(glob.glob(source))
+    return None
+
+
+def iter_frames(source, sample_every: int = 5, max_width: int = 1000,
+                max_frames: Optional[int] = None) -> Iterator[Tuple[int, float, np.ndarray, float]]:
+    """Mintavételezett képkockák: (kocka index, időbélyeg mp, BGR kép, skála).
+    source: videófájl, képkönyvtár, glob minta vagy útvonal-lista.
+    Videónál a kihagyott kockákon csak grab() fut (nincs színkonverzió/másolás)."""
+    sample_every = max(1, int(sample_every))
+    paths = _image_sequence(source)
+
+    def _resize(frame):
+        h, w = frame.shape[:2]
+        if w > max_width:
+            scale = max_width / w
+            return cv2.resize(frame, (max_width, int(h * scale))), scale
+        return frame, 1.0
+
+    emitted = 0
+    if paths is not None:
+        for idx in range(0, len(paths), sample_every):
+            frame = cv2.imread(paths[idx])
+            if frame is None:
+                continue
+            frame, scale = _resize(frame)
+            yield idx, float(idx), frame, scale
+            emitted += 1
+            if max_frames and emitted >= max_frames:
+                return
+        return
+
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise IOError(f"Nem sikerült megnyitni: {source}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    idx = 0
+    try:
+        while True:
+            if not cap.grab():
+                break
+            if idx % sample_every == 0:
+                ok, frame = cap.retrieve()
+                if ok:
+                    frame, scale = _resize(frame)
+                    yield idx, idx / fps, frame, scale
+                    emitted += 1
+                    if max_frames and emitted >= max_frames:
+                        break
+            idx += 1
+    finally:
+        cap.release()
+
+
+def sharpness(crop: np.ndarray) -> float:
+    """Élesség: a Laplace-szűrt szürke kivágás varianciája"""
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+# ------------------------------
+# KÖVETÉS
+# ------------------------------
+class PlateTrack:
+    def __init__(self, track_id: int, box: Tuple[int, int, int, int], frame_idx: int, timestamp: float):
+        self.id = track_id
+        self.box = box
+        self.prev_box = None
+        self.prev_frame = None
+        self.first_frame = self.last_frame = frame_idx
+        self.first_time = self.last_time = timestamp
+        self.hits = 1
+        self.ocr_runs = 0
+        self.best_sharpness = 0.0
+        self.readings: List[Tuple[str, Optional[str], float]] = []  # (szöveg, országkód, súly)
+
+    def predict(self, frame_idx: int) -> Tuple[int, int, int, int]:
+        """Állandó sebességű előrejelzés az utolsó két megfigyelésből"""
+        if self.prev_box is None or self.last_frame == self.prev_frame:
+            return self.box
+        k = (frame_idx - self.last_frame) / float(self.last_frame - self.prev_frame)
+        return tuple(int(round(c + (c - p) * k)) for c, p in zip(self.box, self.prev_box))
+
+    def update(self, box, frame_idx: int, timestamp: float) -> None:
+        self.prev_box, self.prev_frame = self.box, self.last_frame
+        self.box = box
+        self.last_frame, self.last_time = frame_idx, timestamp
+        self.hits += 1
+
+    def needs_ocr(self, crop_sharpness: float, sharpen_gain: float, max_ocr: int, min_hits: int = 1) -> bool:
+        """Az első OCR csak min_hits megfigyelés után: az egy kockás (zaj) jelölt nem kerül OCR-re"""
+        if self.hits < min_hits:
+            return False
+        if self.ocr_runs == 0:
+            return True
+        return self.ocr_runs < max_ocr and crop_sharpness > self.best_sharpness * (1.0 + sharpen_gain)
+
+    def add_reading(self, text: str, country_code: Optional[str], crop_sharpness: float) -> None:
+        self.ocr_runs += 1
+        self.best_sharpness = max(self.best_sharpness, crop_sharpness)
+        if text:
+            weight = 2.0 if matches_plate_grammar((country_code or "") + text) else 1.0
+            self.readings.append((text, country_code, weight))
+
+    def result(self) -> Dict:
+        return {"plate": merge_votes([(t, w) for t, _, w in self.readings]),
+                "country_code": _vote([(c, w) for _, c, w in self.readings if c])}
+
+
+def _vote(items: Sequence[Tuple[str, float]]) -> Optional[str]:
+    votes: Counter = Counter()
+    for value, weight in items:
+        votes[value] += weight
+    return votes.most_common(1)[0][0] if votes else None
+
+
+def merge_votes(readings: Sequence[Tuple[str, float]]) -> Optional[str]:
+    """Olvasatok összevonása: a leggyakoribb (súlyozott) hosszúságú olvasatok között
+    karakterpozíciónkénti többségi szavazás"""
+    readings = [(t, w) for t, w in readings if t]
+    if not readings:
+        return None
+    length = _vote([(len(t), w) for t, w in readings])
+    same = [(t, w) for t, w in readings if len(t) == length]
+    return "".join(_vote([(t[i], w) for t, w in same]) for i in range(length))
+
+
+class PlateTracker:
+    """Mohó IoU párosítás (legnagyobb átfedés először) az előrejelzett dobozokkal"""
+
+    def __init__(self, iou_threshold: float = 0.3, max_missed: int = 3):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.active: List[PlateTrack] = []
+        self.finished: List[PlateTrack] = []
+        self._next_id = 1
+        # Csak az utolsó max_missed + 1 mintavételezett kocka kell a lejárathoz
+        self._frames_seen: Deque[int] = deque(maxlen=max_missed + 1)
+
+    def update(self, frame_idx: int, timestamp: float, boxes: Sequence[Tuple[int, int, int, int]]) -> List[PlateTrack]:
+        """Visszatérés: a boxes listával azonos sorrendű követések"""
+        predicted = [t.predict(frame_idx) for t in self.active]
+        pairs = sorted(((_iou(p, b), ti, bi) for ti, p in enumerate(predicted) for bi, b in enumerate(boxes)),
+                       reverse=True)
+        assigned: Dict[int, PlateTrack] = {}
+        used_tracks = set()
+        for iou, ti, bi in pairs:
+            if iou < self.iou_threshold:
+                break
+            if ti in used_tracks or bi in assigned:
+                continue
+            track = self.active[ti]
+            track.update(boxes[bi], frame_idx, timestamp)
+            assigned[bi] = track
+            used_tracks.add(ti)
+
+        for bi, box in enumerate(boxes):
+            if bi not in assigned:
+                track = PlateTrack(self._next_id, box, frame_idx, timestamp)
+                self._next_id += 1
+                self.active.append(track)
+                assigned[bi] = track
+
+        # Lejárt követések: max_missed mintavételezett kockán át nem láttuk
+        self._frames_seen.append(frame_idx)
+        if len(self._frames_seen) > self.max_missed:
+            cutoff = self._frames_seen[0]
+            still = []
+            for t in self.active:
+                (still if t.last_frame > cutoff else self.finished).append(t)
+            self.active = still
+        return [assigned[bi] for bi in range(len(boxes))]
+
+    def all_tracks(self) -> List[PlateTrack]:
+        return self.finished + self.active
+
+
+# ------------------------------
+# FELISMERÉS
+# ------------------------------
+def plate_video_recognition(source, log_func=None, sample_every=5, plate_cascade=None, top_k=3,
+                            scales=(1.0,), iou_threshold=0.3, max_missed=3, sharpen_gain=0.25,
+                            max_ocr_per_track=3, min_hits=2, max_frames=None):
+    """
+    Rendszámok videón / képsorozaton, követésenként egy (összevont) eredménnyel.
+    sample_every: minden hányadik képkockát dolgozzuk fel
+    sharpen_gain: újra-OCR, ha a kivágás élessége ennyivel (arányosan) jobb az eddigi legjobbnál
+    min_hits: ennél kevesebb kockán látott követés zajnak számít (OCR sem fut rá)
+    """
+    try:
+        if isinstance(plate_cascade, str):
+            plate_cascade = load_cascade(plate_cascade)
+        tracker = PlateTracker(iou_threshold, max_missed)
+        frames = ocr_calls = 0
+        scale = 1.0
+
+        for frame_idx, timestamp, frame, scale in iter_frames(source, sample_every, max_frames=max_frames):
+            frames += 1
+            with span("video:candidates", frame=frame_idx):
+                candidates = rank_plate_candidates(frame, plate_cascade, top_k=top_k, scales=scales)
+            boxes = [cv2.boundingRect(contour) for _, contour in candidates]
+            tracks = tracker.update(frame_idx, timestamp, boxes)
+
+            for track, (x, y, w, h) in zip(tracks, boxes):
+                crop = frame[y:y+h, x:x+w]
+                if crop.size == 0:
+                    continue
+                crop_sharpness = sharpness(crop)
+                if not track.needs_ocr(crop_sharpness, sharpen_gain, max_ocr_per_track, min_hits):
+                    continue
+                with span("video:ocr", track=track.id):
+                    plate_text, country_code = ocr_multi_method(crop)
+                    country_code = enhance_country_code_detection(crop, country_code)
+                ocr_calls += 1
+                track.add_reading(plate_text, country_code, crop_sharpness)
+
+        results = []
+        for track in tracker.all_tracks():
+            if track.hits < min_hits or not track.readings:
+                continue
+            merged = track.result()
+            plate_text, country_code = merged["plate"], merged["country_code"]
+            if not plate_text or len(plate_text) < 4:
+                continue
+            results.append({
+                "plate": plate_text,
+                "country_code": country_code,
+                "track_id": track.id,
+                "position": track.box,
+                "scale": scale,
+                "first_frame": track.first_frame,
+                "last_frame": track.last_frame,
+                "first_time": track.first_time,
+                "last_time": track.last_time,
+                "hits": track.hits,
+                "ocr_runs": track.ocr_runs,
+                "readings": [t for t, _, _ in track.readings],
+                "local_db_info": SIMULATED_DB.get(f"{country_code}-{plate_text}", None),
+            })
+
+        if log_func:
+            log_func("info", "PLATE", f"{frames} képkocka, {len(tracker.all_tracks())} követés, "
+                                      f"{ocr_calls} OCR hívás, {len(results)} rendszám")
+        return results
+
+    except Exception as e:
+        import traceback
+        if log_func:
+            log_func("error", "PLATE", f"Kritikus hiba: {e}\n{traceback.format_exc()}")
+        else:
+            print(f"[PLATE] Kritikus hiba: {e}\n{traceback.format_exc()}")
+        return None
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rendszám felismerés videón / képsorozaton")
+    parser.add_argument("source", help="Videófájl, képkönyvtár vagy glob minta")
+    parser.add_argument("--every", type=int, default=5, help="Minden n-edik képkocka")
+    parser.add_argument("--scales", default="1", help="Jelölt-keresés skálái, pl. 1,2")
+    parser.add_argument("--cascade", help="Betanított rendszám-kaszkád (.npz)")
+    args = parser.parse_args()
+
+    found = plate_video_recognition(args.source, log_func=lambda t, s, m: print(f"[{s}] {m}"),
+                                    sample_every=args.every, plate_cascade=args.cascade,
+                                    scales=tuple(float(s) for s in args.scales.split(",")))
+    for r in found or []:
+        cc = f"{r['country_code']} " if r["country_code"] else ""
+        print(f"#{r['track_id']:3d}  {cc}{r['plate']:10s}  kockák {r['first_frame']}-{r['last_frame']}  "
+              f"({r['hits']} találat, {r['ocr_runs']} OCR)  olvasatok: {r['readings']}")
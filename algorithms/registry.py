@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+REGISTRY.PY - Elemző modulok nyilvántartása lusta betöltéssel
+Minden modul deklarálja a nevét, bemeneteit, kimeneteit és nehéz függőségeit;
+a modul (és így a cv2/numpy/pytesseract) csak az első használatkor importálódik.
+
+Import-idő riport (regresszió ellenőrzés):
+    python -m algorithms.registry importtime [--save baseline.json] [--baseline baseline.json] [--tolerance 0.25]
+"""
+
+import importlib
+import sys
+import threading
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+
+class _LogAdapter:
+    """Az OSINTApp.log interfészét utánozza fej nélküli futtatáshoz (pl. exif_reading self paramétere)"""
+
+    def __init__(self, log_func=None):
+        self.log_func = log_func
+
+    def log(self, type, sender, message):
+        if self.log_func:
+            self.log_func(type, sender, message)
+        else:
+            print(f"[{sender}] {message}")
+
+
+class ModuleSpec:
+    """Egy elemző modul leírása.
+    target: "csomag.modul:attribútum"
+    log_style: "app" (első paraméter egy .log-gal rendelkező objektum),
+               "log_func" (log_func kulcsszavas paraméter) vagy "plain"
+    defaults: a registry-n át (kötegelt / fej nélküli futás) mindig átadott kulcsszavas paraméterek
+    """
+
+    def __init__(self, name: str, target: str, inputs: Sequence[str], outputs: Sequence[str],
+                 deps: Sequence[str] = (), log_style: str = "plain", description: str = "",
+                 defaults: Optional[Dict] = None):
+        self.name = name
+        self.target = target
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.deps = tuple(deps)
+        self.log_style = log_style
+        self.description = description
+        self.defaults = dict(defaults or {})
+        self._obj = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._obj is not None
+
+    def load(self):
+        """Importálás az első használatkor (szálbiztosan), utána cache-ből"""
+        if self._obj is None:
+            with self._lock:
+                if self._obj is None:
+                    module_name, attr = self.target.split(":")
+                    self._obj = getattr(importlib.import_module(module_name), attr)
+        return self._obj
+
+    def run(self, *args, log_func=None, **kwargs):
+        fn = self.load()
+        kwargs = {**self.defaults, **kwargs}
+        if self.log_style == "app":
+            return fn(_LogAdapter(log_func), *args, **kwargs)
+        if self.log_style == "log_func":
+            return fn(*args, log_func=log_func, **kwargs)
+        return fn(*args, **kwargs)
+
+    def __repr__(self):
+        state = "betöltve" if self.loaded else "nincs betöltve"
+        return f"<ModuleSpec {self.name} {self.target} ({state})>"
+
+
+REGISTRY: Dict[str, ModuleSpec] = {}
+
+
+def register(name: str, target: str, inputs: Sequence[str], outputs: Sequence[str],
+             deps: Sequence[str] = (), log_style: str = "plain", description: str = "",
+             defaults: Optional[Dict] = None) -> ModuleSpec:
+    spec = ModuleSpec(name, target, inputs, outputs, deps, log_style, description, defaults)
+    REGISTRY[name] = spec
+    return spec
+
+
+def get(name: str) -> ModuleSpec:
+    try:
+        return REGISTRY[name]
+    except KeyError:
+        raise KeyError(f"Ismeretlen modul: {name} (elérhető: {', '.join(REGISTRY)})")
+
+
+def lazy(target: str) -> Callable:
+    """Lusta függvény-helyettesítő: az első híváskor importálja a célt.
+    Valódi függvény, így osztályattribútumként metódusként is kötődik (pl. OSINTApp.exif_reading)."""
+    module_name, attr = target.split(":")
+    cache = []
+
+    def wrapper(*args, **kwargs):
+        if not cache:
+            cache.append(getattr(importlib.import_module(module_name), attr))
+        return cache[0](*args, **kwargs)
+
+    wrapper.__name__ = attr
+    wrapper.__qualname__ = attr
+    wrapper.__doc__ = f"Lusta hivatkozás: {target}"
+    return wrapper
+
+
+# ============ MODULOK ============
+
+register("meta", "algorithms.meta:exif_reading",
+         inputs=("image_path",), outputs=("exif", "gps", "fingerprints"),
+         deps=("PIL", "numpy"), log_style="app",
+         description="EXIF, GPS, hash-ek, PRNU",
+         # Az exif_results.json teljes újraírása párhuzamos workerekből elveszítené a frissítéseket;
+         # a kötegelt utak az eredménytárba mentenek, a JSON csak a GUI-é
+         defaults={"json_path": None})
+register("haar", "algorithms.haar:haar_detection",
+         inputs=("image_path",), outputs=("faces", "eyes"),
+         deps=("cv2", "numpy"),
+         description="Haar cascade arc- és szemfelismerés")
+register("plate_rec", "algorithms.plate_rec:plate_recognition",
+         inputs=("image_path",), outputs=("plate", "country_code", "position"),
+         deps=("cv2", "numpy", "pytesseract", "sqlite3"), log_style="log_func",
+         description="Rendszám felismerés (OCR)")
+register("plate_video", "algorithms.plate_video:plate_video_recognition",
+         inputs=("video_path",), outputs=("plate", "country_code", "track_id", "first_frame", "last_frame"),
+         deps=("cv2", "numpy", "pytesseract"), log_style="log_func",
+         description="Rendszám felismerés videón / képsorozaton (követés + szavazás)")
+register("shadowcalc", "algorithms.shadowcalc:detect_shadow",
+         inputs=("image_path",), outputs=("shadow_direction", "detected_lines", "roll_deg"),
+         deps=("cv2", "numpy"),
+         description="Árnyékvonalak és domináns irány")
+register("shadow", "algorithms.shadow:ShadowCalculator",
+         inputs=("measurements",), outputs=("latitude_deg", "longitude_offset_deg"),
+         deps=(),
+         description="Földrajzi szélesség árnyékmérésekből")
+
+# A run_osint által futtatott képelemző modulok, sorrendben
+OSINT_MODULES: Tuple[str, ...] = ("meta", "haar", "plate_rec", "shadowcalc")
+
+
+# ============ IMPORT-IDŐ RIPORT ============
+
+def import_time_report(module: str, python: Optional[str] = None) -> Dict:
+    """`python -X importtime -c "import <module>"` futtatása külön folyamatban.
+    Visszatérés: {"module", "total_us", "top": [(csomag, kumulatív µs), ...]} (felső szintű importok)"""
+    # A riport függőségei itt importálódnak, hogy a registry betöltése olcsó maradjon
+    import re
+    import subprocess
+
+    proc = subprocess.run([python or sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Import hiba ({module}):\n{proc.stderr.strip().splitlines()[-1]}")
+
+    pattern = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+    top = {}
+    for line in proc.stderr.splitlines():
+        m = pattern.match(line)
+        if not m:
+            continue
+        cumulative, indent, name = int(m.group(2)), len(m.group(3)), m.group(4)
+        if indent <= 1:  # felső szintű import
+            top[name] = top.get(name, 0) + cumulative
+    ranked = sorted(top.items(), key=lambda kv: kv[1], reverse=True)
+    return {"module": module, "total_us": top.get(module, sum(top.values())), "top": ranked}
+
+
+def check_import_times(modules: Sequence[str], baseline: Optional[Dict[str, int]] = None,
+                       tolerance: float = 0.25, repeats: int = 3) -> Tuple[Dict[str, int], list]:
+    """Import-idők mérése (több futás minimuma) és összevetése az alapértékekkel.
+    Visszatérés: (mért értékek µs-ban, regressziók listája)"""
+    measured = {m: min(import_time_report(m)["total_us"] for _ in range(repeats)) for m in modules}
+    regressions = []
+    for m, us in measured.items():
+        if baseline and m in baseline and us > baseline[m] * (1.0 + tolerance):
+            regressions.append((m, baseline[m], us))
+    return measured, regressions
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Modul registry és import-idő riport")
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("list", help="Regisztrált modulok")
+    p_time = sub.add_parser("importtime", help="Import-idő riport (-X importtime)")
+    p_time.add_argument("modules", nargs="*", default=["algorithms.registry"]
+                        + [REGISTRY[m].target.split(":")[0] for m in REGISTRY])
+    p_time.add_argument("--baseline", help="Alapérték JSON összevetéshez")
+    p_time.add_argument("--save", help="Mért értékek mentése alapértékként")
+    p_time.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    if args.command == "importtime":
+        baseline = None
+        if args.baseline:
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        measured, regressions = check_import_times(args.modules, baseline, args.tolerance)
+        for m, us in measured.items():
+            ref = f"  (alap: {baseline[m] / 1000:.1f} ms)" if baseline and m in baseline else ""
+            print(f"{m:32s} {us / 1000:8.1f} ms{ref}")
+        if args.save:
+            with open(args.save, "w", encoding="utf-8") as f:
+                json.dump(measured, f, indent=2)
+            print(f"\nAlapértékek elmentve: {args.save}")
+        if regressions:
+            for m, ref, us in regressions:
+                print(f"REGRESSZIÓ: {m}: {ref / 1000:.1f} ms -> {us / 1000:.1f} ms")
+            sys.exit(1)
+    else:
+        for spec in REGISTRY.values():
+            print(f"{spec.name:12s} {spec.target:40s} in={','.join(spec.inputs)} "
+                  f"out={','.join(spec.outputs)} deps={','.join(spec.deps) or '-'}")
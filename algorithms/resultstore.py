@@ -0,0 +1,249 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from algorithms.sightings import INSERT_SQL as SIGHTINGS_INSERT_SQL
+from algorithms.sightings import SCHEMA as SIGHTINGS_SCHEMA
+from algorithms.sightings import normalize_plate, sighting_rows
+
+CHUNK_SIZE = 1 << 20
+
+
+def file_sha256(path: str) -> str:
+    """A fájl SHA-256 hash-e darabonként olvasva (a teljes fájl nem kerül memóriába)"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _jsonable(obj):
+    """numpy skalárok / tömbök és tuple-ök JSON-barát alakra"""
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if isinstance(obj, (set, tuple)):
+        return list(obj)
+    return str(obj)
+
+
+class ModuleError(RuntimeError):
+    """Egy modul hibát jelzett: a modulok a kivételt maguk naplózzák és None-nal térnek vissza"""
+
+
+# ============ EREDMÉNYTÁR ============
+
+class ResultStore:
+    """Modul-eredmények a kép tartalma (sha256) szerint, így az átnevezett / másolt
+    vagy újra beolvasott kép eredménye újrahasznosítható.
+    results: modulonként a teljes (JSON) eredmény; images: összesítő (útvonal, arcok száma);
+    image_plates: felismert rendszámok kereséshez; plate_sightings: észlelések dobozzal,
+    konfidenciával, EXIF idővel / GPS-szel (lásd sightings.py)."""
+
+    def __init__(self, db_path: str = "results.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS results (
+                sha256 TEXT,
+                module TEXT,
+                result TEXT,
+                updated REAL,
+                PRIMARY KEY (sha256, module)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS images (
+                sha256 TEXT PRIMARY KEY,
+                image TEXT,
+                face_count INTEGER,
+                updated REAL
+            );
+            CREATE INDEX IF NOT EXISTS images_faces ON images(face_count);
+            CREATE TABLE IF NOT EXISTS image_plates (
+                plate TEXT,
+                sha256 TEXT,
+                country_code TEXT,
+                PRIMARY KEY (plate, sha256)
+            ) WITHOUT ROWID;
+        """)
+        self._conn.executescript(SIGHTINGS_SCHEMA)
+        self._conn.commit()
+
+    # --- Írás ---
+    def save(self, sha256: str, image: str, module_results: Dict[str, object]) -> None:
+        self.save_many([(sha256, image, module_results)])
+
+    def save_many(self, rows: Iterable[Tuple[str, str, Dict[str, object]]]) -> int:
+        """Kötegelt mentés egy tranzakcióban. module_results: {modulnév: eredmény};
+        a haar eredményből az arcok száma, a plate_rec eredményből a rendszámok és az észlelések
+        kerülnek az indexbe (egy kép újrafuttatásakor a korábbi rendszámai és észlelései lecserélődnek).
+        A None (hibás futás) eredmény nem íródik ki, és a meglévő eredményt / észleléseket sem
+        írja felül."""
+        now = time.time()
+        result_rows, image_rows, plate_rows = [], [], []
+        replaced_shas, sighting_batch = [], []
+        for sha256, image, module_results in rows:
+            face_count = None
+            for module, result in module_results.items():
+                if result is None:
+                    continue
+                result_rows.append((sha256, module, json.dumps(result, default=_jsonable), now))
+                if module == "haar" and result:
+                    face_count = len(result.get("faces", []))
+                elif module == "plate_rec" and result:
+                    for plate in result:
+                        plate_rows.append((normalize_plate(plate["plate"]), sha256, plate.get("country_code")))
+            image_rows.append((sha256, image, face_count, now))
+            if isinstance(module_results.get("plate_rec"), list):
+                replaced_shas.append((sha256,))
+                if module_results["plate_rec"] and "meta" not in module_results:
+                    # Csak rendszám-futás: az idő / GPS a korábban mentett meta eredményből
+                    meta = self._stored_result(sha256, "meta")
+                    module_results = dict(module_results, meta=meta)
+                sighting_batch.extend(sighting_rows(sha256, image, module_results))
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", result_rows)
+            self._conn.executemany("""INSERT INTO images VALUES (?, ?, ?, ?)
+                                      ON CONFLICT(sha256) DO UPDATE SET image = excluded.image,
+                                          face_count = COALESCE(excluded.face_count, images.face_count),
+                                          updated = excluded.updated""", image_rows)
+            # Újrafuttatott plate_rec: a régi rendszámok / észlelések törlése a beszúrás előtt
+            self._conn.executemany("DELETE FROM image_plates WHERE sha256 = ?", replaced_shas)
+            self._conn.executemany("INSERT OR REPLACE INTO image_plates VALUES (?, ?, ?)", plate_rows)
+            self._conn.executemany("DELETE FROM plate_sightings WHERE sha256 = ?", replaced_shas)
+            self._conn.executemany(SIGHTINGS_INSERT_SQL, sighting_batch)
+        return len(image_rows)
+
+    def _stored_result(self, sha256: str, module: str):
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM results WHERE sha256 = ? AND module = ?",
+                                     (sha256, module)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def touch_image(self, sha256: str, image: str) -> None:
+        """Ismert tartalom új útvonalon (áthelyezett / másolt kép): csak az útvonal frissül"""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE images SET image = ?, updated = ? WHERE sha256 = ?",
+                               (image, time.time(), sha256))
+
+    # --- Olvasás ---
+    def __contains__(self, sha256: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM results WHERE sha256 = ? LIMIT 1",
+                                      (sha256,)).fetchone() is not None
+
+    def known(self, sha256s: Sequence[str], modules: Sequence[str] = ()) -> set:
+        """Azok a hash-ek, amelyekhez (a megadott modulok mindegyikére) már van eredmény.
+        A None (hibás futásból mentett) eredmény nem számít ismertnek."""
+        known = set()
+        sha256s = list(sha256s)
+        with self._lock:
+            for i in range(0, len(sha256s), 500):
+                chunk = sha256s[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                if modules:
+                    mod_marks = ",".join("?" * len(modules))
+                    rows = self._conn.execute(
+                        f"""SELECT sha256 FROM results WHERE sha256 IN ({marks}) AND module IN ({mod_marks})
+                                AND result != 'null'
+                            GROUP BY sha256 HAVING COUNT(*) = ?""", (*chunk, *modules, len(set(modules))))
+                else:
+                    rows = self._conn.execute(f"""SELECT DISTINCT sha256 FROM results
+                                                  WHERE sha256 IN ({marks}) AND result != 'null'""", chunk)
+                known.update(r[0] for r in rows)
+        return known
+
+    def get(self, sha256: str) -> Optional[Dict]:
+        """{"sha256", "image", "face_count", "results": {modul: eredmény}} vagy None"""
+        with self._lock:
+            image = self._conn.execute("SELECT image, face_count FROM images WHERE sha256 = ?",
+                                       (sha256,)).fetchone()
+            rows = self._conn.execute("SELECT module, result FROM results WHERE sha256 = ?",
+                                      (sha256,)).fetchall()
+        if image is None and not rows:
+            return None
+        return {
+            "sha256": sha256,
+            "image": image[0] if image else None,
+            "face_count": image[1] if image else None,
+            "results": {module: json.loads(result) for module, result in rows},
+        }
+
+    def by_plate(self, plate: str, offset: int = 0, limit: int = 50) -> List[Dict]:
+        """Képek, amelyeken a (normalizált) rendszám szerepelt"""
+        with self._lock:
+            rows = self._conn.execute("""SELECT p.plate, p.country_code, p.sha256, i.image
+                                         FROM image_plates p LEFT JOIN images i ON i.sha256 = p.sha256
+                                         WHERE p.plate = ? ORDER BY p.sha256 LIMIT ? OFFSET ?""",
+                                      (normalize_plate(plate), limit, offset)).fetchall()
+        return [{"plate": pl, "country_code": cc, "sha256": s, "image": img} for pl, cc, s, img in rows]
+
+    def plates(self) -> List[str]:
+        """Az összes ismert (normalizált) rendszám - a fuzzy kereséshez"""
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT DISTINCT plate FROM image_plates")]
+
+    def by_face_count(self, min_faces: int = 1, max_faces: Optional[int] = None,
+                      offset: int = 0, limit: int = 50) -> List[Dict]:
+        """Képek arcszám szerint (images_faces index), csökkenő sorrendben"""
+        sql = "SELECT sha256, image, face_count FROM images WHERE face_count >= ?"
+        params: list = [min_faces]
+        if max_faces is not None:
+            sql += " AND face_count <= ?"
+            params.append(max_faces)
+        sql += " ORDER BY face_count DESC, sha256 LIMIT ? OFFSET ?"
+        with self._lock:
+            rows = self._conn.execute(sql, (*params, limit, offset)).fetchall()
+        return [{"sha256": s, "image": img, "face_count": n} for s, img, n in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def analyze_image(image_path: str, modules: Sequence[str], store: Optional[ResultStore] = None,
+                  sha256: Optional[str] = None, log_func=None,
+                  save_rows: Optional[list] = None) -> Tuple[str, Dict[str, object], bool]:
+    """Modulok futtatása egy képen a registry-n át, eredmény-újrahasznosítással: ha a tárban
+    már minden modulhoz van eredmény ehhez a tartalomhoz, nem fut semmi.
+    Visszatérés: (sha256, {modul: eredmény}, újrahasznosított-e)
+    Ha egy modul None-nal tér vissza (a modulok így jelzik a saját, naplózott hibájukat),
+    ModuleError-t dob és semmit nem ment, így a hívó (jobqueue, ingest) újrapróbálhatja.
+    save_rows: ha megadott, a mentendő sor ide kerül, és a hívó kötegelve menti (save_many)."""
+    from algorithms.registry import get
+
+    sha256 = sha256 or file_sha256(image_path)
+    if store is not None:
+        cached = store.get(sha256)
+        if cached and all(cached["results"].get(m) is not None for m in modules):
+            if cached["image"] != image_path:
+                store.touch_image(sha256, image_path)
+            return sha256, {m: cached["results"][m] for m in modules}, True
+
+    results = {}
+    for name in modules:
+        results[name] = get(name).run(image_path, log_func=log_func or (lambda *a: None))
+        if results[name] is None:
+            raise ModuleError(f"{name}: a modul hibával tért vissza ({image_path})")
+    if save_rows is not None:
+        save_rows.append((sha256, image_path, results))
+    elif store is not None:
+        store.save(sha256, image_path, results)
+    return sha256, results, False
+
+
+_STORES: Dict[str, ResultStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_store(db_path: str = "results.db") -> ResultStore:
+    """Folyamatonként egy megosztott tár adatbázisonként."""
+    with _STORES_LOCK:
+        store = _STORES.get(db_path)
+        if store is None:
+            store = _STORES[db_path] = ResultStore(db_path)
+        return store
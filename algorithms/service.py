@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+SERVICE.PY - Helyi (localhost) lekérdező szolgáltatás az elemzési eredményekre
+
+asyncio alapú HTTP/1.1 szerver (keep-alive) a results.db fölött, külső függőség nélkül.
+Végpontok (GET, JSON):
+    /image/<sha256>                               egy kép összes modul-eredménye
+    /plates/<rendszám>[?fuzzy=1&distance=1]       képek rendszám szerint (pontos / szerkesztési távolság)
+    /sightings/<rendszám>[?since=..&until=..]     a rendszám észlelései időrendben (doboz, konfidencia, GPS)
+    /gps?lat=..&lon=..&radius_m=..                képek GPS sugáron belül (R*Tree index)
+    /faces?min=1[&max=..]                         képek arcszám szerint
+    /stats                                        cache és kérés statisztika
+A listás végpontok lapozottak (offset, limit), a válasz darabonként (chunked) érkezik.
+A gyakori lekérdezések kész válasza LRU cache-ben van; a cache kiürül, ha az adatbázis
+megváltozik (PRAGMA data_version, legfeljebb CHECK_INTERVAL másodpercenként ellenőrizve).
+
+Használat:
+    python -m algorithms.service [--db results.db] [--port 8765] [--cache 4096]
+"""
+
+import asyncio
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from algorithms.geoindex import GeoIndex
+from algorithms.resultstore import ResultStore, _jsonable, normalize_plate
+from algorithms.sightings import SightingStore, parse_time
+
+HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 1000
+CHECK_INTERVAL = 0.5
+MAX_CACHED_BODY = 256 * 1024
+MAX_REQUEST_HEAD = 16 * 1024
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Levenshtein távolság korláttal: max_distance + 1, amint biztosan túllépi"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > max_distance:
+            return max_distance + 1
+        prev = cur
+    return prev[-1]
+
+
+# ============ LRU CACHE ============
+
+class ResponseCache:
+    """Kész (kódolt) válaszok LRU cache-e; adatbázis-változáskor kiürül"""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[int, bytes]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[int, bytes]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, status: int, body: bytes) -> None:
+        if self.max_entries <= 0 or len(body) > MAX_CACHED_BODY:
+            return
+        self._entries[key] = (status, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# ============ LEKÉRDEZÉSEK ============
+
+class QueryService:
+    """A végpontok logikája, HTTP-től függetlenül. Saját adatbázis-kapcsolatokat használ
+    (nem a get_store / get_index példányokat). A változásfigyelés külön, soha nem író
+    kapcsolaton fut: a data_version minden más kapcsolat írását jelzi, és a lekérdezések
+    zárja sem tartja fel."""
+
+    def __init__(self, db_path: str = "results.db", cache_entries: int = 4096):
+        self.store = ResultStore(db_path)
+        self.geo = GeoIndex(db_path)
+        self.sightings = SightingStore(db_path)
+        self.cache = ResponseCache(cache_entries)
+        self.requests = 0
+        self._watch = sqlite3.connect(db_path, check_same_thread=False)
+        self._version = self.data_version()
+        self._checked = time.monotonic()
+        self._plates: Optional[List[str]] = None
+
+    def data_version(self) -> int:
+        return self._watch.execute("PRAGMA data_version").fetchone()[0]
+
+    def refresh(self) -> None:
+        """Adatbázis-változás esetén a cache és a rendszám-szótár eldobása"""
+        now = time.monotonic()
+        if now - self._checked < CHECK_INTERVAL:
+            return
+        self._checked = now
+        version = self.data_version()
+        if version != self._version:
+            self._version = version
+            self.cache.clear()
+            self._plates = None
+
+    @staticmethod
+    def _page(query: Dict[str, List[str]]) -> Tuple[int, int]:
+        offset = _int_param(query, "offset", 0)
+        limit = _int_param(query, "limit", DEFAULT_LIMIT)
+        if offset < 0 or not 0 < limit <= MAX_LIMIT:
+            raise HTTPError(400, f"offset >= 0 és 0 < limit <= {MAX_LIMIT} szükséges")
+        return offset, limit
+
+    def fuzzy_plates(self, plate: str, max_distance: int) -> List[Tuple[int, str]]:
+        if self._plates is None:
+            self._plates = self.store.plates()
+        matches = []
+        for candidate in self._plates:
+            d = edit_distance(plate, candidate, max_distance)
+            if d <= max_distance:
+                matches.append((d, candidate))
+        matches.sort()
+        return matches
+
+    def handle(self, path: str, query: Dict[str, List[str]]) -> Tuple[dict, Optional[List]]:
+        """Visszatérés: (fejléc-objektum, elemek listája vagy None). A listás válasz
+        {"offset", "limit", "next", "items": [...]} alakban kerül ki."""
+        parts = [unquote(p) for p in path.strip("/").split("/") if p]
+        if not parts:
+            raise HTTPError(404, "Ismeretlen végpont")
+        endpoint = parts[0]
+
+        if endpoint == "image" and len(parts) == 2:
+            result = self.store.get(parts[1].lower())
+            if result is None:
+                raise HTTPError(404, f"Nincs eredmény: {parts[1]}")
+            return result, None
+
+        if endpoint == "stats" and len(parts) == 1:
+            return self.stats(), None
+
+        offset, limit = self._page(query)
+        if endpoint == "plates" and len(parts) == 2:
+            plate = normalize_plate(parts[1])
+            if not plate:
+                raise HTTPError(400, "Üres rendszám")
+            if _int_param(query, "fuzzy", 0):
+                max_distance = _int_param(query, "distance", 1)
+                items = []
+                for d, candidate in self.fuzzy_plates(plate, max_distance):
+                    for hit in self.store.by_plate(candidate, 0, offset + limit + 1 - len(items)):
+                        hit["distance"] = d
+                        items.append(hit)
+                    if len(items) > offset + limit:
+                        break
+                items = items[offset:offset + limit + 1]
+            else:
+                items = self.store.by_plate(plate, offset, limit + 1)
+            return {"query": plate}, items
+
+        if endpoint == "sightings" and len(parts) == 2:
+            try:
+                since = parse_time(query["since"][0]) if "since" in query else None
+                until = parse_time(query["until"][0]) if "until" in query else None
+            except ValueError as e:
+                raise HTTPError(400, str(e))
+            plate = normalize_plate(parts[1])
+            return {"query": plate}, self.sightings.history(plate, since, until, limit + 1, offset)
+
+        if endpoint == "gps" and len(parts) == 1:
+            try:
+                lat, lon = float(query["lat"][0]), float(query["lon"][0])
+                radius_m = float(query.get("radius_m", ["1000"])[0])
+            except (KeyError, ValueError):
+                raise HTTPError(400, "lat, lon (és radius_m) számként szükséges")
+            items = self.geo.radius(lat, lon, radius_m, limit=offset + limit + 1)[offset:]
+            return {"lat": lat, "lon": lon, "radius_m": radius_m}, items
+
+        if endpoint == "faces" and len(parts) == 1:
+            min_faces = _int_param(query, "min", 1)
+            max_faces = _int_param(query, "max", None)
+            return {"min": min_faces, "max": max_faces}, self.store.by_face_count(min_faces, max_faces,
+                                                                                  offset, limit + 1)
+        raise HTTPError(404, f"Ismeretlen végpont: /{'/'.join(parts)}")
+
+    def stats(self) -> dict:
+        total = self.cache.hits + self.cache.misses
+        return {
+            "requests": self.requests,
+            "cache_entries": len(self.cache),
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "cache_hit_rate": round(self.cache.hits / total, 4) if total else None,
+            "data_version": self._version,
+        }
+
+    def close(self) -> None:
+        self.store.close()
+        self.geo.close()
+        self.sightings.close()
+        self._watch.close()
+
+
+def _int_param(query: Dict[str, List[str]], name: str, default):
+    if name not in query:
+        return default
+    try:
+        return int(query[name][0])
+    except ValueError:
+        raise HTTPError(400, f"{name}: egész szám szükséges")
+
+
+def _dumps(obj) -> bytes:
+    return json.dumps(obj, default=_jsonable, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_page(head: dict, items: List, offset: int, limit: int) -> Iterable[bytes]:
+    """Lapozott válasz darabjai: fejléc-mezők, majd elemenként egy darab"""
+    has_next = len(items) > limit
+    page = dict(head, offset=offset, limit=limit, next=offset + limit if has_next else None)
+    yield _dumps(page)[:-1] + b',"items":['
+    for i, item in enumerate(items[:limit]):
+        yield (b"," if i else b"") + _dumps(item)
+    yield b"]}"
+
+
+# ============ HTTP ============
+
+class QueryServer:
+    """asyncio HTTP szerver. A cache-találatok az eseményhurokban szolgálódnak ki;
+    a cache-hiányok SQLite lekérdezései egy külön szálon futnak, hogy a hurok ne álljon."""
+
+    def __init__(self, service: QueryService, host: str = HOST, port: int = DEFAULT_PORT):
+        self.service = service
+        self.host = host
+        self.port = port
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        self._executor.shutdown(wait=False)
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                if len(head) > MAX_REQUEST_HEAD:
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    break
+                headers = {k.strip().lower(): v.strip() for k, _, v in (l.partition(":") for l in lines[1:] if l)}
+                keep_alive = (headers.get("connection", "").lower() != "close"
+                              if version == "HTTP/1.1" else headers.get("connection", "").lower() == "keep-alive")
+                await self._respond(method, target, writer, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, method: str, target: str, writer: asyncio.StreamWriter, keep_alive: bool) -> None:
+        service = self.service
+        service.requests += 1
+        if method != "GET":
+            self._send(writer, 405, _dumps({"error": "Csak GET"}), keep_alive)
+            return
+        service.refresh()
+        cached = service.cache.get(target)
+        if cached is not None:
+            self._send(writer, cached[0], cached[1], keep_alive)
+            return
+
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        version = service._version
+        try:
+            head, items = await asyncio.get_running_loop().run_in_executor(
+                self._executor, service.handle, url.path, query)
+        except HTTPError as e:
+            self._send(writer, e.status, _dumps({"error": str(e)}), keep_alive)
+            return
+        except Exception as e:
+            self._send(writer, 500, _dumps({"error": str(e)}), keep_alive)
+            return
+
+        if items is None:
+            body = _dumps(head)
+            if url.path.rstrip("/") != "/stats" and service._version == version:
+                service.cache.put(target, 200, body)
+            self._send(writer, 200, body, keep_alive)
+            return
+
+        offset, limit = service._page(query)
+        writer.write(self._status_line(200, keep_alive) + b"Transfer-Encoding: chunked\r\n\r\n")
+        pieces = []
+        for piece in encode_page(head, items, offset, limit):
+            pieces.append(piece)
+            writer.write(b"%x\r\n%s\r\n" % (len(piece), piece))
+            if writer.transport.get_write_buffer_size() > 64 * 1024:
+                await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        if service._version == version:
+            service.cache.put(target, 200, b"".join(pieces))
+
+    @staticmethod
+    def _status_line(status: int, keep_alive: bool) -> bytes:
+        return (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n").encode("latin-1")
+
+    def _send(self, writer: asyncio.StreamWriter, status: int, body: bytes, keep_alive: bool) -> None:
+        writer.write(self._status_line(status, keep_alive) + b"Content-Length: %d\r\n\r\n" % len(body) + body)
+
+
+def serve(db_path: str = "results.db", host: str = HOST, port: int = DEFAULT_PORT,
+          cache_entries: int = 4096) -> None:
+    """Blokkoló futtatás (Ctrl+C-ig)"""
+    service = QueryService(db_path, cache_entries)
+    server = QueryServer(service, host, port)
+
+    async def main():
+        await server.start()
+        print(f"[SERVICE] http://{server.host}:{server.port}/ ({db_path})")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        service.close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Helyi lekérdező szolgáltatás az elemzési eredményekre")
+    parser.add_argument("--db", default="results.db")
+    parser.add_argument("--host", default=HOST, help="Alapértelmezésben csak localhost")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--cache", type=int, default=4096, help="LRU cache mérete (válaszok száma)")
+    args = parser.parse_args()
+    serve(args.db, args.host, args.port, args.cache)
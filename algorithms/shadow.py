@@ -40,51 +40,77 @@ def refraction_deg(elev_deg: float) -> float:
 
 # ============ SZÉLESSÉG SZÁMÍTÁS ============
 
-def latitude_from_single(h_rad: float, delta_rad: float, H_rad: float) -> float:
-    phi = 0.5
-    for _ in range(30):
-        f = math.sin(h_rad) - (
-            math.sin(phi) * math.sin(delta_rad) + math.cos(phi) * math.cos(delta_rad) * math.cos(H_rad)
-        )
-        df = -(
-            math.cos(phi) * math.sin(delta_rad)
-            - math.sin(phi) * math.cos(delta_rad) * math.cos(H_rad)
-        )
-        if abs(df) < 1e-12:
-            break
-        step = f / df
-        phi -= step
-        if abs(step) < 1e-10:
-            break
-    return phi
-
-def fit_lat_lonoffset(samples: List[Dict], utc_offset: int):
-    phi = math.radians(47.0)
+def latitude_from_single(h_rad: float, delta_rad: float, H_rad: float, phi0: float = 0.5) -> float:
+    """sin h = sin φ sin δ + cos φ cos δ cos H zárt alakban: A sin φ + B cos φ = R sin(φ + α).
+    Két gyök lehet (egy magasságmérésből a félteke nem dönthető el): a phi0-hoz (rad)
+    közelebbi, [-90°, 90°]-ba eső gyököt adjuk vissza."""
+    A = math.sin(delta_rad)
+    B = math.cos(delta_rad) * math.cos(H_rad)
+    R = math.hypot(A, B)
+    if R < 1e-12:
+        return phi0
+    alpha = math.atan2(B, A)
+    base = math.asin(max(-1.0, min(1.0, math.sin(h_rad) / R)))
+    roots = [phi for phi in (base - alpha, math.pi - base - alpha, base - alpha + 2 * math.pi,
+                             -math.pi - base - alpha)
+             if -math.pi / 2 - 1e-9 <= phi <= math.pi / 2 + 1e-9]
+    if not roots:
+        return phi0
+    return min(roots, key=lambda phi: abs(phi - phi0))
+
+def _gauss_newton(samples: List[Dict], utc_offset: int, phi: float, fit_lon: bool):
+    """Egy Gauss-Newton futás phi kezdőértékről; visszatérés: (phi, dlon, négyzetes hiba)"""
     dlon = 0.0
+    sse = 0.0
     for _ in range(80):
         Fphi = Flon = 0.0
         Gpp = Gpl = Gll = 0.0
+        sse = 0.0
         for s in samples:
             delta = solar_declination(s['day_of_year'])
             H = hour_angle(s['local_hour'], utc_offset, s['day_of_year'], lon_deg=15 * utc_offset + dlon)
             model = math.sin(phi) * math.sin(delta) + math.cos(phi) * math.cos(delta) * math.cos(H)
             r = math.sin(s['h_rad']) - model
+            # A H a hosszúsággal fokonként 1°-ot nő, d(cos H)/dH = -sin H
             dmodel_dphi = math.cos(phi) * math.sin(delta) - math.sin(phi) * math.cos(delta) * math.cos(H)
-            dmodel_dlon = math.cos(phi) * math.cos(delta) * math.sin(H) * math.radians(1.0)
+            dmodel_dlon = -math.cos(phi) * math.cos(delta) * math.sin(H) * math.radians(1.0)
+            sse += r * r
             Fphi += r * dmodel_dphi
             Flon += r * dmodel_dlon
             Gpp += dmodel_dphi ** 2
             Gpl += dmodel_dphi * dmodel_dlon
             Gll += dmodel_dlon ** 2
         det = Gpp * Gll - Gpl * Gpl
-        if abs(det) < 1e-12:
+        if fit_lon and abs(det) >= 1e-12:
+            dphi = (Fphi * Gll - Flon * Gpl) / det
+            step_lon = (Flon * Gpp - Fphi * Gpl) / det
+        elif Gpp >= 1e-12:
+            dphi, step_lon = Fphi / Gpp, 0.0
+        else:
             break
-        dphi = (Fphi * Gll - Flon * Gpl) / det
-        dlon = dlon + (Flon * Gpp - Fphi * Gpl) / det
-        phi = phi + dphi
-        if abs(dphi) < 1e-10:
+        phi = max(-math.pi / 2, min(math.pi / 2, phi + dphi))
+        dlon = dlon + step_lon
+        if abs(dphi) < 1e-10 and abs(step_lon) < 1e-8:
             break
-    return phi, dlon
+    return phi, dlon, sse
+
+def fit_lat_lonoffset(samples: List[Dict], utc_offset: int,
+                      starts_deg=(47.0, 60.0, 20.0, -5.0, -30.0, -55.0)):
+    """Szélesség (rad) és hosszúság-eltérés (fok, az időzóna középmeridiánjához képest)
+    Gauss-Newton illesztéssel. A négyzetes hibának a két féltekén külön lokális minimuma
+    lehet, ezért több kezdőszélességről indul, és a legkisebb hibájú illesztés nyer.
+    Kevesebb mint két mérésnél csak a szélesség illeszthető (dlon = 0)."""
+    fit_lon = len(samples) >= 2
+    best = None
+    for start in starts_deg:
+        phi, dlon, sse = _gauss_newton(samples, utc_offset, math.radians(start), fit_lon)
+        if abs(dlon) > 180.0:
+            continue
+        if best is None or sse < best[2] - 1e-15:
+            best = (phi, dlon, sse)
+    if best is None:
+        return math.radians(starts_deg[0]), 0.0
+    return best[0], best[1]
 
 # ============ FŐ OSZTÁLY ============
 
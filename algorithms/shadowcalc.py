@@ -1,9 +1,17 @@
 import math
-from typing import Dict, List, Optional, Tuple
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
 
 import cv2
 import numpy as np
 
+from algorithms.tracing import span
+from algorithms.deadline import Deadline
+
 
 def _weighted_orientation_deg(angles_deg: List[float], weights: List[float]) -> Optional[float]:
     """Domináns orientáció 0-180° tartományban (iránytól független),
@@ -26,99 +34,298 @@ def _weighted_orientation_deg(angles_deg: List[float], weights: List[float]) ->
     return float(ori_deg)
 
 
-def detect_shadow(
-    image_path: str,
-    canny_low: int = 50,
-    canny_high: int = 150,
-    hough_threshold: int = 80,
-    min_line_length_ratio: float = 0.1,
-    max_line_gap: int = 10,
-    vertical_tolerance_deg: float = 35.0  # Új paraméter: tolerancia a függőleges vonalakhoz
-) -> Dict:
-    """
-    Árnyékvonalak detektálása, domináns árnyék-orientáció és roll (kamera forgatás) becslése.
-
-    Visszatérés:
-      {
-        "shadow_direction": <float|None>,   # fok, 0..180
-        "detected_lines": [ [[x1,y1,x2,y2]], ... ],
-        "estimated_latitude": None,
-        "roll_deg": <float|None>            # Új: a kamera roll szöge (fokban)
-      }
-    """
-    # [A meglévő képbetöltés és előfeldolgozás változatlan]
-    img = cv2.imread(image_path)
-    if img is None:
-        raise FileNotFoundError(f"Kép nem olvasható: {image_path}")
-    h, w = img.shape[:2]
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-    gray = clahe.apply(gray)
-    gray = cv2.GaussianBlur(gray, (5, 5), 0)
-    edges = cv2.Canny(gray, canny_low, canny_high)
-    min_len = int(min(h, w) * max(0.0, min_line_length_ratio))
-    lines = cv2.HoughLinesP(
-        edges,
-        rho=1,
-        theta=np.pi / 180.0,
-        threshold=hough_threshold,
-        minLineLength=max(10, min_len),
-        maxLineGap=max_line_gap,
-    )
-
-    if lines is None or len(lines) == 0:
-        return {
-            "shadow_direction": None,
-            "detected_lines": [],
-            "estimated_latitude": None,
-            "roll_deg": None  # Új
-        }
-
+def _analyze_lines(lines, h: int, w: int, vertical_tolerance_deg: float) -> Dict:
+    """HoughLinesP kimenet -> domináns árnyék-orientáció, vonalak és roll.
+    A roll a függőlegeshez (90°) közeli vonalak hosszal súlyozott eltérése;
+    pozitív: az óramutató járásával megegyező forgatás."""
     angles_deg: List[float] = []
     lengths: List[float] = []
-    detected_lines: List[List[List[int]]] = []
-    vertical_angles: List[float] = []   # Új: csak a függőleges vonalak szögei
-    vertical_weights: List[float] = []  # Új: a függőleges vonalak súlyai (hosszuk)
+    detected_lines: List[List[List[int]]] = []  # [[x1,y1,x2,y2]] alak a main-hez
+    vertical_angles: List[float] = []
+    vertical_weights: List[float] = []
 
-    for l in lines:
+    for l in lines if lines is not None else ():
         x1, y1, x2, y2 = map(int, l[0])
         dx = x2 - x1
         dy = y2 - y1
         length = float(math.hypot(dx, dy))
         if length < max(10.0, 0.02 * (h + w)):
             continue
-        angle = math.degrees(math.atan2(dy, dx))
-        angle = (angle + 180.0) % 180.0
+        angle = math.degrees(math.atan2(dy, dx))  # -180..180
+        angle = (angle + 180.0) % 180.0           # 0..180 (irányt elhagyjuk)
 
         angles_deg.append(angle)
         lengths.append(length)
         detected_lines.append([[x1, y1, x2, y2]])
-
-        # Új: Függőleges vonalak kiválogatása a roll számításához
-        # A függőleges irány 90 fok. +/- tolerancia.
         if abs(angle - 90.0) <= vertical_tolerance_deg:
             vertical_angles.append(angle)
             vertical_weights.append(length)
 
-    shadow_dir = _weighted_orientation_deg(angles_deg, lengths) if angles_deg else None
-
-    # Új: Roll számítás a függőleges vonalakból
     roll_deg = None
     if vertical_angles:
-        # Minden vonal eltérése a 90 fokos ideálistól
-        deviations = [angle - 90.0 for angle in vertical_angles]
-        # Súlyozott átlag számítás a vonalhosszakkal
         total_weight = sum(vertical_weights)
-        roll_deg = sum(dev * weight for dev, weight in zip(deviations, vertical_weights)) / total_weight
-        # A roll értéke most az eltérés átlaga. Pozitív: az óramutató járásával megegyező forgatás.
+        roll_deg = sum((a - 90.0) * wt for a, wt in zip(vertical_angles, vertical_weights)) / total_weight
 
     return {
-        "shadow_direction": shadow_dir,
+        "shadow_direction": _weighted_orientation_deg(angles_deg, lengths) if angles_deg else None,
         "detected_lines": detected_lines,
         "estimated_latitude": None,
-        "roll_deg": roll_deg  # Új
+        "roll_deg": roll_deg,
     }
 
+
+# ------------------------------
+# ELEMZŐ MOTOR (CACHE + PARAMÉTER-SÖPRÉS)
+# ------------------------------
+DEFAULT_PARAMS = {
+    "canny_low": 50,
+    "canny_high": 150,
+    "hough_threshold": 80,
+    "min_line_length_ratio": 0.1,
+    "max_line_gap": 10,
+    "vertical_tolerance_deg": 35.0,
+}
+
+# Időkeretes (deadline) futásnál a durva szint leghosszabb oldala; a JPEG-et a dekóder
+# eleve kicsinyítve olvassa (IMREAD_REDUCED_*), így a teljes dekódolás is megspórolható
+COARSE_MAX_SIDE = 640
+_REDUCED_FLAGS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+
+class ShadowEngine:
+    """Árnyékvonal-elemzés előfeldolgozás-cache-sel.
+    A CLAHE + blur eredménye képenként (útvonal, méret, mtime), az élkép képenként és
+    (canny_low, canny_high) páronként cache-elt (LRU), így a Hough paraméterek hangolása
+    nem ismétli az előfeldolgozást. A sweep() sok Hough konfigurációt futtat párhuzamosan
+    a közös élképeken (a cv2 elengedi a GIL-t).
+    A cache-ek bájtban korlátosak (a modul szintű motor minden worker életén át él); a
+    korlátnál nagyobb tömb nem kerül a cache-be."""
+
+    def __init__(self, max_gray_bytes: int = 32 * 2**20, max_edge_bytes: int = 32 * 2**20):
+        self.max_gray_bytes = max_gray_bytes
+        self.max_edge_bytes = max_edge_bytes
+        self._gray: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._edges: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Teljes felbontású elemzés mért költsége (mp / megapixel, mozgóátlag) a deadline becsléshez
+        self.seconds_per_mpx = 0.04
+
+    @staticmethod
+    def _image_key(image_path: str) -> tuple:
+        try:
+            st = os.stat(image_path)
+        except OSError:
+            raise FileNotFoundError(f"Kép nem olvasható: {image_path}")
+        return (os.path.abspath(image_path), st.st_size, st.st_mtime_ns)
+
+    @staticmethod
+    def _cache_get(cache: OrderedDict, key):
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+    @staticmethod
+    def _cache_put(cache: OrderedDict, key, value: np.ndarray, max_bytes: int) -> None:
+        if value.nbytes > max_bytes:
+            return
+        cache[key] = value
+        cache.move_to_end(key)
+        total = sum(v.nbytes for v in cache.values())
+        while total > max_bytes:
+            total -= cache.popitem(last=False)[1].nbytes
+
+    @staticmethod
+    def coarse_factor(image_path: str, side: Optional[int] = None) -> int:
+        """Kicsinyítési tényező (1, 2, 4 vagy 8) a durva szinthez; 1 = nincs külön durva szint.
+        side: a kép hosszabb oldala, ha már ismert (különben a fejlécből)"""
+        if side is None:
+            from PIL import Image  # csak a fejlécet olvassa
+
+            with Image.open(image_path) as im:
+                side = max(im.size)
+        if side <= COARSE_MAX_SIDE * 1.5:
+            return 1
+        for factor in (2, 4, 8):
+            if side / factor <= COARSE_MAX_SIDE:
+                return factor
+        return 8
+
+    def preprocess(self, image_path: str, reduce: int = 1) -> np.ndarray:
+        """Kontrasztjavított, simított szürke kép (cache-elt); reduce: 1, 2, 4 vagy 8-szoros kicsinyítés"""
+        key = self._image_key(image_path) + (reduce,)
+        with self._lock:
+            gray = self._cache_get(self._gray, key)
+        if gray is not None:
+            return gray
+
+        with span("shadow:decode", file=image_path, reduce=reduce):
+            img = cv2.imread(image_path, _REDUCED_FLAGS[reduce])
+        if img is None:
+            raise FileNotFoundError(f"Kép nem olvasható: {image_path}")
+        gray = self._enhance(img)
+
+        with self._lock:
+            self._cache_put(self._gray, key, gray, self.max_gray_bytes)
+        return gray
+
+    def edges(self, image_path: str, canny_low: int = 50, canny_high: int = 150, reduce: int = 1,
+              gray: Optional[np.ndarray] = None) -> np.ndarray:
+        """Canny élkép (képenként, küszöbpáronként és kicsinyítésenként cache-elt);
+        gray: a preprocess() már elkészült kimenete (ha a cache-be nem fért)"""
+        key = self._image_key(image_path) + (canny_low, canny_high, reduce)
+        with self._lock:
+            edges = self._cache_get(self._edges, key)
+        if edges is not None:
+            return edges
+        if gray is None:
+            gray = self.preprocess(image_path, reduce)
+        with span("shadow:canny"):
+            edges = cv2.Canny(gray, canny_low, canny_high)
+        with self._lock:
+            self._cache_put(self._edges, key, edges, self.max_edge_bytes)
+        return edges
+
+    @staticmethod
+    def _enhance(img: np.ndarray) -> np.ndarray:
+        """Kontrasztjavítás és zajcsökkentés"""
+        with span("shadow:clahe"):
+            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+            gray = clahe.apply(img)
+        with span("shadow:blur"):
+            return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._gray.clear()
+            self._edges.clear()
+
+    @staticmethod
+    def _hough(edges: np.ndarray, hough_threshold: int, min_line_length_ratio: float,
+               max_line_gap: int, vertical_tolerance_deg: float, reduce: int = 1) -> Dict:
+        """Hough + elemzés; kicsinyített élképen a szavazat-küszöb és a hézag arányosan kisebb,
+        a vonalak eredeti képkoordinátában térnek vissza"""
+        h, w = edges.shape[:2]
+        min_len = int(min(h, w) * max(0.0, min_line_length_ratio))
+        with span("shadow:hough", reduce=reduce) as sp:
+            lines = cv2.HoughLinesP(
+                edges,
+                rho=1,
+                theta=np.pi / 180.0,
+                threshold=max(10, hough_threshold // reduce),
+                minLineLength=max(10 // reduce, min_len),
+                maxLineGap=max(1, max_line_gap // reduce),
+            )
+            sp.set(lines=0 if lines is None else len(lines))
+        if lines is not None and reduce > 1:
+            lines = lines * reduce
+        return _analyze_lines(lines, h * reduce, w * reduce, vertical_tolerance_deg)
+
+    def detect(self, image_path: str, canny_low: int = 50, canny_high: int = 150,
+               hough_threshold: int = 80, min_line_length_ratio: float = 0.1,
+               max_line_gap: int = 10, vertical_tolerance_deg: float = 35.0,
+               deadline=None) -> Dict:
+        """deadline (mp vagy Deadline): durva-finom sorrend - előbb kicsinyített kép, a teljes
+        felbontás csak ha a becsült költsége (durva idő x pixelarány) belefér a keretbe.
+        Az eredmény "complete" kulcsa jelzi, hogy a teljes felbontású elemzés lefutott-e."""
+        params = (hough_threshold, min_line_length_ratio, max_line_gap, vertical_tolerance_deg)
+        deadline = Deadline.coerce(deadline)
+        if deadline is not None:
+            factor = self.coarse_factor(image_path)
+            if factor > 1:
+                edges = self.edges(image_path, canny_low, canny_high, factor)
+                coarse = self._hough(edges, *params, reduce=factor)
+                mpx = edges.size * factor * factor / 1e6
+                if deadline.remaining() < self.seconds_per_mpx * mpx:
+                    coarse["complete"] = False
+                    return coarse
+
+        with self._lock:
+            cached = self._image_key(image_path) + (canny_low, canny_high, 1) in self._edges
+        t0 = time.perf_counter()
+        edges = self.edges(image_path, canny_low, canny_high)
+        result = self._hough(edges, *params)
+        if not cached:
+            rate = (time.perf_counter() - t0) / (edges.size / 1e6)
+            self.seconds_per_mpx = 0.7 * self.seconds_per_mpx + 0.3 * rate
+        result["complete"] = True
+        return result
+
+    def detect_array(self, image: np.ndarray, canny_low: int = 50, canny_high: int = 150,
+                     hough_threshold: int = 80, min_line_length_ratio: float = 0.1,
+                     max_line_gap: int = 10, vertical_tolerance_deg: float = 35.0,
+                     deadline=None) -> Dict:
+        """Mint a detect(), de már dekódolt képen (szürke vagy BGR, pl. a streaming pipeline-ból).
+        Nincs cache: a tömbnek nincs stabil kulcsa, és a hívó a memóriát is maga kezeli.
+        A durva szint itt cv2.resize (INTER_AREA) kicsinyítés."""
+        params = (hough_threshold, min_line_length_ratio, max_line_gap, vertical_tolerance_deg)
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        deadline = Deadline.coerce(deadline)
+        if deadline is not None:
+            factor = self.coarse_factor(None, max(gray.shape[:2]))
+            if factor > 1:
+                small = cv2.resize(gray, (gray.shape[1] // factor, gray.shape[0] // factor),
+                                   interpolation=cv2.INTER_AREA)
+                edges = cv2.Canny(self._enhance(small), canny_low, canny_high)
+                del small
+                coarse = self._hough(edges, *params, reduce=factor)
+                if deadline.remaining() < self.seconds_per_mpx * gray.size / 1e6:
+                    coarse["complete"] = False
+                    return coarse
+
+        t0 = time.perf_counter()
+        with span("shadow:canny"):
+            edges = cv2.Canny(self._enhance(gray), canny_low, canny_high)
+        result = self._hough(edges, *params)
+        rate = (time.perf_counter() - t0) / (edges.size / 1e6)
+        self.seconds_per_mpx = 0.7 * self.seconds_per_mpx + 0.3 * rate
+        result["complete"] = True
+        return result
+
+    def sweep(self, image_path: str, configs: Iterable[Dict], max_workers: Optional[int] = None) -> List[Dict]:
+        """Több paraméterkészlet egy képen. configs: DEFAULT_PARAMS kulcsainak részhalmazai.
+        Visszatérés configs sorrendjében: [{"params", "shadow_direction", "roll_deg",
+        "line_count", "detected_lines", ...}, ...]"""
+        params = [dict(DEFAULT_PARAMS, **c) for c in configs]
+        # Élképek egyszer, Canny-páronként, közös előfeldolgozásból (a cache-be nem férő nagy
+        # képnél sem dekódolunk páronként újra); a Hough hívások párhuzamosan a közös élképeken
+        edge_maps = {}
+        gray = None
+        for p in params:
+            pair = (p["canny_low"], p["canny_high"])
+            if pair not in edge_maps:
+                if gray is None:
+                    gray = self.preprocess(image_path)
+                edge_maps[pair] = self.edges(image_path, *pair, gray=gray)
+        del gray
+
+        def run(p):
+            result = self._hough(edge_maps[(p["canny_low"], p["canny_high"])], p["hough_threshold"],
+                                 p["min_line_length_ratio"], p["max_line_gap"], p["vertical_tolerance_deg"])
+            result["params"] = p
+            result["line_count"] = len(result["detected_lines"])
+            result["complete"] = True
+            return result
+
+        with span("shadow:sweep", configs=len(params)):
+            if len(params) <= 1 or max_workers == 1:
+                return [run(p) for p in params]
+            with ThreadPoolExecutor(max_workers=max_workers or min(len(params), os.cpu_count() or 1)) as pool:
+                return list(pool.map(run, params))
+
+
+_ENGINE = ShadowEngine()
+
+
+def get_engine() -> ShadowEngine:
+    return _ENGINE
+
+
 def detect_shadow(
     image_path: str,
     canny_low: int = 50,
@@ -126,80 +333,32 @@ def detect_shadow(
     hough_threshold: int = 80,
     min_line_length_ratio: float = 0.1,
     max_line_gap: int = 10,
+    vertical_tolerance_deg: float = 35.0,
+    deadline=None,
+    image: Optional[np.ndarray] = None,
 ) -> Dict:
     """
-    Árnyékvonalak detektálása és domináns árnyék-orientáció becslése.
+    Árnyékvonalak detektálása, domináns árnyék-orientáció és roll (kamera forgatás) becslése.
+    Az előfeldolgozást (CLAHE, blur, Canny) a megosztott ShadowEngine cache-eli.
 
     Visszatérés:
       {
         "shadow_direction": <float|None>,   # fok, 0..180 (kép koordinátarendszerben)
         "detected_lines": [ [[x1,y1,x2,y2]], ... ],  # HoughLinesP formátumhoz hasonló, hogy a main-ben a line[0] működjön
-        "estimated_latitude": None           # helykitöltő kulcs a main kompatibilitás miatt
+        "estimated_latitude": None,          # helykitöltő kulcs a main kompatibilitás miatt
+        "roll_deg": <float|None>,            # a függőleges vonalakból becsült kamera roll (fok)
+        "complete": <bool>                   # False: időkeret miatt csak a durva szint futott
       }
+    deadline: időkeret másodpercben vagy megosztott Deadline (None = korlátlan)
+    image: már dekódolt kép (szürke vagy BGR); ilyenkor a fájl nem töltődik be és nincs cache
     """
-    img = cv2.imread(image_path)
-    if img is None:
-        raise FileNotFoundError(f"Kép nem olvasható: {image_path}")
-
-    h, w = img.shape[:2]
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-
-    # Kontrasztjavítás és zajcsökkentés
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-    gray = clahe.apply(gray)
-    gray = cv2.GaussianBlur(gray, (5, 5), 0)
-
-    # Éldetektálás
-    edges = cv2.Canny(gray, canny_low, canny_high)
-
-    # Hough transform vonalakra
-    min_len = int(min(h, w) * max(0.0, min_line_length_ratio))
-    lines = cv2.HoughLinesP(
-        edges,
-        rho=1,
-        theta=np.pi / 180.0,
-        threshold=hough_threshold,
-        minLineLength=max(10, min_len),
-        maxLineGap=max_line_gap,
-    )
-
-    if lines is None or len(lines) == 0:
-        return {
-            "shadow_direction": None,
-            "detected_lines": [],
-            "estimated_latitude": None,
-        }
-
-    # Szögek és hosszok gyűjtése
-    angles_deg: List[float] = []
-    lengths: List[float] = []
-    detected_lines: List[List[List[int]]] = []  # [[x1,y1,x2,y2]] alak a main-hez
+    if image is not None:
+        return _ENGINE.detect_array(image, canny_low, canny_high, hough_threshold,
+                                    min_line_length_ratio, max_line_gap, vertical_tolerance_deg, deadline)
+    return _ENGINE.detect(image_path, canny_low, canny_high, hough_threshold,
+                          min_line_length_ratio, max_line_gap, vertical_tolerance_deg, deadline)
 
-    for l in lines:
-        x1, y1, x2, y2 = map(int, l[0])
-        dx = x2 - x1
-        dy = y2 - y1
-        length = float(math.hypot(dx, dy))
-        if length < max(10.0, 0.02 * (h + w)):
-            continue
-        angle = math.degrees(math.atan2(dy, dx))  # -180..180
-        angle = (angle + 180.0) % 180.0           # 0..180 (irányt elhagyjuk)
-
-        angles_deg.append(angle)
-        lengths.append(length)
-        detected_lines.append([[x1, y1, x2, y2]])
-
-    if not angles_deg:
-        return {
-            "shadow_direction": None,
-            "detected_lines": [],
-            "estimated_latitude": None,
-        }
-
-    shadow_dir = _weighted_orientation_deg(angles_deg, lengths)
 
-    return {
-        "shadow_direction": shadow_dir,
-        "detected_lines": detected_lines,
-        "estimated_latitude": None,
-    }
+def sweep_shadow(image_path: str, configs: Iterable[Dict], max_workers: Optional[int] = None) -> List[Dict]:
+    """Paraméter-söprés a megosztott motorral (lásd ShadowEngine.sweep)"""
+    return _ENGINE.sweep(image_path, configs, max_workers)
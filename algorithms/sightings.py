@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+SIGHTINGS.PY - Rendszám-észlelések indexe ("hol és mikor láttuk ezt a rendszámot")
+
+Minden felismert rendszám egy sor: normalizált rendszám, kép sha256, befoglaló doboz
+(eredeti képkoordinátában), OCR konfidencia, valamint az EXIF felvételi idő és GPS,
+ha van. A tábla WITHOUT ROWID, elsődleges kulcsa (plate, sha256, x, y): egy rendszám
+összes észlelése fizikailag egymás mellett van, így a teljes előzmény egyetlen
+tartomány-olvasás akár több millió sor mellett is. Időablakos lekérdezéshez a
+felvételi időn (taken) külön index van.
+
+A ResultStore.save_many ugyanabban a tranzakcióban írja az észleléseket, amelyben a
+modul-eredményeket. A jobqueue worker foglalási kötegenként (--batch), az ingest és a
+streaming pipeline save_batch képenként hívja, így az észlelések kötegelve kerülnek be.
+Hibás (None) plate_rec eredmény a korábbi észleléseket nem törli.
+
+Használat:
+    python -m algorithms.sightings <rendszám> [--db results.db] [--since 2024-01-01] [--until ...]
+    python -m algorithms.sightings --backfill [--db results.db]
+"""
+
+import calendar
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS plate_sightings (
+        plate TEXT NOT NULL,
+        sha256 TEXT NOT NULL,
+        x INTEGER NOT NULL,
+        y INTEGER NOT NULL,
+        w INTEGER,
+        h INTEGER,
+        taken REAL,
+        country_code TEXT,
+        confidence REAL,
+        lat REAL,
+        lon REAL,
+        image TEXT,
+        PRIMARY KEY (plate, sha256, x, y)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS sightings_taken ON plate_sightings(taken) WHERE taken IS NOT NULL;
+    CREATE INDEX IF NOT EXISTS sightings_sha256 ON plate_sightings(sha256);
+"""
+COLUMNS = ("plate", "sha256", "x", "y", "w", "h", "taken", "country_code", "confidence", "lat", "lon", "image")
+INSERT_SQL = f"INSERT OR REPLACE INTO plate_sightings VALUES ({', '.join('?' * len(COLUMNS))})"
+EXIF_TIME_TAGS = ("DateTimeOriginal", "DateTimeDigitized", "DateTime")
+
+
+def normalize_plate(text: str) -> str:
+    """Keresési kulcs: nagybetűs, csak betűk és számjegyek ("ab-123" -> "AB123")"""
+    return re.sub(r"[^0-9A-Z]", "", (text or "").upper())
+
+
+def parse_exif_time(value: Optional[str]) -> Optional[float]:
+    """EXIF "ÉÉÉÉ:HH:NN ÓÓ:PP:MM" -> epoch másodperc (a fényképező órája szerint, zóna nélkül)"""
+    if not value:
+        return None
+    try:
+        return float(calendar.timegm(time.strptime(str(value).strip()[:19], "%Y:%m:%d %H:%M:%S")))
+    except ValueError:
+        return None
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """Parancssori / lekérdezési idő: epoch szám, "ÉÉÉÉ-HH-NN" vagy "ÉÉÉÉ-HH-NN ÓÓ:PP:MM" """
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d"):
+        try:
+            return float(calendar.timegm(time.strptime(value, fmt)))
+        except ValueError:
+            continue
+    raise ValueError(f"Ismeretlen időformátum: {value}")
+
+
+def sighting_rows(sha256: str, image: str, module_results: Dict[str, object]) -> List[Tuple]:
+    """Észlelés-sorok egy kép modul-eredményeiből (plate_rec + meta az időhöz / GPS-hez).
+    A pozíció a feldolgozott (max. 1000 px széles) képen van, ezért a scale-lel visszaskálázzuk."""
+    plates = module_results.get("plate_rec")
+    if not plates:
+        return []
+    meta = module_results.get("meta") or {}
+    exif = meta.get("exif") or {}
+    taken = next((t for t in (parse_exif_time(exif.get(tag)) for tag in EXIF_TIME_TAGS) if t is not None), None)
+    gps = meta.get("gps") or {}
+    lat, lon = gps.get("latitude"), gps.get("longitude")
+
+    rows = []
+    for p in plates:
+        plate = normalize_plate(p.get("plate"))
+        if not plate:
+            continue
+        scale = p.get("scale") or 1.0
+        x, y, w, h = (int(round(v / scale)) for v in (p.get("position") or (0, 0, 0, 0)))
+        rows.append((plate, sha256, x, y, w, h, taken, p.get("country_code"), p.get("confidence"),
+                     lat, lon, image))
+    return rows
+
+
+# ============ ÉSZLELÉS-TÁR ============
+
+class SightingStore:
+    """Lekérdezések és tömeges betöltés a plate_sightings táblára."""
+
+    def __init__(self, db_path: str = "results.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM plate_sightings").fetchone()[0]
+
+    # --- Beszúrás ---
+    def add_many(self, rows: Iterable[Tuple], batch_size: int = 10000) -> int:
+        """Tömeges betöltés (COLUMNS sorrendű sorok), kötegenként egy tranzakció"""
+        inserted = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                inserted += self._insert_batch(batch)
+                batch = []
+        if batch:
+            inserted += self._insert_batch(batch)
+        return inserted
+
+    def _insert_batch(self, batch: List[Tuple]) -> int:
+        # Kulcs szerinti sorrendben a B-fa lapjai sorban telnek (véletlen sorrendnél lapugrálás)
+        batch.sort(key=lambda row: row[:4])
+        with self._lock, self._conn:
+            self._conn.executemany(INSERT_SQL, batch)
+        return len(batch)
+
+    def backfill(self, batch_size: int = 10000) -> int:
+        """Észlelések a results táblában már meglévő plate_rec (+ meta) eredményekből"""
+        with self._lock:
+            rows = self._conn.execute("""SELECT r.sha256, i.image, r.result, m.result
+                                         FROM results r
+                                         LEFT JOIN results m ON m.sha256 = r.sha256 AND m.module = 'meta'
+                                         LEFT JOIN images i ON i.sha256 = r.sha256
+                                         WHERE r.module = 'plate_rec'""").fetchall()
+
+        def generate():
+            for sha256, image, plates, meta in rows:
+                results = {"plate_rec": json.loads(plates), "meta": json.loads(meta) if meta else None}
+                yield from sighting_rows(sha256, image, results)
+
+        return self.add_many(generate(), batch_size)
+
+    # --- Lekérdezések ---
+    def history(self, plate: str, since: Optional[float] = None, until: Optional[float] = None,
+                limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        """Egy rendszám összes észlelése felvételi idő szerint (ismeretlen idő a végén)"""
+        sql = f"SELECT {', '.join(COLUMNS)} FROM plate_sightings WHERE plate = ?"
+        params: list = [normalize_plate(plate)]
+        if since is not None:
+            sql += " AND taken >= ?"
+            params.append(since)
+        if until is not None:
+            sql += " AND taken < ?"
+            params.append(until)
+        sql += " ORDER BY taken IS NULL, taken, sha256"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._row_dict(r) for r in rows]
+
+    def between(self, since: float, until: float, limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        """Minden észlelés egy időablakban (sightings_taken index)"""
+        sql = f"""SELECT {', '.join(COLUMNS)} FROM plate_sightings
+                  WHERE taken >= ? AND taken < ? ORDER BY taken"""
+        params: list = [since, until]
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._row_dict(r) for r in rows]
+
+    @staticmethod
+    def _row_dict(row: Sequence) -> Dict:
+        d = dict(zip(COLUMNS, row))
+        d["bbox"] = (d.pop("x"), d.pop("y"), d.pop("w"), d.pop("h"))
+        d["taken_iso"] = (time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(d["taken"]))
+                          if d["taken"] is not None else None)
+        return d
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_STORES: Dict[str, SightingStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_sightings(db_path: str = "results.db") -> SightingStore:
+    """Folyamatonként egy megosztott tár adatbázisonként."""
+    with _STORES_LOCK:
+        store = _STORES.get(db_path)
+        if store is None:
+            store = _STORES[db_path] = SightingStore(db_path)
+        return store
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rendszám-észlelések lekérdezése")
+    parser.add_argument("plate", nargs="?")
+    parser.add_argument("--db", default="results.db")
+    parser.add_argument("--since", help="Epoch vagy ÉÉÉÉ-HH-NN[ ÓÓ:PP:MM]")
+    parser.add_argument("--until")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--backfill", action="store_true", help="Meglévő plate_rec eredmények betöltése")
+    args = parser.parse_args()
+
+    store = SightingStore(args.db)
+    if args.backfill:
+        print(f"[SIGHTINGS] {store.backfill()} észlelés betöltve")
+    if args.plate:
+        for s in store.history(args.plate, parse_time(args.since), parse_time(args.until), args.limit):
+            where = f"{s['lat']:.6f},{s['lon']:.6f}" if s["lat"] is not None else "-"
+            conf = f"{s['confidence']:.2f}" if s["confidence"] is not None else "-"
+            print(f"{s['taken_iso'] or '?':19}  {s['plate']:10} {s['country_code'] or '':3} {where:23} "
+                  f"{conf:5} {s['bbox']}  {s['image']}")
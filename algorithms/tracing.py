@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+TRACING.PY - Szakaszonkénti időmérés és profilozás az elemző pipeline-hoz
+
+Használat:
+    from algorithms.tracing import span, traced, TRACER
+
+    with span("canny", low=50, high=150):
+        edges = cv2.Canny(gray, 50, 150)
+
+    with span("decode", file=image_path):    # a file méretéből bytes_read lesz
+        img = cv2.imread(image_path)
+
+Kikapcsolt állapotban (alapértelmezés) a span() egy megosztott, üres context
+managert ad vissza, így a többletköltség egy attribútum-ellenőrzés.
+Bekapcsolás: TRACER.enable() vagy OSINT_TRACE=<trace.json> környezeti változó
+(ilyenkor kilépéskor Chrome trace JSON készül, chrome://tracing / Perfetto).
+
+Memória (enable(trace_memory=True)): a tracemalloc csúcsa folyamatszintű, és a
+reset_peak() minden szálét nullázza. Ezért a peak_mem_kb csak azokon a span-eken
+szerepel, amelyek futása alatt más szálon nem volt nyitott memóriamérő span
+(egyszálú futás); a szálkészletekkel átfedő span-ek memóriát nem rögzítenek.
+"""
+
+import atexit
+import functools
+import json
+import math
+import os
+import threading
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __bool__(self):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ("tracer", "name", "args", "t0", "cpu0", "mem_carry", "parent", "overlaps0")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.mem_carry = 0
+        self.parent = None
+
+    def set(self, **args):
+        """Utólagos attribútumok (pl. találatok száma)"""
+        self.args.update(args)
+
+    def __enter__(self):
+        if self.tracer.trace_memory:
+            # Egymásba ágyazott span-ek: a belső span nullázza a csúcsot, ezért az addigi
+            # csúcsot a szülőnél őrizzük meg (mem_carry)
+            local = self.tracer._local
+            stack = getattr(local, "stack", None)
+            if stack is None:
+                stack = local.stack = []
+            if stack:
+                self.parent = stack[-1]
+                self.parent.mem_carry = max(self.parent.mem_carry, tracemalloc.get_traced_memory()[1])
+            stack.append(self)
+            self.overlaps0 = self.tracer._mem_enter()
+            tracemalloc.reset_peak()
+        self.cpu0 = time.thread_time()
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        t1 = time.perf_counter()
+        cpu = time.thread_time() - self.cpu0
+        args = self.args
+        if self.tracer.trace_memory:
+            peak = max(tracemalloc.get_traced_memory()[1], self.mem_carry)
+            # Más szál span-jével átfedve a csúcsot az is nullázhatta / növelhette: nem rögzítjük
+            if self.tracer._mem_exit() == self.overlaps0:
+                args["peak_mem_kb"] = round(peak / 1024, 1)
+            if self.parent is not None:
+                self.parent.mem_carry = max(self.parent.mem_carry, peak)
+            self.tracer._local.stack.pop()
+        path = args.pop("file", None)
+        if path is not None:
+            try:
+                args["bytes_read"] = os.path.getsize(path)
+            except OSError:
+                pass
+        if exc_type is not None:
+            args["error"] = exc_type.__name__
+        self.tracer._record(self.name, self.t0, t1, cpu, args)
+        return False
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.trace_memory = False
+        self._lock = threading.Lock()
+        self._events: List[tuple] = []
+        self._origin = time.perf_counter()
+        self._local = threading.local()
+        # Memóriamérő span-ek szálanként (nyitott darabszám) és a szálak közti átfedések száma
+        self._mem_threads: Dict[int, int] = {}
+        self._mem_overlaps = 0
+
+    def _mem_enter(self) -> int:
+        """Span nyitása: ha más szálon is van nyitott span, az átfedés-számláló nő. Visszatér a
+        számlálóval; a span végén változatlan érték = a futás alatt nem volt átfedés."""
+        tid = threading.get_ident()
+        with self._lock:
+            if any(t != tid for t in self._mem_threads):
+                self._mem_overlaps += 1
+            self._mem_threads[tid] = self._mem_threads.get(tid, 0) + 1
+            return self._mem_overlaps
+
+    def _mem_exit(self) -> int:
+        tid = threading.get_ident()
+        with self._lock:
+            overlaps = self._mem_overlaps
+            if any(t != tid for t in self._mem_threads):
+                overlaps += 1  # még fut egy másik szál span-je: ez is átfedés (a számláló nem nő)
+            depth = self._mem_threads.get(tid, 1) - 1
+            if depth:
+                self._mem_threads[tid] = depth
+            else:
+                self._mem_threads.pop(tid, None)
+            return overlaps
+
+    def enable(self, trace_memory: bool = False) -> None:
+        """Bekapcsolás; trace_memory=True esetén tracemalloc alapú csúcsmemória is (lassabb)"""
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.trace_memory = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._events = []
+            self._origin = time.perf_counter()
+
+    def span(self, name: str, **args):
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, args)
+
+    def _record(self, name, t0, t1, cpu, args) -> None:
+        event = (name, t0, t1, cpu, os.getpid(), threading.get_ident(), args)
+        with self._lock:
+            self._events.append(event)
+
+    @property
+    def events(self) -> List[tuple]:
+        with self._lock:
+            return list(self._events)
+
+    # --- Export ---
+    def chrome_trace(self) -> Dict:
+        """Chrome trace formátum ("X" = teljes esemény, µs időbélyegekkel)"""
+        trace_events = []
+        for name, t0, t1, cpu, pid, tid, args in self.events:
+            trace_events.append({
+                "name": name,
+                "cat": name.split(":")[0],
+                "ph": "X",
+                "ts": round((t0 - self._origin) * 1e6, 3),
+                "dur": round((t1 - t0) * 1e6, 3),
+                "pid": pid,
+                "tid": tid,
+                "args": dict(args, cpu_ms=round(cpu * 1000, 3)),
+            })
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def export_chrome(self, path: str) -> str:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+        return path
+
+    def histograms(self) -> Dict[str, Dict]:
+        """Szakaszonkénti aggregált statisztika: darabszám, összes/átlag/percentilisek,
+        CPU idő, és log2 hisztogram milliszekundumban ("<=1ms", "<=2ms", ...)"""
+        by_name: Dict[str, List[tuple]] = {}
+        for name, t0, t1, cpu, _, _, args in self.events:
+            by_name.setdefault(name, []).append(((t1 - t0) * 1000.0, cpu * 1000.0, args))
+
+        stats = {}
+        for name, rows in by_name.items():
+            walls = sorted(r[0] for r in rows)
+            buckets: Dict[str, int] = {}
+            for ms in walls:
+                edge = 2 ** max(0, math.ceil(math.log2(ms))) if ms > 0 else 1
+                key = f"<={edge}ms"
+                buckets[key] = buckets.get(key, 0) + 1
+            stats[name] = {
+                "count": len(walls),
+                "total_ms": sum(walls),
+                "mean_ms": sum(walls) / len(walls),
+                "p50_ms": _percentile(walls, 50),
+                "p90_ms": _percentile(walls, 90),
+                "p99_ms": _percentile(walls, 99),
+                "max_ms": walls[-1],
+                "cpu_ms": sum(r[1] for r in rows),
+                "bytes_read": sum(r[2].get("bytes_read", 0) for r in rows),
+                "peak_mem_kb": max((r[2].get("peak_mem_kb", 0) for r in rows), default=0),
+                "histogram": buckets,
+            }
+        return stats
+
+    def summary(self) -> str:
+        lines = [f"{'szakasz':32s} {'db':>5s} {'össz ms':>10s} {'p50':>8s} {'p90':>8s} {'max':>8s} {'cpu ms':>10s}"]
+        stats = self.histograms()
+        for name, s in sorted(stats.items(), key=lambda kv: kv[1]["total_ms"], reverse=True):
+            lines.append(f"{name:32s} {s['count']:5d} {s['total_ms']:10.1f} {s['p50_ms']:8.1f} "
+                         f"{s['p90_ms']:8.1f} {s['max_ms']:8.1f} {s['cpu_ms']:10.1f}")
+        return "\n".join(lines)
+
+
+def _percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100.0
+    lo, hi = math.floor(k), math.ceil(k)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+TRACER = Tracer()
+
+
+def span(name: str, **args):
+    """Időmérő szakasz a globális tracerrel (kikapcsolva no-op)"""
+    if not TRACER.enabled:
+        return _NULL_SPAN
+    return Span(TRACER, name, args)
+
+
+def traced(name: Optional[str] = None):
+    """Dekorátor: a teljes függvényhívást egy span-be csomagolja"""
+    def decorator(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return fn(*args, **kwargs)
+            with Span(TRACER, span_name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+_env_trace = os.environ.get("OSINT_TRACE")
+if _env_trace:
+    TRACER.enable(trace_memory=os.environ.get("OSINT_TRACE_MEMORY") == "1")
+    if _env_trace not in ("1", "true"):
+        atexit.register(TRACER.export_chrome, _env_trace)
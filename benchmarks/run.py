@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+RUN.PY - Reprodukálható benchmark a plate_recognition, haar_detection, detect_shadow és
+ShadowCalculator modulokra
+Áteresztőképesség, késleltetés percentilisek, memória csúcs és pontosság modulonként;
+az eredmények alapértékként elmenthetők, a regressziókat a futás jelzi (kilépési kód 1).
+Az idő- és memóriaküszöb relatív (--tolerance), de a zajküszöb alatti abszolút eltérés
+(NOISE_FLOOR_MS / NOISE_FLOOR_MB) nem regresszió: a mikroszekundumos mérések gépfüggők és zajosak.
+Alapérték nélkül (hiányzó fájl vagy modul) az összehasonlítás nem fut le csendben: kilépési kód 2.
+A commitolt benchmarks/baselines.json a determinisztikus szintetikus készleten (-n 30 --seed 0)
+készült; a plate modulé tesseract-tal rendelkező gépen adható hozzá (--save-baseline --modules plate).
+
+Használat:
+    python -m benchmarks.run [--modules plate,face,shadow,shadowcalc] [-n 30] [--seed 0]
+                             [--save-baseline] [--baseline benchmarks/baselines.json] [--tolerance 0.25]
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from benchmarks import synthetic
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+MEMORY_SAMPLES = 3
+# Ennél kisebb abszolút romlás nem regresszió (időzítési zaj, allokátor-ingadozás)
+NOISE_FLOOR_MS = 0.5
+NOISE_FLOOR_MB = 0.5
+
+
+# ============ MÉRÉS ============
+
+def _percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = (len(values) - 1) * p / 100.0
+    lo, hi = math.floor(k), math.ceil(k)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def measure(samples: List[Dict], run: Callable[[Dict], object], score: Callable[[Dict, object], float],
+            reset: Optional[Callable[[], None]] = None) -> Dict:
+    """Minden mintán: késleltetés (ms) és pontszám (0..1); utána memória csúcs néhány mintán
+    (tracemalloc lassít, ezért külön menetben).
+    reset: a modul cache-einek ürítése; a bemelegítés után és minden memória-minta előtt fut,
+    hogy se az időmérés, se a memória csúcs ne cache-találatot mérjen."""
+    run(samples[0])  # bemelegítés (lusta importok)
+    if reset:
+        reset()
+
+    latencies, scores = [], []
+    t_start = time.perf_counter()
+    for sample in samples:
+        t0 = time.perf_counter()
+        out = run(sample)
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+        scores.append(score(sample, out))
+    total = time.perf_counter() - t_start
+
+    tracemalloc.start()
+    peak = 0
+    for sample in samples[:MEMORY_SAMPLES]:
+        if reset:
+            reset()
+        tracemalloc.reset_peak()
+        run(sample)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    return {
+        "n": len(samples),
+        "throughput_per_s": len(samples) / total if total > 0 else 0.0,
+        "p50_ms": _percentile(latencies, 50),
+        "p90_ms": _percentile(latencies, 90),
+        "p99_ms": _percentile(latencies, 99),
+        "peak_mem_mb": peak / 1e6,
+        "accuracy": sum(scores) / len(scores),
+    }
+
+
+def _iou(a, b) -> float:
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+
+# ============ MODULOK ============
+
+def bench_plate(work_dir: str, n: int, seed: int) -> Dict:
+    """Pontosság: helyes rendszám szöveg (a pozíció IoU >= 0.3 mellett)"""
+    import pytesseract
+    from algorithms.plate_rec import plate_recognition
+
+    pytesseract.get_tesseract_version()  # tesseract nélkül a pontosság értelmetlen lenne
+    samples = synthetic.plate_dataset(os.path.join(work_dir, "plates"), n, seed)
+
+    def run(sample):
+        return plate_recognition(sample["path"], log_func=lambda *a: None)
+
+    def score(sample, results):
+        for r in results or []:
+            x, y, w, h = r["position"]
+            s = r.get("scale", 1.0)
+            box = (x / s, y / s, w / s, h / s)
+            if _iou(box, sample["bbox"]) >= 0.3 and r["plate"].replace("-", "") == sample["plate"]:
+                return 1.0
+        return 0.0
+
+    return measure(samples, run, score)
+
+
+def bench_face(work_dir: str, n: int, seed: int) -> Dict:
+    """Pontosság: képenként az IoU >= 0.3-mal párosított arcok aránya a több elemű listához
+    (igazság vagy találat) képest; arc nélküli képen a téves találat 0 pontot ér"""
+    from algorithms.haar import haar_detection
+
+    samples = synthetic.face_dataset(os.path.join(work_dir, "faces"), n, seed)
+
+    def score(sample, result):
+        found = list((result or {}).get("faces", []))
+        truth = sample["faces"]
+        if not truth and not found:
+            return 1.0
+        matched = 0
+        for box in truth:
+            best = max(found, key=lambda f: _iou(box, f), default=None)
+            if best is not None and _iou(box, best) >= 0.3:
+                found.remove(best)
+                matched += 1
+        return matched / max(len(truth), matched + len(found))
+
+    return measure(samples, lambda s: haar_detection(s["path"]), score)
+
+
+def bench_shadow(work_dir: str, n: int, seed: int) -> Dict:
+    """Pontosság: 1 - |szöghiba| / 90° (180°-periodikus)"""
+    from algorithms.shadowcalc import detect_shadow, get_engine
+
+    samples = synthetic.shadow_dataset(os.path.join(work_dir, "shadows"), n, seed)
+
+    def score(sample, result):
+        if result.get("shadow_direction") is None:
+            return 0.0
+        err = abs(result["shadow_direction"] - sample["angle_deg"]) % 180.0
+        return 1.0 - min(err, 180.0 - err) / 90.0
+
+    return measure(samples, lambda s: detect_shadow(s["path"]), score, reset=get_engine().clear)
+
+
+def _latitude_score(sample, result) -> float:
+    return 1.0 if abs(result["latitude_deg"] - sample["latitude_deg"]) <= 1.0 else 0.0
+
+
+def bench_shadowcalc(work_dir: str, n: int, seed: int) -> Dict:
+    """Pontosság: a szélesség-becslés 1°-on belüli aránya (process_measurement, mérésenként).
+    Egyetlen napmagasságból a szélességnek két megoldása lehet (pl. a két féltekén); a modul a
+    47° körüli priorhoz közelebbit adja, ezért a déli / egyenlítő közeli minták egy része
+    szükségszerűen hibás. Ez a várt plafon, nem hiba - az eredményben "note" jelzi."""
+    from algorithms.shadow import ShadowCalculator
+
+    samples = [dict(m, latitude_deg=s["latitude_deg"])
+               for s in synthetic.shadowcalc_dataset(n, seed) for m in s["measurements"]][:n]
+    calc = ShadowCalculator(utc_offset=1)
+    result = measure(samples, calc.process_measurement, _latitude_score)
+    result["note"] = "egy mérésből a szélesség kétértelmű (két gyök); a pontosság plafonja < 1"
+    return result
+
+
+def bench_shadowcalc_multi(work_dir: str, n: int, seed: int) -> Dict:
+    """Pontosság: a szélesség-becslés 1°-on belüli aránya (process_multiple, mérési sorozatonként)"""
+    from algorithms.shadow import ShadowCalculator
+
+    samples = synthetic.shadowcalc_dataset(n, seed)
+    calc = ShadowCalculator(utc_offset=1)
+    return measure(samples, lambda s: calc.process_multiple(s["measurements"]), _latitude_score)
+
+
+BENCHMARKS = {
+    "plate": bench_plate,
+    "face": bench_face,
+    "shadow": bench_shadow,
+    "shadowcalc": bench_shadowcalc,
+    "shadowcalc_multi": bench_shadowcalc_multi,
+}
+
+
+# ============ ALAPÉRTÉKEK ============
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Regresszió: lassabb p50/p90, kisebb áteresztőképesség vagy nagyobb memória a tolerancián
+    és a zajküszöbön túl, illetve bármilyen pontosságcsökkenés 0.02 felett."""
+
+    def worse(old: float, new: float, floor: float) -> bool:
+        return new > old * (1.0 + tolerance) and new - old > floor
+
+    problems = []
+    for name, res in results.items():
+        ref = baseline.get(name)
+        if not ref:
+            continue
+        for key, floor in (("p50_ms", NOISE_FLOOR_MS), ("p90_ms", NOISE_FLOOR_MS), ("peak_mem_mb", NOISE_FLOOR_MB)):
+            if ref.get(key) is not None and worse(ref[key], res[key], floor):
+                problems.append(f"{name}.{key}: {ref[key]:.3f} -> {res[key]:.3f}")
+        # Áteresztőképesség mintánkénti időként (ms), ugyanazzal a zajküszöbbel
+        if ref.get("throughput_per_s") and res["throughput_per_s"] and worse(
+                1000.0 / ref["throughput_per_s"], 1000.0 / res["throughput_per_s"], NOISE_FLOOR_MS):
+            problems.append(f"{name}.throughput_per_s: {ref['throughput_per_s']:.2f} -> {res['throughput_per_s']:.2f}")
+        if res["accuracy"] < ref.get("accuracy", 0.0) - 0.02:
+            problems.append(f"{name}.accuracy: {ref['accuracy']:.3f} -> {res['accuracy']:.3f}")
+    return problems
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="OSINT benchmark szintetikus adatokon")
+    parser.add_argument("--modules", default=",".join(BENCHMARKS))
+    parser.add_argument("-n", type=int, default=30, help="Minták száma modulonként")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="osint_bench_") as work_dir:
+        for name in args.modules.split(","):
+            try:
+                results[name] = BENCHMARKS[name](work_dir, args.n, args.seed)
+            except Exception as e:
+                print(f"[BENCH] {name} kihagyva: {e}")
+                continue
+            r = results[name]
+            print(f"{name:16s} n={r['n']:4d}  {r['throughput_per_s']:8.2f}/s  p50={r['p50_ms']:8.2f} ms  "
+                  f"p90={r['p90_ms']:8.2f} ms  p99={r['p99_ms']:8.2f} ms  mem={r['peak_mem_mb']:7.2f} MB  "
+                  f"acc={r['accuracy']:.3f}")
+            if r.get("note"):
+                print(f"{'':16s} megjegyzés: {r['note']}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    elif not args.save_baseline:
+        print(f"\nHIBA: nincs alapérték-fájl ({args.baseline}); készítsd el: --save-baseline")
+        return 2
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nAlapértékek elmentve: {args.baseline}")
+        return 0
+
+    missing = [name for name in results if name not in baseline]
+    for name in missing:
+        print(f"HIBA: {name}: nincs alapérték ({args.baseline}); készítsd el: --save-baseline --modules {name}")
+    problems = compare(results, baseline, args.tolerance)
+    for p in problems:
+        print(f"REGRESSZIÓ: {p}")
+    if problems:
+        return 1
+    return 2 if missing else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
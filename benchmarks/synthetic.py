@@ -0,0 +1,225 @@
+"""
+SYNTHETIC.PY - Determinisztikus szintetikus adatkészletek a benchmarkokhoz
+Minden generátor egy seed-ből dolgozik, hálózat és külső fájl nélkül.
+"""
+
+import math
+import os
+import random
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from algorithms.shadow import hour_angle, refraction_deg, solar_declination
+
+LETTERS = "ABCDEFGHIJKLMNOPRSTUVXYZ"
+DIGITS = "0123456789"
+COUNTRY_CODES = ["H", "D", "A", "F", "I"]
+
+
+# ============ HÁTTÉR ============
+
+def _scene_background(rng: np.random.Generator, size: Tuple[int, int]) -> np.ndarray:
+    """Zajos, színátmenetes háttér néhány véletlen téglalappal (utca-szerű zavaró élek)"""
+    w, h = size
+    yy, xx = np.mgrid[0:h, 0:w].astype(np.float32)
+    base = rng.uniform(60, 160, 3).astype(np.float32)
+    grad = rng.uniform(-0.05, 0.05, 2).astype(np.float32)
+    img = base[None, None, :] + (xx * grad[0] + yy * grad[1])[..., None]
+    img += rng.normal(0, 6, (h, w, 3)).astype(np.float32)
+    img = np.clip(img, 0, 255).astype(np.uint8)
+    for _ in range(int(rng.integers(3, 8))):
+        x0, y0 = int(rng.integers(0, w)), int(rng.integers(0, h))
+        x1, y1 = x0 + int(rng.integers(20, w // 3)), y0 + int(rng.integers(20, h // 3))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.rectangle(img, (x0, y0), (x1, y1), color, -1)
+    return img
+
+
+# ============ RENDSZÁMOK ============
+
+def random_plate_text(rng: random.Random) -> str:
+    """Magyar formátumú rendszám: AAA-123"""
+    return "".join(rng.choice(LETTERS) for _ in range(3)) + "-" + "".join(rng.choice(DIGITS) for _ in range(3))
+
+
+def render_plate(text: str, country_code: str, height: int = 110) -> np.ndarray:
+    """EU rendszám renderelése: fehér tábla, fekete keret, kék sáv az országkóddal"""
+    width = int(height * 4.7)
+    plate = np.full((height, width, 3), 245, np.uint8)
+    band_w = int(height * 0.42)
+    plate[:, :band_w] = (153, 51, 0)  # BGR kék
+    cv2.putText(plate, country_code, (int(band_w * 0.2), int(height * 0.85)),
+                cv2.FONT_HERSHEY_SIMPLEX, height / 110 * 1.1, (255, 255, 255), max(1, height // 40), cv2.LINE_AA)
+    font_scale = height / 110 * 2.6
+    thickness = max(1, height // 18)
+    (tw, th), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+    x = band_w + max(4, (width - band_w - tw) // 2)
+    y = (height + th) // 2
+    cv2.putText(plate, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, font_scale, (20, 20, 20), thickness, cv2.LINE_AA)
+    cv2.rectangle(plate, (0, 0), (width - 1, height - 1), (0, 0, 0), max(2, height // 25))
+    return plate
+
+
+def make_plate_scene(seed: int, scale: float, size: Tuple[int, int] = (1000, 750)) -> Tuple[np.ndarray, Dict]:
+    """Egy jelenet egyetlen beillesztett rendszámmal.
+    Visszatérés: (BGR kép, {"plate", "country_code", "bbox": (x, y, w, h)})"""
+    rng = np.random.default_rng(seed)
+    prng = random.Random(seed)
+    img = _scene_background(rng, size)
+    text = random_plate_text(prng)
+    cc = prng.choice(COUNTRY_CODES)
+    plate = render_plate(text, cc, height=max(12, int(110 * scale)))
+    ph, pw = plate.shape[:2]
+    x = int(rng.integers(0, max(1, size[0] - pw)))
+    y = int(rng.integers(0, max(1, size[1] - ph)))
+    img[y:y + ph, x:x + pw] = plate
+    return img, {"plate": text.replace("-", ""), "country_code": cc, "bbox": (x, y, pw, ph)}
+
+
+def plate_dataset(out_dir: str, n: int, seed: int = 0,
+                  scales: Tuple[float, ...] = (0.35, 0.6, 1.0)) -> List[Dict]:
+    os.makedirs(out_dir, exist_ok=True)
+    samples = []
+    for i in range(n):
+        scale = scales[i % len(scales)]
+        img, truth = make_plate_scene(seed * 100003 + i, scale)
+        path = os.path.join(out_dir, f"plate_{seed}_{i:04d}.png")
+        cv2.imwrite(path, img)
+        samples.append(dict(truth, path=path, scale=scale))
+    return samples
+
+
+# ============ ARCOK ============
+
+def render_face(size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Sematikus szemből nézett arc (világos ovális, sötét szemöldök / szem / száj, orr-árnyék):
+    a Haar arc-kaszkád jellemzőire (sötét szemsáv a világos arcon) épül.
+    Visszatérés: (szürke arc, ovális maszk)"""
+    c = size // 2
+    axes = (int(size * 0.36), int(size * 0.46))
+    face = np.zeros((size, size), np.uint8)
+    cv2.ellipse(face, (c, int(c * 1.05)), axes, 0, 0, 360, 185, -1)
+    for side in (-1, 1):
+        ex, ey = c + side * int(size * 0.15), int(size * 0.42)
+        cv2.ellipse(face, (ex, ey - int(size * 0.07)), (int(size * 0.09), int(size * 0.02)), 0, 0, 360, 70, -1)
+        cv2.ellipse(face, (ex, ey), (int(size * 0.07), int(size * 0.035)), 0, 0, 360, 50, -1)
+    cv2.ellipse(face, (c, int(size * 0.58)), (int(size * 0.04), int(size * 0.08)), 0, 0, 360, 150, -1)
+    cv2.ellipse(face, (c, int(size * 0.74)), (int(size * 0.12), int(size * 0.03)), 0, 0, 360, 80, -1)
+    face = cv2.GaussianBlur(face, (0, 0), size / 80)
+    mask = np.zeros((size, size), np.uint8)
+    cv2.ellipse(mask, (c, int(c * 1.05)), axes, 0, 0, 360, 255, -1)
+    return face, mask
+
+
+def make_face_scene(seed: int, n_faces: int, size: Tuple[int, int] = (800, 600)) -> Tuple[np.ndarray, List[Tuple]]:
+    """Jelenet 0..n nem átfedő arccal a zavaró hátteren. Visszatérés: (BGR kép, [(x, y, w, h), ...])"""
+    rng = np.random.default_rng(seed)
+    img = _scene_background(rng, size)
+    boxes: List[Tuple] = []
+    for _ in range(n_faces * 10):
+        if len(boxes) >= n_faces:
+            break
+        fs = int(rng.integers(60, 200))
+        x, y = int(rng.integers(0, size[0] - fs)), int(rng.integers(0, size[1] - fs))
+        if any(x < bx + bw and bx < x + fs and y < by + bh and by < y + fs for bx, by, bw, bh in boxes):
+            continue
+        face, mask = render_face(fs)
+        roi = img[y:y + fs, x:x + fs]
+        roi[mask > 0] = face[mask > 0][:, None]
+        boxes.append((x, y, fs, fs))
+    return img, boxes
+
+
+def face_dataset(out_dir: str, n: int, seed: int = 0) -> List[Dict]:
+    """Minták 0, 1 vagy 2 arccal (az arc nélküliek a téves találatokat mérik)"""
+    os.makedirs(out_dir, exist_ok=True)
+    samples = []
+    for i in range(n):
+        img, boxes = make_face_scene(seed * 100003 + i, i % 3)
+        path = os.path.join(out_dir, f"face_{seed}_{i:04d}.png")
+        cv2.imwrite(path, img)
+        samples.append({"path": path, "faces": boxes})
+    return samples
+
+
+# ============ ÁRNYÉKVONALAK ============
+
+def make_shadow_scene(seed: int, angle_deg: float, size: Tuple[int, int] = (800, 600)) -> np.ndarray:
+    """Világos, textúrált talaj párhuzamos sötét sávokkal adott orientációban
+    (kép-koordinátában, 0..180°, y lefelé - ugyanaz a konvenció, mint a detect_shadow-ban)"""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    img = np.clip(rng.normal(185, 12, (h, w)), 0, 255).astype(np.uint8)
+    img = cv2.GaussianBlur(img, (3, 3), 0)
+    dx, dy = math.cos(math.radians(angle_deg)), math.sin(math.radians(angle_deg))
+    nx, ny = -dy, dx
+    diag = math.hypot(w, h)
+    for k in range(int(rng.integers(3, 6))):
+        off = rng.uniform(-0.35, 0.35) * diag
+        cx, cy = w / 2 + nx * off, h / 2 + ny * off
+        length = rng.uniform(0.4, 0.9) * diag / 2
+        p1 = (int(cx - dx * length), int(cy - dy * length))
+        p2 = (int(cx + dx * length), int(cy + dy * length))
+        cv2.line(img, p1, p2, int(rng.integers(30, 70)), int(rng.integers(6, 14)), cv2.LINE_AA)
+    return cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+
+
+def shadow_dataset(out_dir: str, n: int, seed: int = 0) -> List[Dict]:
+    os.makedirs(out_dir, exist_ok=True)
+    prng = random.Random(seed)
+    samples = []
+    for i in range(n):
+        angle = prng.uniform(0.0, 180.0)
+        img = make_shadow_scene(seed * 100003 + i, angle)
+        path = os.path.join(out_dir, f"shadow_{seed}_{i:04d}.png")
+        cv2.imwrite(path, img)
+        samples.append({"path": path, "angle_deg": angle})
+    return samples
+
+
+# ============ ÁRNYÉKMÉRÉSEK (ShadowCalculator) ============
+
+def _shadow_elevation_for_true(h_true_deg: float) -> float:
+    """A ShadowCalculator a mért elevációhoz hozzáadja a refrakciót; ezt invertáljuk"""
+    h = h_true_deg
+    for _ in range(20):
+        h = h_true_deg - refraction_deg(h)
+    return h
+
+
+def make_measurements(lat_deg: float, day_of_year: int, hours: List[float],
+                      utc_offset: int = 1, height: float = 2.0) -> List[Dict]:
+    """Mérések ismert szélességről, a ShadowCalculator modelljével előre számolva
+    (hosszúság = időzóna középmeridiánja, ahogy a ShadowCalculator alapértelmezése)"""
+    phi = math.radians(lat_deg)
+    delta = solar_declination(day_of_year)
+    measurements = []
+    for hour in hours:
+        H = hour_angle(hour, utc_offset, day_of_year, 15.0 * utc_offset)
+        sin_h = math.sin(phi) * math.sin(delta) + math.cos(phi) * math.cos(delta) * math.cos(H)
+        h_true = math.degrees(math.asin(max(-1.0, min(1.0, sin_h))))
+        if h_true < 5.0:
+            continue  # túl alacsony nap: a hosszú árnyék mérése nem reális
+        h_meas = _shadow_elevation_for_true(h_true)
+        measurements.append({
+            "height": height,
+            "shadow": height / math.tan(math.radians(h_meas)),
+            "day_of_year": day_of_year,
+            "local_hour": hour,
+        })
+    return measurements
+
+
+def shadowcalc_dataset(n: int, seed: int = 0) -> List[Dict]:
+    prng = random.Random(seed)
+    samples = []
+    while len(samples) < n:
+        lat = prng.uniform(-55.0, 65.0)
+        day = prng.randint(1, 365)
+        hours = sorted(prng.uniform(9.0, 16.0) for _ in range(4))
+        measurements = make_measurements(lat, day, hours)
+        if measurements:
+            samples.append({"latitude_deg": lat, "measurements": measurements})
+    return samples
@@ -1,21 +1,15 @@
 import customtkinter as ctk
 import tkinter as tk
 from tkinter import filedialog
-from PIL import Image, ImageTk
+from PIL import Image
 import threading
 import time
-import cv2
-import numpy as np
-import pytesseract
-import sqlite3
-import requests
-import json
-import re
-from PIL.ExifTags import TAGS, GPSTAGS
-import os
-import hashlib
 
-from algorithms.meta import exif_reading
-from algorithms.haar import haar_detection
-from algorithms.shadowcalc import detect_shadow
-from algorithms.plate_rec import create_db, plate_recognition
\ No newline at end of file
+# Az elemző modulok (és nehéz függőségeik: cv2, numpy, pytesseract) csak az első hívásnál töltődnek be
+from algorithms.registry import lazy
+
+exif_reading = lazy("algorithms.meta:exif_reading")
+haar_detection = lazy("algorithms.haar:haar_detection")
+detect_shadow = lazy("algorithms.shadowcalc:detect_shadow")
+create_db = lazy("algorithms.plate_rec:create_db")
+plate_recognition = lazy("algorithms.plate_rec:plate_recognition")
@@ -1,5 +1,14 @@
 from imports import *
+from ui_queue import UIEventQueue
+from viewport import TiledViewport
+from algorithms.tracing import span, TRACER
+from algorithms.deadline import Deadline
+import os
 
+FRAME_MS = 33          # UI frissítés ~30 FPS
+LOG_MAX_LINES = 2000   # Log panel gyűrűpuffer mérete (sor)
+# Képenkénti időkeret (ms) interaktív triázshoz; None = korlátlan (OSINT_DEADLINE_MS környezeti változó)
+TIME_BUDGET_MS = int(os.environ["OSINT_DEADLINE_MS"]) if os.environ.get("OSINT_DEADLINE_MS") else None
 
 
 class OSINTApp(ctk.CTk):
@@ -13,14 +22,15 @@ class OSINTApp(ctk.CTk):
         OSINTApp.haar_detection = haar_detection
         OSINTApp.shadow_analysis = self.shadow_analysis
 
-        create_db()
-
 
 
         # Változók
         self.image = None
+        self.db_ready = False  # a rendszám-adatbázis az első rendszám-futásnál jön létre (plate_rec import)
         self.image_path = ""
         self.is_running = False
+        self.time_budget_ms = TIME_BUDGET_MS
+        self.ui_queue = UIEventQueue()
 
         # Grid layout
         self.grid_columnconfigure(0, weight=1)  # Képtér
@@ -32,6 +42,9 @@ class OSINTApp(ctk.CTk):
         self.create_image_canvas()
         self.create_log_panel()
 
+        # Eseménysor ürítése a főciklusban
+        self.after(FRAME_MS, self._drain_ui_queue)
+
     # --- UI Létrehozása ---
     def create_menu(self):
         """Felső menüsor (File, OSINT, About)"""
@@ -59,6 +72,7 @@ class OSINTApp(ctk.CTk):
         self.canvas = tk.Canvas(self, bg="gray12", bd=0, highlightthickness=0)
         self.canvas.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
         self.canvas.create_text(300, 200, text="Tölts be egy képet!", fill="gray50", font=("Arial", 20))
+        self.viewport = TiledViewport(self.canvas)
 
     def create_log_panel(self):
         """Jobb oldali színes log"""
@@ -75,26 +89,57 @@ class OSINTApp(ctk.CTk):
 
     # --- Segédfüggvények ---
     def log(self, type, sender, message):
-        """Színes logolás
+        """Színes logolás (bármely szálból hívható, az eseménysoron keresztül)
         :param type: error/warning/success/info
         :param sender: Küldő modul (pl. 'EXIF')
         :param message: Üzenet szövege
         """
         timestamp = time.strftime("%H:%M:%S")
         log_entry = f"[{timestamp}] [{sender}] {message}\n"
-        
-        self.log_panel.configure(state="normal")
-        self.log_panel.insert("end", log_entry, type)
-        self.log_panel.configure(state="disabled")
-        self.log_panel.see("end")  # Autoscroll
+        self.ui_queue.publish_log(type, log_entry)
+
+    def draw(self, kind, *coords, scale=1.0, **options):
+        """Overlay rajzolása (bármely szálból hívható), pl. draw("rectangle", x1, y1, x2, y2, outline="red")
+        :param scale: a modul koordinátarendszere / eredeti kép (pl. átméretezett kép esetén < 1)
+        """
+        coords = tuple(c / scale for c in coords)
+        self.ui_queue.publish_draw(kind, coords, options)
+
+    def _drain_ui_queue(self):
+        """Az eseménysor kötegelt ürítése a főszálon, fix képkockasebességgel"""
+        try:
+            events = self.ui_queue.drain()
+            log_events = [e for e in events if e[0] == "log"]
+
+            for _, kind, coords, options in (e for e in events if e[0] == "draw"):
+                self.viewport.add_overlay(kind, coords, options)
+
+            if log_events:
+                self.log_panel.configure(state="normal")
+                # Egymást követő azonos típusú sorok egyetlen insert-tel
+                run_type, run_text = log_events[0][1], []
+                for _, type, text in log_events:
+                    if type != run_type:
+                        self.log_panel.insert("end", "".join(run_text), run_type)
+                        run_type, run_text = type, []
+                    run_text.append(text)
+                self.log_panel.insert("end", "".join(run_text), run_type)
+
+                # Gyűrűpuffer: a legrégebbi sorok eldobása
+                lines = int(self.log_panel.index("end-1c").split(".")[0])
+                if lines > LOG_MAX_LINES:
+                    self.log_panel.delete("1.0", f"{lines - LOG_MAX_LINES + 1}.0")
+                self.log_panel.configure(state="disabled")
+                self.log_panel.see("end")  # Autoscroll
+        finally:
+            self.after(FRAME_MS, self._drain_ui_queue)
 
     def clear_canvas(self):
-        """Törli a canvas tartalmát"""
+        """Törli a canvas tartalmát, és a képet a csempézett nézetbe tölti"""
+        self.ui_queue.clear_draws()  # a sorban álló, régi képre szóló rajzolások eldobása
         self.canvas.delete("all")
-        if self.image:
-            img_tk = ImageTk.PhotoImage(self.image)
-            self.canvas.image = img_tk
-            self.canvas.create_image(0, 0, anchor="nw", image=img_tk)
+        if self.image_path:
+            self.viewport.set_image(self.image_path)
 
     # --- Fő Funkciók ---
     def load_image(self):
@@ -134,18 +179,31 @@ class OSINTApp(ctk.CTk):
     def run_osint(self):
         """Algoritmusok futtatása modulárisan"""
         try:
+            # A képenkénti időkeretet a lassú modulok (plate_rec, shadowcalc) közösen használják;
+            # a meta és a haar nem figyeli, ezért a keret csak az első ilyen modul indulásakor kezdődik
+            started = []
+
+            def deadline():
+                if not started:
+                    started.append(Deadline(self.time_budget_ms / 1000.0) if self.time_budget_ms else None)
+                return started[0]
+
             modules = [
-                lambda: self.exif_reading(self.image_path),
-                self.run_haar_detection,
-                lambda: self.plate_recognition_module(self.image_path),  # ide
-                lambda: self.shadow_analysis(self.image_path)
+                ("meta", lambda: self.exif_reading(self.image_path)),
+                ("haar", self.run_haar_detection),
+                ("plate_rec", lambda: self.plate_recognition_module(self.image_path, deadline=deadline())),  # ide
+                ("shadowcalc", lambda: self.shadow_analysis(self.image_path, deadline=deadline()))
             ]
 
 
-            for module in modules:
+            for name, module in modules:
                 if not self.is_running:
                     break
-                module()
+                with span(f"module:{name}", file=self.image_path):
+                    module()
+
+            if TRACER.enabled:
+                self.log("info", "TRACE", "Szakaszidők:\n" + TRACER.summary())
 
         except Exception as e:
             self.log("error", "OSINT", f"Kritikus hiba: {str(e)}")
@@ -166,11 +224,11 @@ class OSINTApp(ctk.CTk):
 
             # Arcok és szemek kirajzolása
             for (x, y, w, h) in haar_results["faces"]:
-                self.canvas.create_rectangle(x, y, x+w, y+h, outline="red", width=2)
+                self.draw("rectangle", x, y, x+w, y+h, outline="red", width=2)
                 self.log("success", "HAAR", f"Arc észlelve: ({x}, {y}, {w}, {h})")
 
             for (x, y, w, h) in haar_results["eyes"]:
-                self.canvas.create_rectangle(x, y, x+w, y+h, outline="green", width=2)
+                self.draw("rectangle", x, y, x+w, y+h, outline="green", width=2)
                 self.log("success", "HAAR", f"Szem észlelve: ({x}, {y}, {w}, {h})")
 
         except Exception as e:
@@ -179,7 +237,7 @@ class OSINTApp(ctk.CTk):
     # --- Algoritmus Modulok ---
 
 
-    def plate_recognition_module(self, image_path=None):
+    def plate_recognition_module(self, image_path=None, deadline=None):
         """Rendszám felismerés a már betöltött képen"""
         if image_path is None:
             image_path = self.image_path
@@ -189,9 +247,12 @@ class OSINTApp(ctk.CTk):
             return
 
         self.log("info", "PLATE", "Rendszám felismerés indítása...")
+        if not self.db_ready:
+            create_db()
+            self.db_ready = True
         
         # Átadjuk a log függvényt a plate_recognition-nak
-        results = plate_recognition(image_path, log_func=self.log, use_online_db=False)
+        results = plate_recognition(image_path, log_func=self.log, use_online_db=False, deadline=deadline)
         # ... a többi kód változatlan ...
         
         if results:
@@ -201,11 +262,12 @@ class OSINTApp(ctk.CTk):
                 x, y, w, h = result["position"]
                 
                 # Keret rajzolása a képre
-                self.canvas.create_rectangle(x, y, x+w, y+h, outline="yellow", width=2)
+                scale = result.get("scale", 1.0)
+                self.draw("rectangle", x, y, x+w, y+h, scale=scale, outline="yellow", width=2)
                 
                 # Szöveg hozzáadása a képhez (országkóddal együtt)
                 label = f"{country_code} {plate}" if country_code else plate
-                self.canvas.create_text(x, y-15, text=label, fill="yellow", font=("Arial", 12))
+                self.draw("text", x, y-15, scale=scale, text=label, fill="yellow", font=("Arial", 12))
                 
                 # Információk összeállítása
                 info_text = f"Rendszám: {plate}"
@@ -241,15 +303,19 @@ class OSINTApp(ctk.CTk):
             self.log("success", "PLATE", f"{len(results)} rendszám felismerve.")
         else:
             self.log("warning", "PLATE", "Nem található rendszám a képen.")
+        if results is not None and not getattr(results, "complete", True):
+            self.log("warning", "PLATE", "Időkeret lejárt: nem minden jelölt lett feldolgozva")
 
 
 
-    def shadow_analysis(self, image_path):
+    def shadow_analysis(self, image_path, deadline=None):
         """
         Árnyék elemzés végrehajtása a képen
         """
         try:
-            result = detect_shadow(image_path)
+            result = detect_shadow(image_path, deadline=deadline)
+            if not result.get("complete", True):
+                self.log("warning", "SHADOW", "Időkeret: csak a kicsinyített képen futott az elemzés")
             
             # Eredmények logolása
             if result.get("shadow_direction") is not None:
@@ -261,7 +327,7 @@ class OSINTApp(ctk.CTk):
             if result.get("detected_lines"):
                 for line in result["detected_lines"]:
                     x1, y1, x2, y2 = line[0]
-                    self.canvas.create_line(x1, y1, x2, y2, fill="blue", width=2)
+                    self.draw("line", x1, y1, x2, y2, fill="blue", width=2)
             
             return result
             
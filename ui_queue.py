@@ -0,0 +1,43 @@
+import queue
+
+
+class UIEventQueue:
+    """Szálbiztos eseménysor a worker szálak és a Tk főciklus között.
+
+    A worker szálak csak publikálnak (log rekord, rajzolási parancs), Tk hívást
+    soha nem végeznek. A főciklus `after()`-rel, fix képkockasebességgel üríti
+    a sort kötegekben (lásd OSINTApp._drain_ui_queue).
+    A rajzolási parancsok a publikáláskori generációt viszik magukkal: a
+    clear_draws() után a még sorban álló (régi képre szóló) rajzolások eldobódnak.
+    """
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._generation = 0
+
+    def publish_log(self, type, text):
+        self._queue.put(("log", type, text))
+
+    def publish_draw(self, kind, coords, options):
+        """kind: a Canvas create_<kind> metódusa (rectangle, line, text...)"""
+        self._queue.put(("draw", kind, coords, options, self._generation))
+
+    def clear_draws(self):
+        """A canvas törlésekor: a korábban publikált, még ki nem vett rajzolások érvénytelenek"""
+        self._generation += 1
+
+    def drain(self, max_events=1000):
+        """Legfeljebb max_events esemény kivétele blokkolás nélkül.
+        Log: ("log", type, text), rajzolás: ("draw", kind, coords, options)"""
+        events = []
+        try:
+            while len(events) < max_events:
+                event = self._queue.get_nowait()
+                if event[0] == "draw":
+                    if event[4] != self._generation:
+                        continue
+                    event = event[:4]
+                events.append(event)
+        except queue.Empty:
+            pass
+        return events
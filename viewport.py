@@ -0,0 +1,231 @@
+import math
+from collections import OrderedDict
+
+from PIL import Image, ImageOps, ImageTk
+
+
+class TiledViewport:
+    """Nagyítható/mozgatható képnézet csempézett, több felbontású piramissal.
+
+    - A piramis k. szintje a kép 1/2^k méretű változata; csak a szükséges szint
+      dekódolódik (JPEG esetén draft() = DCT-skálázott dekódolás), és csak néhány
+      szint marad a cache-ben. Más formátumnál a kép egyszer dekódolódik teljes
+      felbontásban, a szintek a legközelebbi cache-elt finomabb szintből készülnek.
+    - Csak a látható csempékből készül PhotoImage, ezek LRU cache-ben vannak; a korlát
+      a csempék összes pixelszáma (8x nagyításnál egy csempe ~4 MPx, nem a darabszám számít);
+      az éppen látható csempék a korláttól függetlenül megmaradnak.
+    - Minden overlay kép-koordinátában tárolódik; az egyetlen transzformáció:
+      képernyő = (kép - offset) * zoom.
+    """
+
+    def __init__(self, canvas, tile_size=256, max_tile_pixels=16 * 2**20, max_levels=8, max_cached_levels=3):
+        self.canvas = canvas
+        self.tile_size = tile_size
+        self.max_tile_pixels = max_tile_pixels  # PhotoImage pixelenként ~4 bájt: alapból ~64 MB
+        self.max_levels = max_levels
+        self.max_cached_levels = max_cached_levels
+
+        self.image_path = None
+        self.size = (0, 0)          # Teljes kép mérete (EXIF forgatás után)
+        self.zoom = 1.0             # Képernyő pixel / kép pixel
+        self.offset = (0.0, 0.0)    # A látható bal felső sarok kép-koordinátában
+        self.overlays = []          # (kind, coords, options) kép-koordinátában
+
+        self._is_jpeg = False
+        self._levels = OrderedDict()
+        self._tiles = OrderedDict()         # kulcs -> (PhotoImage, pixelszám)
+        self._tile_pixels = 0
+        self._visible = set()               # az aktuális rajzolás csempéi: ezek nem dobhatók el
+        self._render_pending = False
+        self._drag_start = None
+
+        canvas.bind("<Configure>", lambda e: self.request_render())
+        canvas.bind("<ButtonPress-1>", self._on_press)
+        canvas.bind("<B1-Motion>", self._on_drag)
+        canvas.bind("<MouseWheel>", self._on_wheel)                       # Windows / macOS
+        canvas.bind("<Button-4>", lambda e: self.zoom_at(e.x, e.y, 1.25))  # Linux
+        canvas.bind("<Button-5>", lambda e: self.zoom_at(e.x, e.y, 0.8))
+
+    # --- Kép és piramis ---
+    def set_image(self, image_path):
+        """Új kép beállítása: csak a fejléc olvasódik, a pixelek a rajzoláskor, szintenként."""
+        with Image.open(image_path) as img:
+            w, h = img.size
+            orientation = img.getexif().get(0x0112, 1)
+            is_jpeg = img.format == "JPEG"
+        if orientation in (5, 6, 7, 8):
+            w, h = h, w
+        self.image_path = image_path
+        self.size = (w, h)
+        self._is_jpeg = is_jpeg
+        self._levels.clear()
+        self._tiles.clear()
+        self._tile_pixels = 0
+        self._visible = set()
+        self.overlays = []
+        self.fit()
+
+    def _canvas_size(self):
+        return max(1, self.canvas.winfo_width()), max(1, self.canvas.winfo_height())
+
+    def fit(self):
+        """A teljes kép beillesztése a nézetbe (nagyítás nélkül)"""
+        if not self.image_path:
+            return
+        cw, ch = self._canvas_size()
+        self.zoom = min(cw / self.size[0], ch / self.size[1], 1.0)
+        self.offset = (0.0, 0.0)
+        self.request_render()
+
+    def _level_for_zoom(self):
+        if self.zoom >= 1.0:
+            return 0
+        return max(0, min(self.max_levels, int(math.floor(math.log2(1.0 / self.zoom)))))
+
+    def _level_image(self, level):
+        img = self._levels.get(level)
+        if img is not None:
+            self._levels.move_to_end(level)
+            return img
+
+        factor = 2 ** level
+        target = (max(1, self.size[0] // factor), max(1, self.size[1] // factor))
+        finer = [k for k in self._levels if k < level]
+        if level and not self._is_jpeg:
+            # Nincs DCT-skálázás: a legközelebbi finomabb szintből (végső esetben az egyszer
+            # dekódolt teljes felbontásból) kicsinyítünk, nem dekódolunk újra
+            src_level = max(finer) if finer else 0
+            src = self._level_image(src_level)
+            img = src.reduce(2 ** (level - src_level))
+        else:
+            img = Image.open(self.image_path)
+            if level:
+                # DCT-skálázott dekódolás: a teljes felbontás be sem töltődik
+                img.draft("RGB", (max(1, img.width // factor), max(1, img.height // factor)))
+            img = ImageOps.exif_transpose(img)
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGB")
+        if img.size != target:
+            img = img.resize(target, Image.BILINEAR)
+
+        self._levels[level] = img
+        while len(self._levels) > self.max_cached_levels:
+            self._levels.popitem(last=False)
+        return img
+
+    def _tile(self, level, tx, ty, dscale, level_img):
+        key = (level, tx, ty, round(dscale, 6))
+        entry = self._tiles.get(key)
+        if entry is not None:
+            self._tiles.move_to_end(key)
+            self._visible.add(key)
+            return entry[0]
+
+        ts = self.tile_size
+        box = (tx * ts, ty * ts, min((tx + 1) * ts, level_img.width), min((ty + 1) * ts, level_img.height))
+        size = (max(1, round(box[2] * dscale) - round(box[0] * dscale)),
+                max(1, round(box[3] * dscale) - round(box[1] * dscale)))
+        tile = level_img.crop(box)
+        if tile.size != size:
+            tile = tile.resize(size, Image.NEAREST if dscale > 1.0 else Image.BILINEAR)
+        photo = ImageTk.PhotoImage(tile)
+
+        pixels = size[0] * size[1]
+        self._tiles[key] = (photo, pixels)
+        self._tile_pixels += pixels
+        self._visible.add(key)
+        # A Tk kép a PhotoImage felszabadításakor törlődik (a canvas elem üres lesz), ezért
+        # a látható csempék a korláttól függetlenül maradnak; csak a nem láthatók dobhatók el
+        if self._tile_pixels > self.max_tile_pixels:
+            for old in [k for k in self._tiles if k not in self._visible]:
+                self._tile_pixels -= self._tiles.pop(old)[1]
+                if self._tile_pixels <= self.max_tile_pixels:
+                    break
+        return photo
+
+    # --- Rajzolás ---
+    def request_render(self):
+        """Összevont újrarajzolás (egy idle ciklusban legfeljebb egyszer)"""
+        if not self._render_pending:
+            self._render_pending = True
+            self.canvas.after_idle(self.render)
+
+    def render(self):
+        self._render_pending = False
+        self.canvas.delete("tile")
+        self.canvas.delete("overlay")
+        if not self.image_path:
+            return
+
+        cw, ch = self._canvas_size()
+        level = self._level_for_zoom()
+        level_img = self._level_image(level)
+        lscale = level_img.width / self.size[0]   # szint pixel / kép pixel
+        dscale = self.zoom / lscale               # képernyő pixel / szint pixel
+        ts = self.tile_size
+
+        # Látható tartomány a szint koordinátáiban
+        x0, y0 = self.offset[0] * lscale, self.offset[1] * lscale
+        x1, y1 = x0 + cw / dscale, y0 + ch / dscale
+        tx0, ty0 = max(0, int(x0 // ts)), max(0, int(y0 // ts))
+        tx1 = min(math.ceil(level_img.width / ts) - 1, int(x1 // ts))
+        ty1 = min(math.ceil(level_img.height / ts) - 1, int(y1 // ts))
+
+        ox, oy = round(x0 * dscale), round(y0 * dscale)
+        self._visible = set()
+        for ty in range(ty0, ty1 + 1):
+            for tx in range(tx0, tx1 + 1):
+                photo = self._tile(level, tx, ty, dscale, level_img)
+                sx = round(tx * ts * dscale) - ox
+                sy = round(ty * ts * dscale) - oy
+                self.canvas.create_image(sx, sy, anchor="nw", image=photo, tags=("tile",))
+        self.canvas.tag_lower("tile")
+
+        for overlay in self.overlays:
+            self._draw_overlay(*overlay)
+
+    # --- Overlay-ek (kép-koordinátában) ---
+    def to_screen(self, coords):
+        ox, oy = self.offset
+        return [(c - (ox if i % 2 == 0 else oy)) * self.zoom for i, c in enumerate(coords)]
+
+    def to_image(self, sx, sy):
+        return self.offset[0] + sx / self.zoom, self.offset[1] + sy / self.zoom
+
+    def _draw_overlay(self, kind, coords, options):
+        getattr(self.canvas, f"create_{kind}")(*self.to_screen(coords), tags=("overlay",), **options)
+
+    def add_overlay(self, kind, coords, options):
+        """kind: Canvas create_<kind> (rectangle, line, text...), coords: kép-koordináták"""
+        self.overlays.append((kind, tuple(coords), options))
+        if self.image_path:
+            self._draw_overlay(kind, coords, options)
+
+    def clear_overlays(self):
+        self.overlays = []
+        self.canvas.delete("overlay")
+
+    # --- Mozgatás / nagyítás ---
+    def zoom_at(self, sx, sy, factor):
+        """Nagyítás a képernyő (sx, sy) pontja körül"""
+        if not self.image_path:
+            return
+        ix, iy = self.to_image(sx, sy)
+        cw, ch = self._canvas_size()
+        min_zoom = min(cw / self.size[0], ch / self.size[1], 1.0) / 2
+        self.zoom = max(min_zoom, min(8.0, self.zoom * factor))
+        self.offset = (ix - sx / self.zoom, iy - sy / self.zoom)
+        self.request_render()
+
+    def _on_wheel(self, event):
+        self.zoom_at(event.x, event.y, 1.25 if event.delta > 0 else 0.8)
+
+    def _on_press(self, event):
+        self._drag_start = (event.x, event.y, self.offset)
+
+    def _on_drag(self, event):
+        if not self._drag_start or not self.image_path:
+            return
+        sx, sy, (ox, oy) = self._drag_start
+        self.offset = (ox - (event.x - sx) / self.zoom, oy - (event.y - sy) / self.zoom)
+        self.request_render()